@@ -0,0 +1,157 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import select, update
+
+from app import db
+from models import Alert, AlertSeverity, AlertStatus, DisasterType, Region, User, UserRole
+from change_feed import change_feed
+from response_analytics import TIME_TO_ACKNOWLEDGE, TIME_TO_RESOLVE, response_analytics
+from sqlite_profile import sqlite_writer
+import metrics
+
+# Roles allowed to change alerts in bulk
+BULK_ACTION_ROLES = (UserRole.ADMINISTRATOR, UserRole.RESCUE_DEPARTMENT)
+
+# Per action: statuses an alert may move from, the new status and the columns stamped
+BULK_ACTIONS = {
+    'acknowledge': ((AlertStatus.ACTIVE,), AlertStatus.ACKNOWLEDGED,
+                    'acknowledged_at', 'acknowledged_by_id', TIME_TO_ACKNOWLEDGE),
+    'resolve': ((AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED), AlertStatus.RESOLVED,
+                'resolved_at', 'resolved_by_id', TIME_TO_RESOLVE),
+}
+# Change feed payload key naming the responder, per action
+ACTION_BY_KEY = {'acknowledge': 'acknowledged_by', 'resolve': 'resolved_by'}
+
+BULK_ALERT_ACTION_SECONDS = metrics.histogram(
+    'bulk_alert_action_duration_seconds',
+    'Duration of a set-based bulk alert acknowledge or resolve',
+    ('action',))
+BULK_ALERTS_UPDATED = metrics.counter(
+    'bulk_alerts_updated',
+    'Alerts changed by bulk acknowledge and resolve actions',
+    ('action',))
+
+
+class BulkActionError(ValueError):
+    """Raised for a bulk request that names no alerts or an unknown action or filter value"""
+
+
+def _selection_criteria(alert_ids: Optional[Sequence[int]], filters: Optional[Dict[str, Any]]) -> List[Any]:
+    criteria = []
+    filters = filters or {}
+    # int() would take "12" as ids 1 and 2, or 1.9 as 1; accept only a list of integers
+    if alert_ids is not None and (not isinstance(alert_ids, (list, tuple)) or any(
+            isinstance(alert_id, bool) or not isinstance(alert_id, int) for alert_id in alert_ids)):
+        raise BulkActionError('alert_ids must be a list of integers')
+    try:
+        if alert_ids:
+            criteria.append(Alert.id.in_(list(alert_ids)))
+        if filters.get('region'):
+            criteria.append(Alert.region_id.in_(select(Region.id).where(Region.name == filters['region'])))
+        if filters.get('disaster_type'):
+            criteria.append(Alert.disaster_type == DisasterType(filters['disaster_type']))
+        if filters.get('severity'):
+            criteria.append(Alert.severity == AlertSeverity(filters['severity']))
+    except (TypeError, ValueError) as e:
+        raise BulkActionError(f'Invalid bulk selection: {e}')
+
+    # Refuse an empty selection rather than touching every open alert
+    if not criteria:
+        raise BulkActionError('Select alerts by id or by at least one filter')
+    return criteria
+
+
+def update_alert(alert_id: int, action: str, user: User) -> bool:
+    """
+    Acknowledge or resolve one alert through the writer thread, logged for the
+    change feed. Returns False if the alert's status does not allow the action.
+    """
+    change = sqlite_writer.run_write(_update_alert, alert_id, action, user.id, user.full_name,
+                                     user.department, datetime.utcnow())
+    if change is None:
+        return False
+
+    change_feed.publish([change])
+    return True
+
+
+def _update_alert(alert_id: int, action: str, user_id: int, user_name: str,
+                  department: Optional[str], now: datetime):
+    """Writer-thread half of ``update_alert``; returns plain values, never session-bound objects"""
+    from_statuses, to_status, at_column, by_column, analytics_metric = BULK_ACTIONS[action]
+    alert = db.session.get(Alert, alert_id)
+    if alert is None or alert.status not in from_statuses:
+        return None
+
+    alert.status = to_status
+    setattr(alert, at_column, now)
+    setattr(alert, by_column, user_id)
+    # Analytics first: its savepoints then never enclose the recorded change
+    response_analytics.record(analytics_metric, now, department,
+                              [(alert.detected_at, alert.region.name, alert.disaster_type.value)])
+    return change_feed.record('alert_updated', {
+        'alert_id': alert.id,
+        'status': to_status.value,
+        ACTION_BY_KEY[action]: user_name
+    })
+
+
+def bulk_update_alerts(action: str, user: User, alert_ids: Optional[Sequence[int]] = None,
+                       filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Acknowledge or resolve every alert matching ``alert_ids`` and/or ``filters``
+    (region name, disaster_type, severity) in one UPDATE ... RETURNING and one
+    commit through the writer thread, logged as one ``alerts_bulk_updated``
+    change. Alerts whose current status does not allow the action are skipped.
+    Returns the changed alerts as ``{'alert_id', 'region_id', 'status'}`` dicts.
+    """
+    if action not in BULK_ACTIONS:
+        raise BulkActionError(f'Unknown bulk action: {action}')
+    from_statuses, to_status, at_column, by_column, analytics_metric = BULK_ACTIONS[action]
+    criteria = _selection_criteria(alert_ids, filters)
+    now = datetime.utcnow()
+
+    def apply():
+        rows = db.session.execute(
+            update(Alert)
+            .where(Alert.status.in_(from_statuses), *criteria)
+            .values({'status': to_status, at_column: now, by_column: user_id})
+            .returning(Alert.id, Alert.region_id, Alert.disaster_type, Alert.detected_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not rows:
+            return rows, None
+
+        # Response times go into the shared bins in the same transaction, before the change is recorded
+        region_names = dict(db.session.query(Region.id, Region.name)
+                            .filter(Region.id.in_({row[1] for row in rows})).all())
+        response_analytics.record(
+            analytics_metric, now, department,
+            [(detected_at, region_names.get(region_id, ''), disaster_type.value)
+             for _, region_id, disaster_type, detected_at in rows]
+        )
+        # One batched event instead of an alert_updated per alert
+        change = change_feed.record('alerts_bulk_updated', {
+            'alert_ids': [row[0] for row in rows],
+            'status': to_status.value,
+            ACTION_BY_KEY[action]: user_name
+        })
+        return rows, change
+
+    user_id, user_name, department = user.id, user.full_name, user.department
+    with BULK_ALERT_ACTION_SECONDS.labels(action=action).time():
+        try:
+            rows, change = sqlite_writer.run_write(apply)
+        except Exception as e:
+            logging.error(f"Error applying bulk {action} to alerts: {str(e)}")
+            raise
+
+    if rows:
+        change_feed.publish([change])
+        BULK_ALERTS_UPDATED.labels(action=action).inc(len(rows))
+        logging.info(f"Bulk {action} by {user.username}: {len(rows)} alerts")
+
+    return [{'alert_id': alert_id, 'region_id': region_id, 'status': to_status.value}
+            for alert_id, region_id, _, _ in rows]
@@ -0,0 +1,174 @@
+import os
+import time
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from records import AnalysisResult, SatelliteObservation
+import metrics
+
+ANALYSIS_TASK_SECONDS = metrics.histogram(
+    'analysis_task_duration_seconds',
+    'Time from submitting a region analysis to receiving its result, by execution mode',
+    ('mode',))
+ANALYSIS_POOL_RESTARTS = metrics.counter(
+    'analysis_pool_restarts',
+    'Analysis process pools recreated after a worker crashed')
+# Workers per process by default; every gunicorn worker starts its own pool
+DEFAULT_MAX_WORKERS = 2
+
+
+# Worker process state
+
+_worker_detector = None
+
+
+def _init_worker():
+    """Load the app, detector and model once per worker so the first task is not a cold start"""
+    global _worker_detector
+
+    import app  # noqa: F401  (configures models before the detector is imported)
+    from ai_detector import DisasterDetectionAI
+
+    _worker_detector = DisasterDetectionAI()
+    _worker_detector._score([{}])
+    logging.info(f"Analysis worker {os.getpid()} ready (model {_worker_detector.model_version})")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _analyze(satellite_data: Dict[str, Any], region_name: str) -> AnalysisResult:
+    return _worker_detector.analyze_observation(satellite_data, region_name)
+
+
+class AnalysisTask:
+    """Handle for a submitted analysis; ``result()`` waits for it"""
+
+    def __init__(self, executor: 'AnalysisExecutor', observation: SatelliteObservation, region_name: str):
+        self.executor = executor
+        self.observation = observation
+        self.region_name = region_name
+        self._submitted_at = time.perf_counter()
+        self._payload: Optional[Dict[str, Any]] = None
+        self._future: Optional[Future] = None
+        if executor.enabled:
+            # Plain scalars and lists: pickling them to the worker is as cheap as any shared buffer
+            self._payload = observation.to_dict() if isinstance(observation, SatelliteObservation) else observation
+            self._future = executor._submit(self._payload, region_name)
+
+    def result(self, timeout: Optional[float] = None) -> AnalysisResult:
+        try:
+            if self._future is None:
+                import services
+                with services.ai_detector() as detector:
+                    return detector.analyze_observation(self.observation, self.region_name)
+
+            for attempt in range(self.executor.max_retries + 1):
+                try:
+                    return self._future.result(timeout)
+                except BrokenProcessPool:
+                    if attempt == self.executor.max_retries:
+                        raise
+                    logging.warning(f"Analysis worker crashed while analyzing {self.region_name}; retrying")
+                    self.executor._recover()
+                    self._future = self.executor._submit(self._payload, self.region_name)
+        finally:
+            ANALYSIS_TASK_SECONDS.labels(mode='process' if self._future is not None else 'inline') \
+                .observe(time.perf_counter() - self._submitted_at)
+
+
+class AnalysisExecutor:
+    """
+    Runs DisasterDetectionAI analysis in a pool of worker processes so numeric
+    work scales across cores instead of contending for the GIL in web workers
+    and scheduler threads. Workers are started with the spawn method (safe in
+    threaded parents), warm up the detection model in their initializer, and
+    are replaced transparently if one crashes. ``max_workers=0`` runs analysis
+    inline on the shared in-process detector.
+
+    Each web worker process gets its own pool, so the default stays small
+    (DEFAULT_MAX_WORKERS, at most the CPU count) rather than one process per
+    core per web worker; ANALYSIS_POOL_SIZE sets it explicitly.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_retries: int = 1):
+        self.max_workers = (min(os.cpu_count() or 1, DEFAULT_MAX_WORKERS) if max_workers is None
+                            else max_workers)
+        self.max_retries = max_retries
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        pool = self._pool
+        if pool is None:
+            with self._lock:
+                pool = self._pool
+                if pool is None:
+                    pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker
+                    )
+                    self._pool = pool
+                    logging.info(f"Analysis process pool started with {self.max_workers} workers")
+        return pool
+
+    def _submit(self, payload: Dict[str, Any], region_name: str) -> Future:
+        try:
+            return self._get_pool().submit(_analyze, payload, region_name)
+        except BrokenProcessPool:
+            self._recover()
+            return self._get_pool().submit(_analyze, payload, region_name)
+
+    def _recover(self):
+        """Replace a broken pool; concurrent callers sharing the same broken pool recreate it once"""
+        with self._lock:
+            pool = self._pool
+            if pool is None or not getattr(pool, '_broken', True):
+                return
+            self._pool = None
+            ANALYSIS_POOL_RESTARTS.inc()
+            logging.error("Analysis process pool broken by a crashed worker; recreating it")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Start and warm up every worker now rather than on the first analyses"""
+        if not self.enabled:
+            return
+        pool = self._get_pool()
+        for future in [pool.submit(_ping) for _ in range(self.max_workers)]:
+            future.result()
+
+    def submit(self, observation: SatelliteObservation, region_name: str) -> AnalysisTask:
+        """Start analyzing one region; call ``result()`` on the returned task to collect it"""
+        return AnalysisTask(self, observation, region_name)
+
+    def analyze(self, observation: SatelliteObservation, region_name: str) -> AnalysisResult:
+        """Analyze one region and wait for the result"""
+        return self.submit(observation, region_name).result()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+            logging.info("Analysis process pool stopped")
+
+
+def _pool_size_from_env() -> Optional[int]:
+    value = os.environ.get('ANALYSIS_POOL_SIZE')
+    return int(value) if value else None
+
+
+analysis_executor = AnalysisExecutor(_pool_size_from_env())
+atexit.register(analysis_executor.shutdown)
@@ -1,5 +1,6 @@
 import os
 import logging
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
@@ -13,69 +14,142 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
+# Extensions are created unbound and attached to the app in create_app()
 db = SQLAlchemy(model_class=Base)
+socketio = SocketIO()
+login_manager = LoginManager()
 
 # Create the app
 app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "disaster-mgmt-secret-key-2024")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///disaster_management.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+def create_app() -> Flask:
+    """
+    Configure the application, its extensions and routes. This does no database
+    work, so importing the app in a worker is cheap; schema creation and seed
+    data are handled once by ``flask --app app init-db`` (see init_database).
+    """
+    if app.config.get('APP_CONFIGURED'):
+        return app
 
-# Initialize extensions
-db.init_app(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+    app.secret_key = os.environ.get("SESSION_SECRET", "disaster-mgmt-secret-key-2024")
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Initialize Flask-Login
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'  # type: ignore
-login_manager.login_message = 'Please log in to access the disaster management system.'
+    # Configure the database
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///disaster_management.db")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+
+    # Initialize extensions
+    db.init_app(app)
+    # WAL, a busy timeout and a single background writer thread when running on SQLite
+    from sqlite_profile import sqlite_writer
+    sqlite_writer.init_app(app)
+    # With several workers, SOCKETIO_MESSAGE_QUEUE relays emits between them (see event_bus)
+    from event_bus import socketio_options
+    socketio.init_app(app, cors_allowed_origins="*", **socketio_options())
+
+    import metrics
+    metrics.init_app(app)
+
+    from query_profiler import query_profiler
+    query_profiler.init_app(app)
+
+    import http_cache
+    http_cache.init_app(app)
+
+    # Initialize Flask-Login
+    login_manager.init_app(app)
+    login_manager.login_view = 'login'  # type: ignore
+    login_manager.login_message = 'Please log in to access the disaster management system.'
+
+    # Import models and routes after extensions are bound
+    import models
+    import routes
+
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(archive_alerts_command)
+    app.cli.add_command(event_broker_command)
+    app.config['APP_CONFIGURED'] = True
+
+    if os.environ.get('AUTO_INIT_DB') == '1':
+        init_database()
+
+    return app
 
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return User.query.get(int(user_id))
+    # Served from the identity cache so hot paths (API polling, socket connects) skip the database
+    from auth_cache import user_cache
+    return user_cache.load(int(user_id))
 
-with app.app_context():
-    # Import models to ensure tables are created
-    import models
-    
-    # Create all tables
-    db.create_all()
-    
-    # Create default admin user if it doesn't exist
+def init_database():
+    """Create all tables, the default admin user and default regions (idempotent)"""
     from models import User, UserRole
     from werkzeug.security import generate_password_hash
-    
-    if not User.query.filter_by(username='admin').first():
-        admin_user = User()
-        admin_user.username = 'admin'
-        admin_user.email = 'admin@disaster-mgmt.com'
-        admin_user.password_hash = generate_password_hash('admin123')
-        admin_user.role = UserRole.ADMINISTRATOR
-        admin_user.full_name = 'System Administrator'
-        admin_user.department = 'Administration'
-        db.session.add(admin_user)
-        db.session.commit()
-        logging.info("Default admin user created: admin/admin123")
-
-# Import routes after app initialization
-import routes
-
-# Initialize default data
-with app.app_context():
-    routes.initialize_default_data()
+    import routes
+
+    with app.app_context():
+        # Create all tables
+        db.create_all()
+
+        # Create default admin user if it doesn't exist
+        if not User.query.filter_by(username='admin').first():
+            admin_user = User()
+            admin_user.username = 'admin'
+            admin_user.email = 'admin@disaster-mgmt.com'
+            admin_user.password_hash = generate_password_hash('admin123')
+            admin_user.role = UserRole.ADMINISTRATOR
+            admin_user.full_name = 'System Administrator'
+            admin_user.department = 'Administration'
+            db.session.add(admin_user)
+            db.session.commit()
+            logging.info("Default admin user created: admin/admin123")
+
+        # Initialize default data
+        routes.initialize_default_data()
+
+        from change_feed import change_feed
+        change_feed.ensure_sequence()
+
+        # Response times recorded before the shared bins existed are folded in once
+        from response_analytics import response_analytics
+        response_analytics.backfill()
+
+@click.command('init-db')
+def init_db_command():
+    """Create the database schema and seed default data."""
+    init_database()
+    click.echo('Database initialized')
+
+@click.command('archive-alerts')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archive closed alerts older than this (default ALERT_ARCHIVE_AFTER_DAYS or 90).')
+def archive_alerts_command(older_than_days):
+    """Move closed alerts past retention into the archive table."""
+    from archival import archive_closed_alerts
+
+    with app.app_context():
+        archived = archive_closed_alerts(older_than_days)
+    click.echo(f'Archived {archived} alerts')
+
+@click.command('event-broker')
+@click.option('--path', default=None,
+              help='Unix socket to listen on (default: the SOCKETIO_MESSAGE_QUEUE unix:// path).')
+def event_broker_command(path):
+    """Relay Socket.IO events between the workers on this host."""
+    from event_bus import UnixSocketBroker
+
+    url = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+    path = path or (url[len('unix://'):] if url.startswith('unix://') else None)
+    if not path:
+        raise click.UsageError('Pass --path or set SOCKETIO_MESSAGE_QUEUE=unix:///path/to/socket')
+    UnixSocketBroker(path).serve_forever()
 
 if __name__ == '__main__':
-    # Start the monitoring service
-    from monitoring_service import start_monitoring
-    start_monitoring()
-    
-    # Run the app
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, use_reloader=False, log_output=True)
+    # Run through main.py so this module is imported (and configured) exactly once
+    import runpy
+    runpy.run_module('main', run_name='__main__')
+else:
+    create_app()
@@ -0,0 +1,91 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import DateTime, delete, func, insert, literal, select
+
+from app import db
+from models import Alert, AlertArchive, AlertStatus, StatisticsGap, StatisticsWatermark
+from statistics_service import WATERMARK_NAME
+import metrics
+
+# Only closed alerts are archived; active and acknowledged alerts stay hot
+ARCHIVED_STATUSES = (AlertStatus.RESOLVED, AlertStatus.DISMISSED)
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+ARCHIVE_BATCH_SIZE = 5000
+
+ALERT_ARCHIVAL_SECONDS = metrics.histogram(
+    'alert_archival_duration_seconds',
+    'Duration of a pass moving closed alerts into the archive table',
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300))
+ALERTS_ARCHIVED = metrics.counter(
+    'alerts_archived',
+    'Closed alerts moved from the hot alert table into the archive')
+
+# Columns copied verbatim from Alert into AlertArchive
+_ARCHIVE_COLUMNS = [column.name for column in Alert.__table__.columns]
+
+
+def archive_after_days() -> int:
+    value = os.environ.get('ALERT_ARCHIVE_AFTER_DAYS')
+    return int(value) if value else DEFAULT_ARCHIVE_AFTER_DAYS
+
+
+@metrics.timed(ALERT_ARCHIVAL_SECONDS)
+def archive_closed_alerts(older_than_days: Optional[int] = None, batch_size: int = ARCHIVE_BATCH_SIZE,
+                          max_batches: Optional[int] = None) -> int:
+    """
+    Move resolved and dismissed alerts that were closed more than
+    ``older_than_days`` ago (default ``ALERT_ARCHIVE_AFTER_DAYS``, 90) from
+    Alert into AlertArchive, one INSERT ... SELECT plus DELETE per committed
+    batch. Alerts not yet folded into the statistics rollups are left alone, so
+    statistics keep counting archived alerts; the newest alert id is never
+    moved so SQLite cannot hand it out again. Returns the number archived.
+    """
+    days = archive_after_days() if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived = 0
+    batches = 0
+
+    try:
+        watermark = StatisticsWatermark.query.filter_by(name=WATERMARK_NAME).first()
+        folded_through = watermark.last_alert_id if watermark else 0
+        newest_id = db.session.query(func.max(Alert.id)).scalar() or 0
+
+        closed_at = func.coalesce(Alert.resolved_at, Alert.acknowledged_at, Alert.detected_at)
+        eligible = select(Alert.id).where(
+            Alert.status.in_(ARCHIVED_STATUSES),
+            closed_at < cutoff,
+            Alert.id <= folded_through,
+            Alert.id.notin_(select(StatisticsGap.alert_id)),
+            Alert.id < newest_id
+        ).order_by(Alert.id)
+
+        while max_batches is None or batches < max_batches:
+            ids = db.session.execute(eligible.limit(batch_size)).scalars().all()
+            if not ids:
+                break
+
+            db.session.execute(
+                insert(AlertArchive).from_select(
+                    _ARCHIVE_COLUMNS + ['archived_at'],
+                    select(*[Alert.__table__.c[name] for name in _ARCHIVE_COLUMNS],
+                           literal(datetime.utcnow(), DateTime)).where(Alert.id.in_(ids))
+                )
+            )
+            db.session.execute(delete(Alert).where(Alert.id.in_(ids)))
+            db.session.commit()
+
+            archived += len(ids)
+            batches += 1
+            ALERTS_ARCHIVED.inc(len(ids))
+
+        if archived:
+            logging.info(f"Archived {archived} closed alerts older than {days} days")
+
+    except Exception as e:
+        logging.error(f"Error archiving closed alerts: {str(e)}")
+        db.session.rollback()
+
+    return archived
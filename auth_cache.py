@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+
+from models import User
+import metrics
+
+USER_CACHE_REQUESTS = metrics.counter(
+    'user_cache_requests',
+    'User identity cache lookups by result (hit, miss, expired)',
+    ('result',))
+USER_CACHE_INVALIDATIONS = metrics.counter(
+    'user_cache_invalidations',
+    'User identity cache entries invalidated by user updates or deletes')
+USER_CACHE_SIZE = metrics.gauge(
+    'user_cache_entries',
+    'Number of cached user identities')
+
+# User attributes captured in the cached identity; changes to any of them invalidate it
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'role', 'full_name', 'department', 'phone', 'active')
+
+
+class CachedUser(UserMixin):
+    """
+    Detached, read-only snapshot of a User used as ``current_user``. It carries
+    the identity fields routes and templates need without being bound to a
+    database session, so it can safely be shared across requests.
+    """
+
+    def __init__(self, user: User):
+        for field in SNAPSHOT_FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class UserIdentityCache:
+    """
+    LRU cache of user identities with a TTL, consulted by the Flask-Login user
+    loader. Entries are invalidated in-process when a cached field of the user
+    changes through the ORM; the TTL bounds staleness for changes made by other
+    workers or by bulk UPDATE statements that bypass ORM events.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                USER_CACHE_REQUESTS.labels(result='miss').inc()
+                return None
+
+            identity, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                USER_CACHE_REQUESTS.labels(result='expired').inc()
+                return None
+
+            self._entries.move_to_end(user_id)
+            USER_CACHE_REQUESTS.labels(result='hit').inc()
+            return identity
+
+    def put(self, identity: CachedUser):
+        with self._lock:
+            self._entries[identity.id] = (identity, time.monotonic() + self.ttl)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            USER_CACHE_SIZE.set(len(self._entries))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                USER_CACHE_INVALIDATIONS.inc()
+            USER_CACHE_SIZE.set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            USER_CACHE_SIZE.set(0)
+
+    def load(self, user_id: int) -> Optional[CachedUser]:
+        """Resolve a user id to an identity, hitting the database only on a miss"""
+        identity = self.get(user_id)
+        if identity is not None:
+            return identity
+
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+
+        identity = CachedUser(user)
+        self.put(identity)
+        return identity
+
+
+user_cache = UserIdentityCache(
+    maxsize=int(os.environ.get('USER_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('USER_CACHE_TTL', 60))
+)
+
+
+@event.listens_for(User, 'after_update')
+def _invalidate_updated_user(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in SNAPSHOT_FIELDS):
+        user_cache.invalidate(target.id)
+
+
+@event.listens_for(User, 'after_delete')
+def _invalidate_deleted_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
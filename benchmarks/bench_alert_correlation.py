@@ -0,0 +1,69 @@
+"""
+Alert correlation index benchmark.
+
+Fills correlation.SpatialGridIndex with open alerts spread over India and
+times the candidate lookup for new alerts against a linear scan of every
+open alert, checking both find the same candidates.
+
+    python benchmarks/bench_alert_correlation.py [--open-alerts 1000 10000 100000] [--queries 2000]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app  # noqa: F401  (models need the app's db)
+from correlation import LINK_DISTANCE_KM, IndexedAlert, SpatialGridIndex, distance_km
+
+TYPES = list(LINK_DISTANCE_KM)
+
+
+def random_alert(rng: random.Random, alert_id: int, now: datetime):
+    return rng.choice(TYPES), IndexedAlert(alert_id, rng.uniform(8.0, 34.0), rng.uniform(69.0, 89.0),
+                                           now - timedelta(hours=rng.uniform(0, 24)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--open-alerts', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    since = now - timedelta(hours=24)
+    print(f"{'open':>8}  {'scan us/query':>13}  {'index us/query':>14}  {'speedup':>8}  {'candidates':>10}")
+    for count in args.open_alerts:
+        alerts = [random_alert(rng, alert_id, now) for alert_id in range(count)]
+        index = SpatialGridIndex(LINK_DISTANCE_KM)
+        for disaster_type, entry in alerts:
+            index.add(disaster_type, entry)
+        queries = [random_alert(rng, -1, now) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        expected = [{entry.alert_id for alert_type, entry in alerts
+                     if alert_type == disaster_type and entry.detected_at >= since
+                     and distance_km(query.latitude, query.longitude, entry.latitude, entry.longitude)
+                     <= LINK_DISTANCE_KM[disaster_type]}
+                    for disaster_type, query in queries]
+        scan = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        found = [{entry.alert_id for entry, _ in index.nearby(disaster_type, query.latitude, query.longitude, since)}
+                 for disaster_type, query in queries]
+        indexed = (time.perf_counter() - start) / len(queries)
+
+        assert found == expected, 'index and scan disagree'
+        mean_candidates = sum(len(ids) for ids in found) / len(found)
+        print(f"{count:>8}  {scan * 1e6:13.1f}  {indexed * 1e6:14.1f}  {scan / indexed:7.1f}x  {mean_candidates:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Bulk alert action benchmark.
+
+Seeds a temporary database with active alerts and compares acknowledging N of
+them with N single-alert POSTs (one commit and one socket emit each) against
+one POST to the bulk endpoint (one UPDATE, one commit, one emit).
+
+    python benchmarks/bench_bulk_alerts.py [--alerts 500]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_alerts(count: int):
+    from app import db
+    from models import Alert, AlertSeverity, DisasterType, Region
+
+    region = Region.query.first()
+    db.session.bulk_save_objects([
+        Alert(region_id=region.id, disaster_type=DisasterType.FLOOD, severity=AlertSeverity.HIGH,
+              title=f'Bench alert {i}', confidence_score=0.9)
+        for i in range(count)
+    ])
+    db.session.commit()
+    return [alert_id for (alert_id,) in
+            db.session.query(Alert.id).filter(Alert.title.like('Bench alert %')).order_by(Alert.id).all()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--alerts', type=int, default=500, help='alerts acknowledged per run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        sys.path.insert(0, ROOT)
+        from app import app, init_database
+        init_database()
+        logging.disable(logging.INFO)
+
+        with app.app_context():
+            client = app.test_client()
+            client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+            alert_ids = seed_alerts(args.alerts)
+            start = time.perf_counter()
+            for alert_id in alert_ids:
+                client.post(f'/alerts/{alert_id}/acknowledge')
+            single = time.perf_counter() - start
+
+            alert_ids = seed_alerts(args.alerts)
+            start = time.perf_counter()
+            response = client.post('/api/alerts/bulk', json={'action': 'acknowledge', 'alert_ids': alert_ids})
+            bulk = time.perf_counter() - start
+            assert response.get_json()['updated'] == args.alerts, response.get_json()
+
+    print(f"{args.alerts} single POSTs          {single * 1000:10.1f} ms  ({single / args.alerts * 1000:.2f} ms/alert)")
+    print(f"1 bulk POST                  {bulk * 1000:10.1f} ms  ({bulk / args.alerts * 1000:.3f} ms/alert)")
+    print(f"speedup                      {single / bulk:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Raster change detection benchmark.
+
+Writes a stack of synthetic six-band scenes to a temporary raster store (one
+fire and one flood event in the latest scene) and times ChangeDetector.detect
+over it, reporting throughput and peak resident memory to show that memory
+stays bounded by the chunk size rather than the scene size.
+
+    python benchmarks/bench_change_detection.py [--size 10000] [--scenes 4]
+"""
+import argparse
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from change_detection import ChangeDetector
+from raster_store import BAND_INDEX, RasterTileStore, RegionGrid
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_scene(store: RasterTileStore, region: str, grid: RegionGrid, acquired_at: datetime,
+                rng: np.random.Generator, events: bool):
+    """Write a scene tile by tile so generating it never holds a whole scene in memory"""
+    fire_center = (grid.height * 0.3, grid.width * 0.3)
+    flood_center = (grid.height * 0.7, grid.width * 0.6)
+    radius = grid.height * 0.05
+
+    for tile_row in range(grid.tile_rows):
+        for tile_col in range(grid.tile_cols):
+            bands, rows, cols = grid.tile_shape(tile_row, tile_col)
+            tile = np.empty((bands, rows, cols), dtype=np.float32)
+            for name, value in (('blue', 0.07), ('green', 0.1), ('red', 0.08),
+                                ('nir', 0.4), ('swir', 0.2), ('thermal', 300.0)):
+                tile[BAND_INDEX[name]] = value
+            tile[:-1] += rng.normal(0, 0.005, (bands - 1, rows, cols)).astype(np.float32)
+            tile[-1] += rng.normal(0, 0.5, (rows, cols)).astype(np.float32)
+
+            if events:
+                r = np.arange(rows)[:, None] + tile_row * grid.tile_size
+                c = np.arange(cols)[None, :] + tile_col * grid.tile_size
+                fire = (r - fire_center[0]) ** 2 + (c - fire_center[1]) ** 2 <= radius ** 2
+                flood = (r - flood_center[0]) ** 2 + (c - flood_center[1]) ** 2 <= radius ** 2
+                tile[BAND_INDEX['thermal'], fire] += 30.0
+                tile[BAND_INDEX['nir'], fire] = 0.08
+                tile[BAND_INDEX['swir'], fire] = 0.35
+                tile[BAND_INDEX['nir'], flood] = 0.03
+                tile[BAND_INDEX['green'], flood] = 0.12
+                tile[BAND_INDEX['swir'], flood] = 0.02
+
+            store.write_tile(region, acquired_at, tile_row, tile_col, tile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=4096, help='scene width and height in pixels')
+    parser.add_argument('--tile-size', type=int, default=1024)
+    parser.add_argument('--scenes', type=int, default=4, help='acquisitions in the stack (>= 2)')
+    parser.add_argument('--chunk-mb', type=int, default=64, help='working memory per chunk')
+    parser.add_argument('--store-dir', help='keep the raster store here instead of a temp dir')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    root_dir = args.store_dir or tempfile.mkdtemp(prefix='bench_raster_')
+    try:
+        store = RasterTileStore(root_dir, page_budget_bytes=args.chunk_mb * 1024 * 1024)
+        grid = store.ensure_grid('bench', RegionGrid(12.0, 13.0, 77.0, 78.0, args.size, args.size,
+                                                     args.tile_size))
+        rng = np.random.default_rng(42)
+        start_time = datetime(2024, 1, 1)
+        scene_gb = args.size * args.size * grid.bands * 4 / 1e9
+
+        start = time.perf_counter()
+        for i in range(args.scenes):
+            write_scene(store, 'bench', grid, start_time + timedelta(days=i), rng,
+                        events=i == args.scenes - 1)
+        print(f"wrote {args.scenes} scenes of {args.size}x{args.size} ({scene_gb:.2f} GB each) "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        rss_before = peak_rss_mb()
+        detector = ChangeDetector(chunk_bytes=args.chunk_mb * 1024 * 1024)
+        start = time.perf_counter()
+        result = detector.detect(store, 'bench')
+        elapsed = time.perf_counter() - start
+        megapixels = args.size * args.size / 1e6
+
+        print(f"detect                       {elapsed:8.2f} s  ({megapixels / elapsed:8.1f} Mpx/s, "
+              f"baseline scenes: {result.imagery['baseline_scenes']})")
+        print(f"peak RSS                     {peak_rss_mb():8.0f} MB  (before detect: {rss_before:.0f} MB)")
+        for change in result.change_types:
+            print(f"  {change['type']:<20} {change['area_km2']:8.2f} km2  "
+                  f"{len(change['polygons'])} polygon(s), severity {change['severity']}")
+    finally:
+        if not args.store_dir:
+            shutil.rmtree(root_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Event bus fan-out benchmark.
+
+Starts a Unix-socket event broker and N subscriber processes standing in for
+web workers, publishes bursts of Socket.IO emit messages from one more
+process, and reports end-to-end fan-out latency (publish to receipt in every
+worker) with and without batching.
+
+    python benchmarks/bench_event_bus.py [--workers 4 8 16] [--messages 2000] [--burst 50]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from event_bus import UnixSocketBroker, UnixSocketManager
+
+
+def subscriber(url: str, expected: int, ready, results):
+    manager = UnixSocketManager(url)
+    manager._connection()
+    ready.release()
+
+    latencies = []
+    for message in manager._listen():
+        latencies.append(time.time() - message['data'][0]['sent_at'])
+        if len(latencies) == expected:
+            break
+    results.put(latencies)
+
+
+def run(url: str, workers: int, messages: int, burst: int, batch_seconds: float):
+    context = multiprocessing.get_context('spawn')
+    ready = context.Semaphore(0)
+    results = context.Queue()
+    processes = [context.Process(target=subscriber, args=(url, messages, ready, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+
+    publisher = UnixSocketManager(url, batch_seconds=batch_seconds)
+    start = time.perf_counter()
+    for i in range(messages):
+        publisher._publish({'method': 'emit', 'event': 'bench', 'namespace': '/', 'room': None,
+                            'data': [{'sequence': i, 'sent_at': time.time()}], 'host_id': 'bench'})
+        if (i + 1) % burst == 0:
+            time.sleep(0.001)
+
+    publisher.flush()
+    latencies = []
+    for _ in processes:
+        latencies.extend(results.get(timeout=60))
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    publisher.close()
+
+    latencies.sort()
+    return {
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'deliveries_per_s': len(latencies) / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--messages', type=int, default=2000, help='messages published per run')
+    parser.add_argument('--burst', type=int, default=50, help='messages published back to back')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.sock')
+        broker = UnixSocketBroker(path)
+        broker.start()
+        try:
+            print(f"{'workers':>7}  {'batching':>9}  {'p50 ms':>8}  {'p99 ms':>8}  {'deliveries/s':>12}")
+            for workers in args.workers:
+                for label, batch_seconds in (('off', 0.0), ('2 ms', 0.002)):
+                    result = run(f'unix://{path}', workers, args.messages, args.burst, batch_seconds)
+                    print(f"{workers:>7}  {label:>9}  {result['p50_ms']:8.2f}  {result['p99_ms']:8.2f}  "
+                          f"{result['deliveries_per_s']:12.0f}")
+        finally:
+            broker.stop()
+
+
+if __name__ == '__main__':
+    main()
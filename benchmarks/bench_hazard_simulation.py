@@ -0,0 +1,58 @@
+"""
+Hazard spread simulation benchmark.
+
+Projects a fire and a flood threat for a region at several grid sizes with
+hazard_simulation.project_threat and reports the median time per projection
+(grid construction, population density and simulation) against the one
+second budget, along with the area each projects at the final horizon.
+
+    python benchmarks/bench_hazard_simulation.py [--sizes 256 512 1000] [--repeats 5]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from hazard_simulation import project_threat
+from records import Atmosphere, RegionBounds, Terrain, Threat
+
+BOUNDS = RegionBounds(28.4041, 28.8833, 76.8388, 77.3465)
+TERRAIN = Terrain(average_elevation=220.0, elevation_variance=30.0, slope_angle_avg=8.0, vegetation_index=0.55,
+                  water_body_coverage=0.05, urban_coverage=0.4, soil_moisture=0.5, surface_temperature=35.0)
+ATMOSPHERE = Atmosphere(visibility_km=10.0, humidity_percent=25.0, temperature_celsius=40.0, wind_speed_kmh=20.0,
+                        wind_direction_deg=270.0, precipitation_mm=40.0, atmospheric_pressure=1000.0,
+                        aerosol_optical_depth=0.3)
+BUDGET_SECONDS = 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 512, 1000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'hazard':>6}  {'grid':>9}  {'median s':>8}  {'max s':>7}  {'area km2':>8}  {'budget':>6}")
+    for hazard in ('fire', 'flood'):
+        threat = Threat(type=hazard, severity='high', confidence=0.9, title='Benchmark', description='Benchmark',
+                        model='Benchmark', latitude=28.64, longitude=77.0)
+        for size in args.sizes:
+            # The first run builds the cached terrain noise and population grid
+            project_threat(threat, 'Delhi', BOUNDS, TERRAIN, ATMOSPHERE, size=size)
+            timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                projection = project_threat(threat, 'Delhi', BOUNDS, TERRAIN, ATMOSPHERE, size=size)
+                timings.append(time.perf_counter() - start)
+            median = statistics.median(timings)
+            print(f"{hazard:>6}  {f'{size}x{size}':>9}  {median:8.3f}  {max(timings):7.3f}  "
+                  f"{projection['horizons'][-1]['area_km2']:8.2f}  {'ok' if median < BUDGET_SECONDS else 'over':>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Detection model throughput benchmark.
+
+Compares per-observation scoring (one model call per region, as the
+monitoring loop does) with batched scoring of the same observations, and
+reports end-to-end analyze_batch throughput with simulated latency disabled.
+
+    python benchmarks/bench_inference.py [--observations 10000]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ['SIMULATED_LATENCY'] = 'zero'
+
+import app  # noqa: F401  (configures models before the detector is imported)
+from ai_detector import DisasterDetectionAI
+from inference import extract_feature_matrix, load_model
+from satellite_processor import SatelliteDataProcessor
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:12,.0f} obs/s  ({seconds * 1000:8.1f} ms)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--observations', type=int, default=10000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    processor = SatelliteDataProcessor(seed=42)
+    observations = [processor.acquire(12.7, 13.1, 77.4, 77.8) for _ in range(args.observations)]
+
+    start = time.perf_counter()
+    model = load_model('v2.1.3')
+    print(f"model load (cold)            {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    start = time.perf_counter()
+    features = extract_feature_matrix(observations)
+    print(f"feature extraction           {rate(len(observations), time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    for row in features:
+        model.predict_proba(row)
+    print(f"scoring, one at a time       {rate(len(observations), time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    model.predict_proba(features)
+    print(f"scoring, batched             {rate(len(observations), time.perf_counter() - start)}")
+
+    detector = DisasterDetectionAI(seed=42)
+    start = time.perf_counter()
+    detector.analyze_batch([(observation, 'Bangalore') for observation in observations])
+    print(f"analyze_batch end-to-end     {rate(len(observations), time.perf_counter() - start)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Population exposure benchmark.
+
+Builds a synthetic population grid for a region at several cell sizes and
+times affected-population queries for random threat circles, comparing a
+per-query masked sum over every cell with the summed-area table lookups used
+by population_grid.PopulationGrid.
+
+    python benchmarks/bench_population_exposure.py [--queries 2000] [--cell-degrees 0.005 0.001 0.0005]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from population_grid import KM_PER_DEGREE, PopulationGrid
+from records import RegionBounds
+
+BOUNDS = RegionBounds(28.4041, 28.8833, 76.8388, 77.3465)
+
+
+def masked_sum(population: np.ndarray, lats: np.ndarray, lons: np.ndarray,
+               latitude: float, longitude: float, radius_km: float) -> float:
+    distance = np.hypot((lats - latitude) * KM_PER_DEGREE,
+                        (lons - longitude) * KM_PER_DEGREE * math.cos(math.radians(latitude)))
+    return float(population[distance <= radius_km].sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--cell-degrees', type=float, nargs='+', default=[0.005, 0.001, 0.0005])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    queries = np.column_stack([
+        rng.uniform(BOUNDS.min_latitude, BOUNDS.max_latitude, args.queries),
+        rng.uniform(BOUNDS.min_longitude, BOUNDS.max_longitude, args.queries),
+        rng.choice([1.5, 5.0, 8.0, 25.0], args.queries)
+    ])
+
+    print(f"{'cells':>10}  {'masked us/query':>15}  {'table us/query':>14}  {'speedup':>8}  {'max rel error':>13}")
+    for cell_degrees in args.cell_degrees:
+        grid = PopulationGrid.synthetic('Delhi', BOUNDS, 30000000, cell_degrees)
+        population = np.diff(np.diff(grid._table, axis=0), axis=1)
+        rows, cols = np.mgrid[0:grid.rows, 0:grid.cols]
+        lats = grid.max_lat - (rows + 0.5) * grid.lat_step
+        lons = grid.min_lon + (cols + 0.5) * grid.lon_step
+
+        # The masked sum is slow on fine grids; time a sample of the queries
+        sample = queries[:max(1, min(len(queries), 200_000_000 // population.size))]
+        start = time.perf_counter()
+        expected = [masked_sum(population, lats, lons, *query) for query in sample]
+        masked = (time.perf_counter() - start) / len(sample)
+
+        start = time.perf_counter()
+        for query in queries:
+            grid.circle_population(*query)
+        table = (time.perf_counter() - start) / len(queries)
+
+        errors = [abs(grid.circle_population(*query) - value) / value
+                  for query, value in zip(sample, expected) if value > 0]
+        print(f"{population.size:>10}  {masked * 1e6:15.1f}  {table * 1e6:14.1f}  {masked / table:7.1f}x  "
+              f"{max(errors, default=0.0):13.4f}")
+
+
+if __name__ == '__main__':
+    main()
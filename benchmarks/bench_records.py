@@ -0,0 +1,69 @@
+"""
+Payload representation benchmark.
+
+Measures memory held and time spent for thousands of in-flight observations
+and analysis results in record form (slotted dataclasses) versus the
+equivalent nested dicts, and the cost of converting between the two.
+
+    python benchmarks/bench_records.py [--observations 10000]
+"""
+import argparse
+import logging
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ['SIMULATED_LATENCY'] = 'zero'
+
+import app  # noqa: F401  (configures models before the detector is imported)
+from ai_detector import DisasterDetectionAI
+from records import SatelliteObservation
+from satellite_processor import SatelliteDataProcessor
+
+
+def measure(label: str, build):
+    """Time ``build`` untraced, then build again under tracemalloc to measure what it retains"""
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {size / 1e6:8.1f} MB  {elapsed * 1000:8.1f} ms")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--observations', type=int, default=10000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    processor = SatelliteDataProcessor(seed=42)
+    detector = DisasterDetectionAI(seed=42)
+    count = args.observations
+
+    records = measure('observations as records', lambda: [
+        processor.acquire(12.7, 13.1, 77.4, 77.8) for _ in range(count)])
+    dicts = measure('observations as dicts', lambda: [
+        processor.get_region_data(12.7, 13.1, 77.4, 77.8) for _ in range(count)])
+    measure('dict -> record conversion', lambda: [SatelliteObservation.from_dict(d) for d in dicts])
+    measure('record -> dict conversion', lambda: [r.to_dict() for r in records])
+
+    results = measure('analysis results as records', lambda: detector.analyze_batch(
+        [(record, 'Bangalore') for record in records]))
+    result_dicts = measure('analysis results as dicts', lambda: [
+        detector.analyze_region_data(d, 'Bangalore') for d in dicts])
+
+    print(f"{'pickled results (record / dict)':<34} "
+          f"{len(pickle.dumps(results)) / count:8.0f} B / {len(pickle.dumps(result_dicts)) / count:.0f} B each")
+
+
+if __name__ == '__main__':
+    main()
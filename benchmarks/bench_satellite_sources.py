@@ -0,0 +1,78 @@
+"""
+Satellite source fetch benchmark.
+
+Runs acquisitions through satellite_sources.SourceFetcher against local
+fake sources with heavy-tailed delays (most fetches fast, a few very slow)
+and one flaky source, with hedging off and on. Reports acquisition latency
+percentiles, the extra requests hedging costs and the share of
+acquisitions that found the flaky source's circuit open.
+
+    python benchmarks/bench_satellite_sources.py [--acquisitions 400] [--fast 0.02] [--slow 0.5] [--slow-rate 0.02]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from records import RegionBounds
+from satellite_sources import CircuitBreaker, FakeSource, SourceFetcher
+
+BOUNDS = RegionBounds(28.4041, 28.8833, 76.8388, 77.3465)
+
+
+def make_sources(args, seed: int):
+    rng = random.Random(seed)
+
+    def delays():
+        return [args.slow if rng.random() < args.slow_rate else args.fast * rng.uniform(0.8, 1.2)
+                for _ in range(997)]
+
+    return [FakeSource('Sentinel-2', delays=delays()),
+            FakeSource('Landsat-8', delays=delays(), failure_rate=args.failure_rate, rng=random.Random(seed)),
+            FakeSource('MODIS', delays=delays()),
+            FakeSource('Sentinel-1', delays=delays())]
+
+
+def percentile(samples, q):
+    return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--acquisitions', type=int, default=400)
+    parser.add_argument('--fast', type=float, default=0.02)
+    parser.add_argument('--slow', type=float, default=0.5)
+    parser.add_argument('--slow-rate', type=float, default=0.02)
+    parser.add_argument('--failure-rate', type=float, default=0.2)
+    parser.add_argument('--timeout', type=float, default=1.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'hedging':>7}  {'p50 ms':>7}  {'p95 ms':>7}  {'p99 ms':>7}  {'max ms':>7}  "
+          f"{'requests/acq':>12}  {'circuit open':>12}")
+    for hedging in (False, True):
+        sources = make_sources(args, seed=5)
+        breakers = {source.name: CircuitBreaker(failure_threshold=3, reset_seconds=0.5) for source in sources}
+        fetcher = SourceFetcher(sources, timeout=args.timeout, required=2, hedging=hedging, breakers=breakers)
+
+        timings = []
+        open_checks = 0
+        for _ in range(args.acquisitions):
+            open_checks += breakers['Landsat-8'].state != CircuitBreaker.CLOSED
+            start = time.perf_counter()
+            fetcher.fetch(BOUNDS)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        requests = sum(source.calls for source in sources) / args.acquisitions
+        print(f"{'on' if hedging else 'off':>7}  {percentile(timings, 0.5) * 1000:7.1f}  "
+              f"{percentile(timings, 0.95) * 1000:7.1f}  {percentile(timings, 0.99) * 1000:7.1f}  "
+              f"{timings[-1] * 1000:7.1f}  {requests:12.2f}  {open_checks / args.acquisitions:12.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Region screening benchmark.
+
+Runs simulated monitoring cycles over a set of regions, screening each with
+a quick look and the RegionScreener, and fully analyzing every region anyway
+to know which skips missed a threat. Reports the skip ratio, audits, true
+screening misses (threats in skipped regions, by type) and the modelled time per
+cycle with and without screening, using each stage's mean default latency.
+
+    python benchmarks/bench_screening.py [--regions 50] [--cycles 40] [--audit-rate 0.1] [--max-skip-streak 3]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app  # noqa: F401  (screening imports models, which need the app's db)
+from ai_detector import DisasterDetectionAI
+from latency import ZeroLatency
+from satellite_processor import SatelliteDataProcessor
+from screening import RegionScreener
+
+# Mean of each stage's default simulated latency range, in seconds
+SCREENING_SECONDS = (0.05 + 0.2) / 2
+ACQUISITION_SECONDS = (0.5 + 2.0) / 2
+ANALYSIS_SECONDS = (1.0 + 3.0) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--regions', type=int, default=50)
+    parser.add_argument('--cycles', type=int, default=40)
+    parser.add_argument('--audit-rate', type=float, default=0.1)
+    parser.add_argument('--max-skip-streak', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = random.Random(7)
+    regions = []
+    for region_id in range(args.regions):
+        lat, lon = rng.uniform(8.0, 33.0), rng.uniform(69.0, 88.0)
+        regions.append((region_id, f'Region {region_id}', (lat, lat + 0.5, lon, lon + 0.5)))
+
+    processor = SatelliteDataProcessor(latency=ZeroLatency(), screening_latency=ZeroLatency(), rng=random.Random(1))
+    detector = DisasterDetectionAI(latency=ZeroLatency(), rng=random.Random(2))
+    screener = RegionScreener(audit_rate=args.audit_rate, max_skip_streak=args.max_skip_streak,
+                              rng=random.Random(3))
+
+    decisions = Counter()
+    threats = Counter()
+    missed_types = Counter()
+    analyzed = 0
+    start = time.perf_counter()
+    for _ in range(args.cycles):
+        for region_id, name, bounds in regions:
+            quick_look = processor.screen(*bounds)
+            decision = screener.decide(region_id, quick_look)
+            decisions['analyze' if decision.analyze else 'skip'] += 1
+            analyzed += decision.analyze
+
+            # Analyze every region regardless, to find what the skips missed
+            result = detector.analyze_observation(processor.acquire(*bounds, atmosphere=quick_look.atmospheric_conditions),
+                                                  name)
+            if not result.threats:
+                continue
+            if not decision.analyze:
+                threats['missed'] += 1
+                missed_types.update(threat.type for threat in result.threats)
+            elif decision.audited:
+                threats['audited'] += 1
+            else:
+                threats['triggered'] += 1
+    elapsed = time.perf_counter() - start
+
+    total = args.regions * args.cycles
+    full_cycle = args.regions * (ACQUISITION_SECONDS + ANALYSIS_SECONDS)
+    screened_cycle = (total * SCREENING_SECONDS + analyzed * (ACQUISITION_SECONDS + ANALYSIS_SECONDS)) / args.cycles
+    found = sum(threats.values())
+    print(f"regions x cycles      {args.regions} x {args.cycles} ({elapsed:.1f}s to simulate)")
+    print(f"skip ratio            {decisions['skip'] / total:.1%}")
+    print(f"regions with threats  {found} ({threats['triggered']} triggered, {threats['audited']} caught by audit, "
+          f"{threats['missed']} missed)")
+    print(f"miss rate             {threats['missed'] / found if found else 0.0:.1%} of threatened region-cycles")
+    print(f"missed threat types   {', '.join(f'{kind} {count}' for kind, count in missed_types.most_common()) or '-'}")
+    print(f"modelled s/cycle      {full_cycle:.1f} full, {screened_cycle:.1f} screened "
+          f"({1 - screened_cycle / full_cycle:.1%} saved)")
+
+
+if __name__ == '__main__':
+    main()
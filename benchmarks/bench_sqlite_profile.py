@@ -0,0 +1,137 @@
+"""
+SQLite profile mixed-load benchmark.
+
+Runs reader threads (recent-alert queries) alongside writer threads (an alert
+insert plus a monitoring status update per write) against a temporary SQLite
+database, once with the default rollback journal and concurrent writers
+(SQLITE_PROFILE=off) and once with the WAL profile and single writer thread,
+and reports throughput, latency and "database is locked" failures.
+
+    python benchmarks/bench_sqlite_profile.py [--readers 8] [--writers 4] [--seconds 10]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_load(readers: int, writers: int, seconds: float) -> dict:
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import desc, update
+    from app import app, db, init_database
+    from models import Alert, AlertSeverity, AlertStatus, DisasterType, MonitoringStatus, Region
+    from sqlite_profile import sqlite_writer
+
+    init_database()
+    logging.disable(logging.WARNING)
+    with app.app_context():
+        region_ids = [region_id for (region_id,) in db.session.query(Region.id).all()]
+
+    deadline = time.perf_counter() + seconds
+    results = {'read': [], 'write': [], 'read_errors': 0, 'write_errors': 0, 'locked': 0}
+    lock = threading.Lock()
+
+    def record(kind: str, started: float, error: Exception = None):
+        with lock:
+            if error is None:
+                results[kind].append(time.perf_counter() - started)
+            else:
+                results[f'{kind}_errors'] += 1
+                if 'locked' in str(error):
+                    results['locked'] += 1
+
+    def write(sequence: int):
+        region_id = region_ids[sequence % len(region_ids)]
+        db.session.add(Alert(region_id=region_id, disaster_type=DisasterType.FLOOD, severity=AlertSeverity.LOW,
+                             title=f'Bench write {sequence}', confidence_score=0.5))
+        db.session.execute(update(MonitoringStatus).where(MonitoringStatus.region_id == region_id)
+                           .values(anomalies_detected=sequence))
+
+    def reader():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            with app.app_context():
+                try:
+                    Alert.query.filter(Alert.status.in_([AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED]))\
+                        .order_by(desc(Alert.detected_at)).limit(50).all()
+                    record('read', started)
+                except Exception as e:
+                    db.session.rollback()
+                    record('read', started, e)
+
+    def writer(offset: int):
+        sequence = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            with app.app_context():
+                try:
+                    sqlite_writer.run_write(write, sequence)
+                    record('write', started)
+                except Exception as e:
+                    record('write', started, e)
+            sequence += writers
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sqlite_writer.stop()
+
+    return {
+        'reads_per_s': len(results['read']) / seconds,
+        'read_p99_ms': percentile(results['read'], 0.99) * 1000,
+        'writes_per_s': len(results['write']) / seconds,
+        'write_p50_ms': (statistics.median(results['write']) if results['write'] else 0.0) * 1000,
+        'write_p99_ms': percentile(results['write'], 0.99) * 1000,
+        'errors': results['read_errors'] + results['write_errors'],
+        'locked': results['locked']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_load(args.readers, args.writers, args.seconds)))
+        return
+
+    print(f"{'profile':>8}  {'reads/s':>8}  {'read p99':>9}  {'writes/s':>8}  {'write p50':>9}  "
+          f"{'write p99':>9}  {'errors':>6}  {'locked':>6}")
+    for label, profile in (('default', 'off'), ('wal', 'on')):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SQLITE_PROFILE=profile, SIMULATED_LATENCY='zero',
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', '--readers', str(args.readers),
+                 '--writers', str(args.writers), '--seconds', str(args.seconds)],
+                env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:>8}  {result['reads_per_s']:8.0f}  {result['read_p99_ms']:7.1f}ms  "
+              f"{result['writes_per_s']:8.0f}  {result['write_p50_ms']:7.1f}ms  {result['write_p99_ms']:7.1f}ms  "
+              f"{result['errors']:6d}  {result['locked']:6d}")
+
+
+if __name__ == '__main__':
+    main()
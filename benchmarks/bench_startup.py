@@ -0,0 +1,53 @@
+"""
+Worker startup benchmark.
+
+Measures how long a fresh interpreter takes to import the application (what
+every gunicorn worker and autoscaled instance pays on boot), and separately
+the one-shot ``init_database`` step that used to run on every import.
+
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_subprocess(code: str, env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def report(label: str, samples):
+    print(f"{label:<32} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        # Baseline interpreter start, to separate Python's own cost from ours
+        baseline = [time_subprocess('pass', env) for _ in range(args.runs)]
+        init = [time_subprocess('from app import init_database; init_database()', env)
+                for _ in range(args.runs)]
+        boot = [time_subprocess('import main', env) for _ in range(args.runs)]
+
+    report('interpreter only', baseline)
+    report('worker boot (import main)', boot)
+    report('init-db (one-shot)', init)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from raster_store import BAND_INDEX, RasterTileStore, RegionGrid
+from records import ChangeDetection
+import metrics
+
+CHANGE_DETECTION_SECONDS = metrics.histogram(
+    'change_detection_duration_seconds',
+    'Time to run raster change detection over one region')
+CHANGE_DETECTION_PIXELS = metrics.counter(
+    'change_detection_pixels',
+    'Pixels processed by raster change detection')
+
+# Bands read per scene
+_BANDS = ['blue', 'green', 'red', 'nir', 'swir', 'thermal']
+_BAND_POSITIONS = [BAND_INDEX[name] for name in _BANDS]
+
+# Per-pixel indices compared between scenes and against the rolling baseline
+_INDICES = ('ndvi', 'ndwi', 'thermal', 'blue')
+
+# Open water absorbs shortwave infrared; burn scars (which also raise NDWI) reflect it
+WATER_MAX_SWIR = 0.1
+
+CHANGE_TYPES = ('vegetation_loss', 'water_level_change', 'thermal_anomaly', 'smoke_detection')
+
+
+def _block_counts(mask: np.ndarray, block_size: int) -> np.ndarray:
+    """Count set pixels per block_size x block_size block (edges padded with False)"""
+    rows, cols = mask.shape
+    pad_rows, pad_cols = -rows % block_size, -cols % block_size
+    if pad_rows or pad_cols:
+        mask = np.pad(mask, ((0, pad_rows), (0, pad_cols)))
+    return mask.reshape(mask.shape[0] // block_size, block_size,
+                        mask.shape[1] // block_size, block_size).sum(axis=(1, 3), dtype=np.int32)
+
+
+def _label_components(active: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """8-connected components of a boolean block grid, as lists of (row, col) cells"""
+    seen = np.zeros_like(active, dtype=bool)
+    rows, cols = active.shape
+    components = []
+    for start in zip(*np.nonzero(active)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        component = []
+        stack = [start]
+        while stack:
+            r, c = stack.pop()
+            component.append((r, c))
+            for nr in (r - 1, r, r + 1):
+                for nc in (c - 1, c, c + 1):
+                    if 0 <= nr < rows and 0 <= nc < cols and active[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+        components.append(component)
+    return components
+
+
+class ChangeDetector:
+    """
+    Change detection over a region's stack of acquisitions in the raster store.
+
+    The latest scene is compared with the previous one (NDVI loss, NDWI gain,
+    thermal rise, visible-band brightening from smoke) and, once enough history
+    exists, each change must also be a significant per-pixel z-score against a
+    rolling baseline of earlier scenes. Scenes are processed in row chunks sized
+    to ``chunk_bytes`` so memory stays bounded regardless of scene size. Changed
+    pixels are counted on a coarse block grid whose connected components become
+    the reported change polygons.
+    """
+
+    def __init__(self, ndvi_threshold: float = 0.2, ndwi_threshold: float = 0.2,
+                 thermal_delta_k: float = 10.0, thermal_absolute_k: float = 330.0,
+                 smoke_threshold: float = 0.04, z_threshold: float = 3.0,
+                 baseline_size: int = 6, min_baseline: int = 3, block_size: int = 16,
+                 min_block_fraction: float = 0.25, min_polygon_km2: float = 0.05,
+                 max_polygons: int = 20, chunk_bytes: int = 64 * 1024 * 1024):
+        self.ndvi_threshold = ndvi_threshold
+        self.ndwi_threshold = ndwi_threshold
+        self.thermal_delta_k = thermal_delta_k
+        self.thermal_absolute_k = thermal_absolute_k
+        self.smoke_threshold = smoke_threshold
+        self.z_threshold = z_threshold
+        self.baseline_size = baseline_size
+        self.min_baseline = min_baseline
+        self.block_size = block_size
+        self.min_block_fraction = min_block_fraction
+        self.min_polygon_km2 = min_polygon_km2
+        self.max_polygons = max_polygons
+        self.chunk_bytes = chunk_bytes
+
+    def _chunk_rows(self, grid: RegionGrid) -> int:
+        # Roughly 40 float32 rows of working arrays are alive per pixel row in a chunk
+        rows = self.chunk_bytes // (grid.width * 4 * 40)
+        return max(self.block_size, rows // self.block_size * self.block_size)
+
+    @staticmethod
+    def _indices(window: np.ndarray) -> Dict[str, np.ndarray]:
+        blue, green, red, nir, swir, thermal = window
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'ndvi': (nir - red) / (nir + red),
+                'ndwi': (green - nir) / (green + nir),
+                'thermal': thermal,
+                'blue': blue,
+                'swir': swir
+            }
+
+    def _read(self, store: RasterTileStore, region: str, acquired_at: datetime,
+              row0: int, row1: int, width: int) -> Dict[str, np.ndarray]:
+        window = store.read_window(region, acquired_at, row0, row1, 0, width, _BAND_POSITIONS)
+        return self._indices(np.asarray(window, dtype=np.float32))
+
+    @CHANGE_DETECTION_SECONDS.time()
+    def detect(self, store: RasterTileStore, region: str,
+               acquisitions: Optional[Sequence[datetime]] = None) -> Optional[ChangeDetection]:
+        """
+        Detect changes in the region's latest acquisition, or return None if
+        fewer than two acquisitions are stored.
+        """
+        acquisitions = list(acquisitions if acquisitions is not None else store.acquisitions(region))
+        if len(acquisitions) < 2:
+            return None
+
+        grid = store.get_grid(region)
+        current, previous = acquisitions[-1], acquisitions[-2]
+        baseline = acquisitions[:-1][-self.baseline_size:]
+        use_baseline = len(baseline) >= self.min_baseline
+
+        block_counts = {change_type: [] for change_type in CHANGE_TYPES}
+        anomalous_pixels = 0
+        magnitude_sum = 0.0
+        ndvi_delta_sum = 0.0
+        valid_pixels = 0
+
+        chunk_rows = self._chunk_rows(grid)
+        for row0 in range(0, grid.height, chunk_rows):
+            row1 = min(row0 + chunk_rows, grid.height)
+            now = self._read(store, region, current, row0, row1, grid.width)
+            before = self._read(store, region, previous, row0, row1, grid.width)
+            delta = {name: now[name] - before[name] for name in _INDICES}
+
+            if use_baseline:
+                significant = self._baseline_significance(store, region, baseline, row0, row1,
+                                                          grid.width, now, before)
+            else:
+                significant = {name: True for name in _INDICES}
+
+            water_gain = ((delta['ndwi'] > self.ndwi_threshold) & (now['swir'] < WATER_MAX_SWIR)
+                          & significant['ndwi'])
+            masks = {
+                'water_level_change': water_gain,
+                'vegetation_loss': (delta['ndvi'] < -self.ndvi_threshold) & significant['ndvi'] & ~water_gain,
+                'thermal_anomaly': ((delta['thermal'] > self.thermal_delta_k)
+                                    | (now['thermal'] > self.thermal_absolute_k)) & significant['thermal'],
+                'smoke_detection': (delta['blue'] > self.smoke_threshold) & significant['blue'],
+            }
+            for change_type, mask in masks.items():
+                block_counts[change_type].append(_block_counts(mask, self.block_size))
+
+            changed = np.logical_or.reduce(list(masks.values()))
+            anomalous_pixels += int(np.count_nonzero(changed))
+            valid = np.isfinite(delta['ndvi'])
+            valid_pixels += int(np.count_nonzero(valid))
+            magnitude_sum += float(np.abs(delta['ndvi'][valid]).sum())
+            ndvi_delta_sum += float(delta['ndvi'][valid].sum())
+
+        CHANGE_DETECTION_PIXELS.inc(grid.height * grid.width)
+
+        change_types = []
+        polygon_count = 0
+        changed_area = 0.0
+        for change_type in CHANGE_TYPES:
+            polygons = self._polygons(grid, np.vstack(block_counts[change_type]))
+            if not polygons:
+                continue
+            area = sum(polygon['area_km2'] for polygon in polygons)
+            polygon_count += len(polygons)
+            changed_area += area
+            change_types.append({
+                'type': change_type,
+                'severity': self._severity(area),
+                'area_km2': area,
+                'polygons': polygons[:self.max_polygons]
+            })
+
+        total_pixels = grid.height * grid.width
+        changed_fraction = anomalous_pixels / total_pixels
+        ndvi_delta = ndvi_delta_sum / valid_pixels if valid_pixels else 0.0
+        if abs(ndvi_delta) < 0.005:
+            trend = 'stable'
+        else:
+            trend = 'increasing' if ndvi_delta > 0 else 'decreasing'
+
+        return ChangeDetection(
+            temporal_comparison_days=max((current - previous).days, 1),
+            significant_changes_detected=polygon_count,
+            change_types=change_types,
+            change_confidence=min(0.95, (0.75 if use_baseline else 0.6) + changed_fraction * 5),
+            anomaly_score=min(1.0, changed_fraction * 20),
+            trend_direction=trend,
+            change_magnitude=magnitude_sum / valid_pixels if valid_pixels else 0.0,
+            changed_area_km2=changed_area,
+            imagery={
+                'before': previous.isoformat(),
+                'after': current.isoformat(),
+                'baseline_scenes': len(baseline) if use_baseline else 0,
+                'pixels_compared': total_pixels
+            }
+        )
+
+    def _baseline_significance(self, store: RasterTileStore, region: str, baseline: List[datetime],
+                               row0: int, row1: int, width: int, now: Dict[str, np.ndarray],
+                               previous: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """|z| > threshold of the current scene against the baseline's per-pixel mean and std"""
+        sums = {name: np.zeros_like(now[name]) for name in _INDICES}
+        squares = {name: np.zeros_like(now[name]) for name in _INDICES}
+        for acquired_at in baseline:
+            # The previous scene closes the baseline and is already in memory
+            scene = previous if acquired_at == baseline[-1] else \
+                self._read(store, region, acquired_at, row0, row1, width)
+            for name in _INDICES:
+                sums[name] += scene[name]
+                squares[name] += scene[name] * scene[name]
+
+        count = len(baseline)
+        significant = {}
+        for name in _INDICES:
+            mean = sums[name]
+            mean /= count
+            variance = squares[name]
+            variance /= count
+            variance -= mean * mean
+            # Floor the spread so perfectly stable pixels do not turn noise into infinite z-scores
+            floor = np.float32(0.5 if name == 'thermal' else 0.01)
+            std = np.sqrt(np.maximum(variance, floor * floor, out=variance), out=variance)
+            significant[name] = np.abs(now[name] - mean) > self.z_threshold * std
+        return significant
+
+    def _polygons(self, grid: RegionGrid, counts: np.ndarray) -> List[Dict[str, Any]]:
+        """Connected regions of the block grid as bounding-box polygons, largest first"""
+        active = counts >= self.min_block_fraction * self.block_size * self.block_size
+        pixel_area = grid.pixel_area_km2
+        polygons = []
+        for component in _label_components(active):
+            cells = np.array(component)
+            weights = counts[cells[:, 0], cells[:, 1]].astype(np.float64)
+            area = float(weights.sum()) * pixel_area
+            if area < self.min_polygon_km2:
+                continue
+
+            size = self.block_size
+            row0, col0 = cells.min(axis=0) * size
+            row1, col1 = (cells.max(axis=0) + 1) * size
+            bbox = grid.window_to_bbox(int(row0), min(int(row1), grid.height),
+                                       int(col0), min(int(col1), grid.width))
+            center_row = (weights @ cells[:, 0] / weights.sum() + 0.5) * size
+            center_col = (weights @ cells[:, 1] / weights.sum() + 0.5) * size
+            lat_step = (grid.max_lat - grid.min_lat) / grid.height
+            lon_step = (grid.max_lon - grid.min_lon) / grid.width
+
+            polygons.append({
+                'area_km2': area,
+                'centroid': {'latitude': float(grid.max_lat - center_row * lat_step),
+                             'longitude': float(grid.min_lon + center_col * lon_step)},
+                'bbox': bbox,
+                # GeoJSON-style closed ring of [longitude, latitude] pairs
+                'polygon': [[bbox['min_longitude'], bbox['min_latitude']],
+                            [bbox['max_longitude'], bbox['min_latitude']],
+                            [bbox['max_longitude'], bbox['max_latitude']],
+                            [bbox['min_longitude'], bbox['max_latitude']],
+                            [bbox['min_longitude'], bbox['min_latitude']]]
+            })
+
+        polygons.sort(key=lambda polygon: polygon['area_km2'], reverse=True)
+        return polygons
+
+    @staticmethod
+    def _severity(area_km2: float) -> str:
+        if area_km2 >= 50:
+            return 'critical'
+        elif area_km2 >= 10:
+            return 'high'
+        elif area_km2 >= 1:
+            return 'medium'
+        return 'low'
+
+
+change_detector = ChangeDetector()
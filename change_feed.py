@@ -0,0 +1,231 @@
+import json
+import bisect
+import weakref
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, event, func, inspect, update
+from sqlalchemy.orm import Session
+
+from app import db
+from models import ChangeLogEntry, ChangeSequence
+from realtime import emit_event
+import metrics
+
+DEFAULT_RING_CAPACITY = 2000
+MAX_CHANGES_PER_RESPONSE = 500
+CHANGE_LOG_RETENTION_HOURS = 48
+
+CHANGE_FEED_READS = metrics.counter(
+    'change_feed_reads',
+    'Change feed delta requests by where they were served from',
+    ('source',))
+
+# Session.info key of the entries recorded in the current transaction
+PENDING_ENTRIES_KEY = 'change_feed_pending'
+# Session.info key of the pending entry count when each open savepoint began
+SAVEPOINT_MARKS_KEY = 'change_feed_savepoints'
+
+# A recorded change awaiting commit; the entry's sequence number is assigned as it commits
+PendingChange = namedtuple('PendingChange', ['entry', 'event', 'payload', 'created_at'])
+
+
+class ChangeFeed:
+    """
+    Monotonically sequenced feed of alert and monitoring-status changes, so a
+    reconnecting client can fetch just the events it missed. Each change is
+    written to ChangeLogEntry in the same transaction as the change itself
+    (``record``) and, once committed, emitted with its sequence number and kept
+    in a bounded in-memory ring (``publish``). Reads are served from the ring
+    when it holds every change after ``since``; otherwise, such as after a
+    restart or for changes published by another worker, from the database.
+
+    Sequence numbers are taken from the ChangeSequence row just before the
+    transaction commits, not when its entries are flushed. The row stays
+    locked until the commit, so numbers are handed out in commit order: once
+    a reader sees a sequence number, every lower one is already visible.
+    Rolling back a savepoint discards only the changes recorded inside it.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY):
+        self.capacity = capacity
+        self._seqs: List[int] = []
+        self._changes: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, event: str, payload: Dict[str, Any]) -> PendingChange:
+        """Add a change to the current session; commit it with the change it describes"""
+        created_at = datetime.utcnow()
+        entry = ChangeLogEntry(event=event, payload=json.dumps(payload), created_at=created_at)
+        session = db.session()
+        if session.get_transaction() is None:
+            # Begin explicitly so a rollback before anything is flushed still discards the entry
+            session.begin()
+        session.info.setdefault(PENDING_ENTRIES_KEY, []).append(entry)
+        return PendingChange(entry, event, payload, created_at)
+
+    def ensure_sequence(self):
+        """Create the sequence row, continuing from any logged changes, if it does not exist yet"""
+        if db.session.get(ChangeSequence, 1) is None:
+            latest = db.session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+            db.session.add(ChangeSequence(id=1, value=latest))
+            db.session.commit()
+
+    def publish(self, pending: Iterable[PendingChange]):
+        """Emit committed changes with their sequence numbers and keep them for replay"""
+        for change in pending:
+            # The identity key survives commit expiry, so this does not reload the row
+            seq = inspect(change.entry).identity[0]
+            self._remember([self._to_change(seq, change.event, change.payload, change.created_at)])
+            emit_event(change.event, dict(change.payload, seq=seq))
+
+    def emit(self, event: str, payload: Dict[str, Any]):
+        """Record, commit and publish one change for callers with nothing else to commit"""
+        change = self.record(event, payload)
+        db.session.commit()
+        self.publish([change])
+
+    @staticmethod
+    def _to_change(seq: int, event: str, payload: Dict[str, Any], created_at: Optional[datetime]) -> Dict[str, Any]:
+        return {
+            'seq': seq,
+            'event': event,
+            'payload': payload,
+            'created_at': created_at.isoformat() if created_at else None
+        }
+
+    def _remember(self, changes: List[Dict[str, Any]]):
+        with self._lock:
+            for change in changes:
+                index = bisect.bisect_left(self._seqs, change['seq'])
+                if index < len(self._seqs) and self._seqs[index] == change['seq']:
+                    continue
+                # Concurrent publishers can commit slightly out of order
+                self._seqs.insert(index, change['seq'])
+                self._changes.insert(index, change)
+            overflow = len(self._seqs) - self.capacity
+            if overflow > 0:
+                del self._seqs[:overflow]
+                del self._changes[:overflow]
+
+    def _from_ring(self, since: int, latest: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Changes after ``since`` if the ring holds all of them without gaps, else None"""
+        with self._lock:
+            index = bisect.bisect_right(self._seqs, since)
+            changes = self._changes[index:index + limit]
+        expected = since + 1
+        for change in changes:
+            if change['seq'] != expected:
+                return None
+            expected += 1
+        if expected - 1 < min(latest, since + limit):
+            return None
+        return changes
+
+    def changes_since(self, since: Optional[int], limit: int = MAX_CHANGES_PER_RESPONSE) -> Dict[str, Any]:
+        """
+        Changes with a sequence number above ``since``, oldest first. ``reset``
+        is set when ``since`` predates the retained log (the client should
+        reload); ``has_more`` when more than ``limit`` changes are pending.
+        """
+        latest = db.session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+        if since is None or since >= latest:
+            return {'latest': latest, 'changes': [], 'reset': False, 'has_more': False}
+
+        changes = self._from_ring(since, latest, limit)
+        if changes is not None:
+            CHANGE_FEED_READS.labels(source='ring').inc()
+        else:
+            CHANGE_FEED_READS.labels(source='database').inc()
+            oldest = db.session.query(func.min(ChangeLogEntry.id)).scalar()
+            if oldest is not None and since + 1 < oldest:
+                return {'latest': latest, 'changes': [], 'reset': True, 'has_more': False}
+            rows = ChangeLogEntry.query.filter(ChangeLogEntry.id > since)\
+                .order_by(ChangeLogEntry.id).limit(limit).all()
+            changes = [self._to_change(row.id, row.event, json.loads(row.payload), row.created_at)
+                       for row in rows]
+            self._remember(changes)
+
+        return {
+            'latest': latest,
+            'changes': changes,
+            'reset': False,
+            'has_more': bool(changes) and changes[-1]['seq'] < latest
+        }
+
+    def prune(self, older_than_hours: int = CHANGE_LOG_RETENTION_HOURS) -> int:
+        """Delete logged changes past retention; the newest entry is kept so SQLite never reuses its id"""
+        try:
+            newest = db.session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+            deleted = db.session.execute(
+                delete(ChangeLogEntry).where(
+                    ChangeLogEntry.created_at < datetime.utcnow() - timedelta(hours=older_than_hours),
+                    ChangeLogEntry.id < newest
+                )
+            ).rowcount
+            db.session.commit()
+            if deleted:
+                logging.info(f"Pruned {deleted} change log entries")
+            return deleted
+        except Exception as e:
+            logging.error(f"Error pruning change log: {str(e)}")
+            db.session.rollback()
+            return 0
+
+
+def _allocate_sequence(session: Session, count: int) -> int:
+    """Reserve ``count`` sequence numbers and return the last; the row lock is held until commit"""
+    reserved = session.execute(
+        update(ChangeSequence).where(ChangeSequence.id == 1).values(value=ChangeSequence.value + count)
+    ).rowcount
+    if not reserved:
+        latest = session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+        session.add(ChangeSequence(id=1, value=latest + count))
+        session.flush()
+        return latest + count
+    return session.query(ChangeSequence.value).filter(ChangeSequence.id == 1).scalar()
+
+
+@event.listens_for(Session, 'before_commit')
+def _sequence_pending_changes(session: Session):
+    if session.get_nested_transaction() is not None:
+        # Releasing a savepoint fires before_commit too; sequence only at the real commit
+        return
+    session.info.pop(SAVEPOINT_MARKS_KEY, None)
+    entries = session.info.pop(PENDING_ENTRIES_KEY, None)
+    if not entries:
+        return
+    last = _allocate_sequence(session, len(entries))
+    for seq, entry in enumerate(entries, start=last - len(entries) + 1):
+        entry.id = seq
+        session.add(entry)
+
+
+@event.listens_for(Session, 'after_transaction_create')
+def _mark_savepoint(session: Session, transaction):
+    if transaction.nested:
+        # Keyed weakly by the transaction itself; ids of released savepoints are reused
+        marks = session.info.setdefault(SAVEPOINT_MARKS_KEY, weakref.WeakKeyDictionary())
+        marks[transaction] = len(session.info.get(PENDING_ENTRIES_KEY, ()))
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending_changes(session: Session, previous_transaction):
+    if previous_transaction.nested:
+        # A savepoint rollback only discards the changes recorded since the savepoint began
+        mark = session.info.get(SAVEPOINT_MARKS_KEY, {}).pop(previous_transaction, None)
+        pending = session.info.get(PENDING_ENTRIES_KEY)
+        if mark is not None and pending:
+            del pending[mark:]
+        return
+    if previous_transaction.parent is not None:
+        # A failed flush's subtransaction; the transaction around it is rolled back separately
+        return
+    session.info.pop(PENDING_ENTRIES_KEY, None)
+    session.info.pop(SAVEPOINT_MARKS_KEY, None)
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,376 @@
+import os
+import math
+import threading
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_
+
+from app import db
+from models import Alert, AlertArchive, AlertSeverity, AlertStatus, DisasterType, Incident, IncidentAlert, Region
+from change_feed import PendingChange, change_feed
+from population_grid import KM_PER_DEGREE
+import metrics
+
+# How far apart two alerts of a type may be and still be the same disaster
+LINK_DISTANCE_KM = {
+    DisasterType.FLOOD: 150.0,  # rivers carry a flood well downstream
+    DisasterType.CYCLONE: 300.0,
+    DisasterType.TSUNAMI: 300.0,
+    DisasterType.DROUGHT: 300.0,
+    DisasterType.EARTHQUAKE: 200.0,
+    DisasterType.FIRE: 40.0,
+    DisasterType.LANDSLIDE: 30.0,
+}
+DEFAULT_LINK_DISTANCE_KM = 100.0
+CORRELATION_WINDOW_HOURS = float(os.environ.get('CORRELATION_WINDOW_HOURS', 24))
+# How long an alert id skipped by a sync is retried before it is treated as rolled back
+SYNC_GAP_RETENTION = timedelta(minutes=15)
+
+OPEN_STATUSES = (AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED)
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(
+    (AlertSeverity.LOW, AlertSeverity.MEDIUM, AlertSeverity.HIGH, AlertSeverity.CRITICAL))}
+
+ALERTS_CORRELATED = metrics.counter(
+    'alerts_correlated',
+    'New alerts linked to incidents, by outcome (new_incident, joined, merged)',
+    ('outcome',))
+CORRELATION_CANDIDATES = metrics.histogram(
+    'alert_correlation_candidates',
+    'Indexed alerts within link distance of a new alert',
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100))
+
+IndexedAlert = namedtuple('IndexedAlert', ['alert_id', 'latitude', 'longitude', 'detected_at'])
+
+
+def _extend(pick, current, value):
+    return value if current is None else pick(current, value)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Equirectangular distance, accurate to well under 1% at link distances"""
+    dy = (lat2 - lat1) * KM_PER_DEGREE
+    dx = (lon2 - lon1) * KM_PER_DEGREE * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(dx, dy)
+
+
+class SpatialGridIndex:
+    """
+    Recent alert positions per disaster type, bucketed into square cells as
+    large as the type's link distance. Alerts within that distance of a point
+    lie in the cells around it, so a lookup touches a handful of cells rather
+    than every open alert.
+    """
+
+    def __init__(self, link_distance_km: Dict[DisasterType, float]):
+        self.link_distance_km = link_distance_km
+        self._cells: Dict[Tuple[DisasterType, int, int], Dict[int, IndexedAlert]] = {}
+        self._cell_of: Dict[int, Tuple[DisasterType, int, int]] = {}
+
+    def _cell_degrees(self, disaster_type: DisasterType) -> float:
+        return self.link_distance_km.get(disaster_type, DEFAULT_LINK_DISTANCE_KM) / KM_PER_DEGREE
+
+    def add(self, disaster_type: DisasterType, entry: IndexedAlert):
+        size = self._cell_degrees(disaster_type)
+        key = (disaster_type, math.floor(entry.latitude / size), math.floor(entry.longitude / size))
+        self.discard([entry.alert_id])
+        self._cells.setdefault(key, {})[entry.alert_id] = entry
+        self._cell_of[entry.alert_id] = key
+
+    def nearby(self, disaster_type: DisasterType, latitude: float, longitude: float,
+               since: datetime) -> List[Tuple[IndexedAlert, float]]:
+        """Indexed alerts detected since ``since`` within link distance, with their distances"""
+        limit = self.link_distance_km.get(disaster_type, DEFAULT_LINK_DISTANCE_KM)
+        size = self._cell_degrees(disaster_type)
+        row, col = math.floor(latitude / size), math.floor(longitude / size)
+        # A degree of longitude shrinks towards the poles, so the search widens in cells
+        poleward = min(abs(latitude) + size, 89.0)
+        span = math.ceil(1 / math.cos(math.radians(poleward)))
+
+        matches = []
+        for r in range(row - 1, row + 2):
+            for c in range(col - span, col + span + 1):
+                for entry in self._cells.get((disaster_type, r, c), {}).values():
+                    if entry.detected_at < since:
+                        continue
+                    distance = distance_km(latitude, longitude, entry.latitude, entry.longitude)
+                    if distance <= limit:
+                        matches.append((entry, distance))
+        return matches
+
+    def discard(self, alert_ids: Iterable[int]):
+        for alert_id in alert_ids:
+            key = self._cell_of.pop(alert_id, None)
+            if key is not None:
+                cell = self._cells[key]
+                del cell[alert_id]
+                if not cell:
+                    del self._cells[key]
+
+    def prune(self, before: datetime):
+        self.discard([alert_id for cell in self._cells.values()
+                      for alert_id, entry in cell.items() if entry.detected_at < before])
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+
+class IncidentCorrelator:
+    """
+    Incremental clustering of new alerts into incidents. A new alert joins the
+    incident of any open alert of the same disaster type detected within the
+    correlation window and the type's link distance. An alert that bridges
+    several incidents merges them into the oldest, and one with no match
+    starts a new incident.
+
+    Recent alerts are kept in a SpatialGridIndex, so each new alert is
+    compared only with alerts in nearby cells. The index holds committed
+    alerts only: it is warmed from the database on first use and topped up
+    before every batch with alerts above the last id seen, whichever worker
+    wrote them. Ids missing from a top-up (a transaction still open, or rolled
+    back) are retried for ``SYNC_GAP_RETENTION``. Alerts of the batch being
+    correlated are matched against each other directly and reach the index
+    through a later top-up once committed. Candidates are then checked against
+    the database, which stays the source of truth for alert status and
+    incident membership; entries for alerts since closed are dropped there.
+    """
+
+    def __init__(self, window_hours: float = CORRELATION_WINDOW_HOURS,
+                 link_distance_km: Optional[Dict[DisasterType, float]] = None):
+        self.window = timedelta(hours=window_hours)
+        self.index = SpatialGridIndex(link_distance_km or LINK_DISTANCE_KM)
+        self._loaded = False
+        self._last_id = 0
+        # Alert ids not yet visible to a sync, with when they were first missed
+        self._pending_ids: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+
+    def correlate(self, alerts: Iterable[Alert]) -> List[PendingChange]:
+        """
+        Link flushed alerts to incidents in the current session and record an
+        ``incident_updated`` change per incident touched; publish them after commit.
+        """
+        alerts = list(alerts)
+        batch_ids = [alert.id for alert in alerts]
+        alerts = [alert for alert in alerts if alert.latitude is not None and alert.longitude is not None]
+        if not alerts:
+            return []
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._sync(batch_ids)
+            self.index.prune(datetime.utcnow() - self.window)
+
+            touched: Dict[int, Incident] = {}
+            new_alert_ids: Dict[int, List[int]] = defaultdict(list)
+            merged_ids: Dict[int, List[int]] = defaultdict(list)
+            linked: List[Tuple[DisasterType, IndexedAlert]] = []
+            for alert in alerts:
+                incident, absorbed = self._link(alert, linked)
+                touched[incident.id] = incident
+                new_alert_ids[incident.id].append(alert.id)
+                for merged in absorbed:
+                    touched.pop(merged, None)
+                    merged_ids[incident.id].extend([merged] + merged_ids.pop(merged, []))
+                    new_alert_ids[incident.id].extend(new_alert_ids.pop(merged, []))
+
+            db.session.flush()
+            descriptions = describe_incidents(list(touched.values()))
+            return [change_feed.record('incident_updated', dict(
+                description,
+                new_alert_ids=new_alert_ids[description['id']],
+                merged_incident_ids=merged_ids.get(description['id'], [])
+            )) for description in descriptions]
+
+    def _link(self, alert: Alert, linked: List[Tuple[DisasterType, IndexedAlert]]) -> Tuple[Incident, List[int]]:
+        """
+        Add one alert to its incident; returns the incident and the ids of
+        incidents merged into it. ``linked`` holds the batch's alerts linked so
+        far, which are not in the index until they commit.
+        """
+        detected_at = alert.detected_at or datetime.utcnow()
+        since = detected_at - self.window
+        limit = self.index.link_distance_km.get(alert.disaster_type, DEFAULT_LINK_DISTANCE_KM)
+        candidates = self.index.nearby(alert.disaster_type, alert.latitude, alert.longitude, since)
+        for disaster_type, entry in linked:
+            if disaster_type == alert.disaster_type and entry.detected_at >= since:
+                distance = distance_km(alert.latitude, alert.longitude, entry.latitude, entry.longitude)
+                if distance <= limit:
+                    candidates.append((entry, distance))
+        CORRELATION_CANDIDATES.observe(len(candidates))
+        distances = {entry.alert_id: distance for entry, distance in candidates if entry.alert_id != alert.id}
+
+        matches = []
+        if distances:
+            matches = db.session.query(Alert, IncidentAlert.incident_id)\
+                .outerjoin(IncidentAlert, IncidentAlert.alert_id == Alert.id)\
+                .filter(Alert.id.in_(list(distances)), Alert.status.in_(OPEN_STATUSES)).all()
+            stale = set(distances) - {match.id for match, _ in matches}
+            if stale:
+                self.index.discard(stale)
+
+        incident_ids = sorted({incident_id for _, incident_id in matches if incident_id is not None})
+        absorbed = incident_ids[1:]
+        if incident_ids:
+            incident = db.session.get(Incident, incident_ids[0])
+            for other_id in absorbed:
+                self._merge(incident, db.session.get(Incident, other_id))
+            ALERTS_CORRELATED.labels(outcome='merged' if absorbed else 'joined').inc()
+        else:
+            incident = Incident(disaster_type=alert.disaster_type, severity=alert.severity,
+                                alert_count=0, estimated_affected_population=0)
+            db.session.add(incident)
+            db.session.flush()
+            ALERTS_CORRELATED.labels(outcome='new_incident').inc()
+
+        nearest = min(distances[match.id] for match, _ in matches) if matches else None
+        self._add_member(incident, alert, nearest)
+        # Open alerts from before correlation ran join the first incident they are found near
+        for match, incident_id in matches:
+            if incident_id is None:
+                self._add_member(incident, match, distances[match.id])
+
+        # Later alerts in the same batch must see this link
+        db.session.flush()
+        linked.append((alert.disaster_type, IndexedAlert(alert.id, alert.latitude, alert.longitude, detected_at)))
+        return incident, absorbed
+
+    @staticmethod
+    def _add_member(incident: Incident, alert: Alert, link_distance: Optional[float]):
+        db.session.add(IncidentAlert(incident_id=incident.id, alert_id=alert.id, region_id=alert.region_id,
+                                     link_distance_km=link_distance))
+        detected_at = alert.detected_at or datetime.utcnow()
+        incident.alert_count = (incident.alert_count or 0) + 1
+        incident.estimated_affected_population = (incident.estimated_affected_population or 0) \
+            + (alert.estimated_affected_population or 0)
+        if SEVERITY_RANK[alert.severity] > SEVERITY_RANK[incident.severity]:
+            incident.severity = alert.severity
+        incident.min_latitude = _extend(min, incident.min_latitude, alert.latitude)
+        incident.max_latitude = _extend(max, incident.max_latitude, alert.latitude)
+        incident.min_longitude = _extend(min, incident.min_longitude, alert.longitude)
+        incident.max_longitude = _extend(max, incident.max_longitude, alert.longitude)
+        incident.first_detected_at = _extend(min, incident.first_detected_at, detected_at)
+        incident.last_detected_at = _extend(max, incident.last_detected_at, detected_at)
+
+    @staticmethod
+    def _merge(incident: Incident, other: Incident):
+        """Fold ``other`` into ``incident`` and delete it"""
+        db.session.query(IncidentAlert).filter(IncidentAlert.incident_id == other.id)\
+            .update({IncidentAlert.incident_id: incident.id}, synchronize_session='fetch')
+        incident.alert_count += other.alert_count
+        incident.estimated_affected_population += other.estimated_affected_population
+        if SEVERITY_RANK[other.severity] > SEVERITY_RANK[incident.severity]:
+            incident.severity = other.severity
+        incident.min_latitude = min(incident.min_latitude, other.min_latitude)
+        incident.max_latitude = max(incident.max_latitude, other.max_latitude)
+        incident.min_longitude = min(incident.min_longitude, other.min_longitude)
+        incident.max_longitude = max(incident.max_longitude, other.max_longitude)
+        incident.first_detected_at = min(incident.first_detected_at, other.first_detected_at)
+        incident.last_detected_at = max(incident.last_detected_at, other.last_detected_at)
+        # Reload the (now empty) collection so the delete cascade leaves the moved links alone
+        db.session.expire(other, ['links'])
+        db.session.delete(other)
+
+    def _load(self):
+        """Index the open alerts detected within the correlation window"""
+        since = datetime.utcnow() - self.window
+        self._last_id = db.session.query(func.max(Alert.id)).scalar() or 0
+        rows = db.session.query(Alert.id, Alert.disaster_type, Alert.latitude, Alert.longitude, Alert.detected_at)\
+            .filter(Alert.status.in_(OPEN_STATUSES), Alert.detected_at >= since, Alert.id <= self._last_id,
+                    Alert.latitude.isnot(None), Alert.longitude.isnot(None)).all()
+        for alert_id, disaster_type, latitude, longitude, detected_at in rows:
+            self.index.add(disaster_type, IndexedAlert(alert_id, latitude, longitude, detected_at))
+        self._loaded = True
+
+    def _sync(self, batch_ids: Sequence[int]):
+        """
+        Index alerts committed since the last sync, by this or any other
+        worker. ``batch_ids`` are flushed but uncommitted in this session, so
+        they are left for a later sync rather than indexed now.
+        """
+        now = datetime.utcnow()
+        criteria = Alert.id > self._last_id
+        if self._pending_ids:
+            criteria = or_(criteria, Alert.id.in_(list(self._pending_ids)))
+        excluded = set(batch_ids)
+        rows = db.session.query(Alert.id, Alert.disaster_type, Alert.latitude, Alert.longitude,
+                                Alert.detected_at, Alert.status)\
+            .filter(criteria).order_by(Alert.id).all()
+
+        seen = set()
+        since = now - self.window
+        for alert_id, disaster_type, latitude, longitude, detected_at, status in rows:
+            if alert_id in excluded:
+                continue
+            seen.add(alert_id)
+            if (status in OPEN_STATUSES and latitude is not None and longitude is not None
+                    and detected_at is not None and detected_at >= since):
+                self.index.add(disaster_type, IndexedAlert(alert_id, latitude, longitude, detected_at))
+
+        # Ids below the newest seen may still commit; keep retrying them for a while
+        high = max([self._last_id] + [row[0] for row in rows])
+        missing = (set(range(self._last_id + 1, high + 1)) | set(self._pending_ids) | excluded) - seen
+        self._pending_ids = {alert_id: self._pending_ids.get(alert_id, now) for alert_id in missing
+                             if now - self._pending_ids.get(alert_id, now) < SYNC_GAP_RETENTION}
+        self._last_id = high
+
+
+def describe_incidents(incidents: Sequence[Incident]) -> List[Dict[str, Any]]:
+    """API form of incidents, with their regions and open alert counts looked up in two queries"""
+    if not incidents:
+        return []
+    incident_ids = [incident.id for incident in incidents]
+
+    regions = defaultdict(set)
+    for incident_id, region_name in db.session.query(IncidentAlert.incident_id, Region.name)\
+            .join(Region, Region.id == IncidentAlert.region_id)\
+            .filter(IncidentAlert.incident_id.in_(incident_ids)).distinct():
+        regions[incident_id].add(region_name)
+
+    open_alerts = dict(db.session.query(IncidentAlert.incident_id, func.count(Alert.id))
+                       .join(Alert, Alert.id == IncidentAlert.alert_id)
+                       .filter(IncidentAlert.incident_id.in_(incident_ids), Alert.status.in_(OPEN_STATUSES))
+                       .group_by(IncidentAlert.incident_id).all())
+
+    return [{
+        'id': incident.id,
+        'disaster_type': incident.disaster_type.value,
+        'severity': incident.severity.value,
+        'alert_count': incident.alert_count,
+        'open_alerts': open_alerts.get(incident.id, 0),
+        'regions': sorted(regions[incident.id]),
+        'estimated_affected_population': incident.estimated_affected_population,
+        'bounds': {
+            'min_latitude': incident.min_latitude,
+            'max_latitude': incident.max_latitude,
+            'min_longitude': incident.min_longitude,
+            'max_longitude': incident.max_longitude
+        },
+        'first_detected_at': incident.first_detected_at.isoformat() if incident.first_detected_at else None,
+        'last_detected_at': incident.last_detected_at.isoformat() if incident.last_detected_at else None
+    } for incident in incidents]
+
+
+def incident_alerts(incident: Incident) -> List[Dict[str, Any]]:
+    """Alerts of an incident, including any already archived, oldest first"""
+    links = {link.alert_id: link for link in incident.links}
+    alerts = Alert.query.filter(Alert.id.in_(list(links))).all()
+    alerts += AlertArchive.query.filter(AlertArchive.id.in_(list(links))).all()
+    alerts.sort(key=lambda alert: alert.detected_at or datetime.min)
+    return [{
+        'id': alert.id,
+        'region': links[alert.id].region.name,
+        'title': alert.title,
+        'severity': alert.severity.value,
+        'status': alert.status.value,
+        'latitude': alert.latitude,
+        'longitude': alert.longitude,
+        'detected_at': alert.detected_at.isoformat() if alert.detected_at else None,
+        'link_distance_km': links[alert.id].link_distance_km,
+        'archived': alert.is_archived
+    } for alert in alerts]
+
+
+incident_correlator = IncidentCorrelator()
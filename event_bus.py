@@ -0,0 +1,432 @@
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import selectors
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+import socketio
+
+import metrics
+
+DEFAULT_CHANNEL = 'flask-socketio'
+DEFAULT_BATCH_SECONDS = 0.002
+MAX_BATCH_MESSAGES = 256
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+POSTGRES_MAX_PAYLOAD = 7900
+
+_FRAME_HEADER = struct.Struct('!I')
+
+EVENT_BUS_PUBLISHED = metrics.counter(
+    'event_bus_messages_published',
+    'Socket.IO messages published to other workers, by transport',
+    ('transport',))
+EVENT_BUS_DROPPED = metrics.counter(
+    'event_bus_messages_dropped',
+    'Socket.IO messages that could not be published to other workers, by transport',
+    ('transport',))
+EVENT_BUS_BATCH_SIZE = metrics.histogram(
+    'event_bus_batch_size',
+    'Messages coalesced into one event bus frame',
+    ('transport',),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250))
+
+
+def _send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def _read_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+class BatchingPubSubManager(socketio.PubSubManager):
+    """
+    PubSubManager that queues outgoing messages and has a flusher thread send
+    everything published within one batch window as a single frame, so a burst
+    of emits (a monitoring cycle, a bulk alert update) costs one round trip per
+    burst. Subclasses implement ``_send_batch`` and ``_receive_batches``.
+    """
+
+    name = 'batching'
+
+    def __init__(self, channel: str = DEFAULT_CHANNEL, write_only: bool = False, logger=None, json=None,
+                 batch_seconds: float = DEFAULT_BATCH_SECONDS, max_batch: int = MAX_BATCH_MESSAGES):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.batch_seconds = batch_seconds
+        self.max_batch = max_batch
+        self._outbox: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_lock = threading.Lock()
+
+    def _publish(self, data: Dict[str, Any]):
+        if self._flusher is None:
+            with self._flusher_lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_forever,
+                                                     name=f'{self.name}-event-bus', daemon=True)
+                    self._flusher.start()
+        self._outbox.put(data)
+
+    def _flush_forever(self):
+        while True:
+            batch = [self._outbox.get()]
+            deadline = time.monotonic() + self.batch_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._outbox.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._send_batch(batch)
+                EVENT_BUS_PUBLISHED.labels(transport=self.name).inc(len(batch))
+                EVENT_BUS_BATCH_SIZE.labels(transport=self.name).observe(len(batch))
+            except Exception as e:
+                EVENT_BUS_DROPPED.labels(transport=self.name).inc(len(batch))
+                logging.error(f"Event bus ({self.name}) failed to publish {len(batch)} messages: {str(e)}")
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until queued messages have been handed to the transport (for tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while not self._outbox.empty() and time.monotonic() < deadline:
+            time.sleep(self.batch_seconds)
+
+    def _listen(self) -> Iterator[Dict[str, Any]]:
+        for batch in self._receive_batches():
+            for message in batch:
+                yield message
+
+    def _send_batch(self, batch: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def _receive_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        raise NotImplementedError
+
+
+class UnixSocketBroker:
+    """
+    Relays length-prefixed frames between the workers connected to a Unix
+    socket: every frame a worker sends is written to all other workers. Frames
+    are passed through unparsed, and writes never block the relay loop; a
+    worker that stops reading is disconnected once ``max_pending_bytes`` of
+    frames are waiting for it.
+    """
+
+    def __init__(self, path: str, max_pending_bytes: int = 8 * 1024 * 1024):
+        self.path = path
+        self.max_pending_bytes = max_pending_bytes
+        self._selector = selectors.DefaultSelector()
+        self._inbound: Dict[socket.socket, bytearray] = {}
+        self._outbound: Dict[socket.socket, bytearray] = {}
+        self._server: Optional[socket.socket] = None
+        self._running = False
+
+    def bind(self):
+        if os.path.exists(self.path):
+            # Remove a socket file left by a crashed broker, but never take over a live one
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                probe.close()
+                raise RuntimeError(f"Event broker already running on {self.path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(128)
+        self._server.setblocking(False)
+        self._selector.register(self._server, selectors.EVENT_READ)
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        self._running = True
+        logging.info(f"Event broker listening on {self.path}")
+        while self._running:
+            for key, mask in self._selector.select(timeout=0.5):
+                if key.fileobj is self._server:
+                    self._accept()
+                    continue
+                if mask & selectors.EVENT_WRITE:
+                    self._write(key.fileobj)
+                if mask & selectors.EVENT_READ and key.fileobj in self._inbound:
+                    self._read(key.fileobj)
+
+    def start(self) -> threading.Thread:
+        """Serve from a daemon thread (tests, benchmarks and single-host development)"""
+        self.bind()
+        thread = threading.Thread(target=self.serve_forever, name='event-broker', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._running = False
+        for client in list(self._inbound):
+            self._drop(client)
+        if self._server is not None:
+            self._selector.unregister(self._server)
+            self._server.close()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def _accept(self):
+        client, _ = self._server.accept()
+        client.setblocking(False)
+        self._inbound[client] = bytearray()
+        self._outbound[client] = bytearray()
+        self._selector.register(client, selectors.EVENT_READ)
+
+    def _drop(self, client: socket.socket):
+        self._inbound.pop(client, None)
+        self._outbound.pop(client, None)
+        try:
+            self._selector.unregister(client)
+        except (KeyError, ValueError):
+            pass
+        client.close()
+
+    def _read(self, client: socket.socket):
+        try:
+            chunk = client.recv(1 << 16)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            chunk = b''
+        if not chunk:
+            self._drop(client)
+            return
+
+        buffer = self._inbound[client]
+        buffer += chunk
+        while len(buffer) >= _FRAME_HEADER.size:
+            (length,) = _FRAME_HEADER.unpack_from(buffer)
+            end = _FRAME_HEADER.size + length
+            if len(buffer) < end:
+                break
+            frame = bytes(buffer[:end])
+            del buffer[:end]
+            for other in list(self._outbound):
+                if other is not client:
+                    self._relay(other, frame)
+
+    def _relay(self, client: socket.socket, frame: bytes):
+        pending = self._outbound[client]
+        if not pending:
+            try:
+                sent = client.send(frame)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError:
+                self._drop(client)
+                return
+            if sent == len(frame):
+                return
+            frame = frame[sent:]
+            self._selector.modify(client, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+        pending += frame
+        if len(pending) > self.max_pending_bytes:
+            logging.warning(f"Event broker dropping a worker that stopped reading "
+                            f"({len(pending)} bytes pending)")
+            self._drop(client)
+
+    def _write(self, client: socket.socket):
+        pending = self._outbound.get(client)
+        if pending is None:
+            return
+        try:
+            sent = client.send(pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._drop(client)
+            return
+        del pending[:sent]
+        if not pending:
+            self._selector.modify(client, selectors.EVENT_READ)
+
+
+class UnixSocketManager(BatchingPubSubManager):
+    """Socket.IO client manager publishing through a UnixSocketBroker on the same host"""
+
+    name = 'unix'
+
+    def __init__(self, url: str, channel: str = DEFAULT_CHANNEL, write_only: bool = False, logger=None,
+                 json=None, batch_seconds: float = DEFAULT_BATCH_SECONDS):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json,
+                         batch_seconds=batch_seconds)
+        self.path = url[len('unix://'):] if url.startswith('unix://') else url
+        self._sock: Optional[socket.socket] = None
+        self._connect_lock = threading.Lock()
+
+    def _connection(self) -> socket.socket:
+        with self._connect_lock:
+            if self._sock is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.path)
+                self._sock = sock
+            return self._sock
+
+    def close(self):
+        """Disconnect from the broker (a manager that is not listening must not stay connected)"""
+        with self._connect_lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def _reset(self, sock: socket.socket):
+        with self._connect_lock:
+            if self._sock is sock:
+                self._sock = None
+        sock.close()
+
+    def _send_batch(self, batch: List[Dict[str, Any]]):
+        payload = json.dumps({'channel': self.channel, 'messages': batch}).encode()
+        # A restarted broker leaves a dead connection behind; reconnect once before giving up
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                _send_frame(sock, payload)
+                return
+            except OSError:
+                self._reset(sock)
+                if attempt:
+                    raise
+
+    def _receive_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        backoff = 0.1
+        while True:
+            try:
+                sock = self._connection()
+            except OSError as e:
+                logging.warning(f"Event broker unavailable at {self.path} ({str(e)}); retrying")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+            backoff = 0.1
+
+            while True:
+                header = _read_exactly(sock, _FRAME_HEADER.size)
+                payload = header and _read_exactly(sock, _FRAME_HEADER.unpack(header)[0])
+                if not payload:
+                    logging.warning(f"Lost connection to event broker at {self.path}; reconnecting")
+                    self._reset(sock)
+                    break
+                frame = json.loads(payload)
+                if frame.get('channel') == self.channel:
+                    yield frame['messages']
+
+
+class PostgresNotifyManager(BatchingPubSubManager):
+    """
+    Socket.IO client manager using PostgreSQL LISTEN/NOTIFY, so deployments
+    already on PostgreSQL need no extra service. A batch larger than a NOTIFY
+    payload allows is split across several notifications.
+    """
+
+    name = 'postgres'
+
+    def __init__(self, url: str, channel: str = DEFAULT_CHANNEL, write_only: bool = False, logger=None,
+                 json=None, batch_seconds: float = DEFAULT_BATCH_SECONDS):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json,
+                         batch_seconds=batch_seconds)
+        # psycopg2 takes a libpq URL, not the SQLAlchemy dialect+driver form
+        self.url = 'postgresql://' + url.split('://', 1)[1]
+        # NOTIFY channels are identifiers
+        self.pg_channel = channel.replace('-', '_')
+        self._publisher = None
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.url)
+        connection.autocommit = True
+        return connection
+
+    def _notify(self, payload: str):
+        if self._publisher is None or self._publisher.closed:
+            self._publisher = self._connect()
+        with self._publisher.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', (self.pg_channel, payload))
+
+    def _send_batch(self, batch: List[Dict[str, Any]]):
+        chunk: List[str] = []
+        size = 2
+        for message in batch:
+            encoded = json.dumps(message)
+            if len(encoded) + 2 > POSTGRES_MAX_PAYLOAD:
+                EVENT_BUS_DROPPED.labels(transport=self.name).inc()
+                logging.error(f"Event bus message too large for NOTIFY ({len(encoded)} bytes); dropped")
+                continue
+            if chunk and size + len(encoded) + 1 > POSTGRES_MAX_PAYLOAD:
+                self._notify('[' + ','.join(chunk) + ']')
+                chunk, size = [], 2
+            chunk.append(encoded)
+            size += len(encoded) + 1
+        if chunk:
+            self._notify('[' + ','.join(chunk) + ']')
+
+    def _receive_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        import select as select_module
+
+        while True:
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.pg_channel}"')
+                while True:
+                    if select_module.select([connection], [], [], 5.0)[0]:
+                        connection.poll()
+                        while connection.notifies:
+                            yield json.loads(connection.notifies.pop(0).payload)
+            except Exception as e:
+                logging.warning(f"Event bus LISTEN connection failed ({str(e)}); reconnecting")
+                time.sleep(1.0)
+
+
+def _batch_seconds_from_env() -> float:
+    value = os.environ.get('EVENT_BUS_BATCH_MS')
+    return float(value) / 1000 if value else DEFAULT_BATCH_SECONDS
+
+
+def create_client_manager(url: str, write_only: bool = False) -> Optional[socketio.PubSubManager]:
+    """Client manager for a unix:// or postgres URL; None for URLs Flask-SocketIO handles itself"""
+    if url.startswith('unix://'):
+        return UnixSocketManager(url, write_only=write_only, batch_seconds=_batch_seconds_from_env())
+    if url.startswith(('postgres://', 'postgresql://', 'postgresql+psycopg2://')):
+        return PostgresNotifyManager(url, write_only=write_only, batch_seconds=_batch_seconds_from_env())
+    return None
+
+
+def socketio_options() -> Dict[str, Any]:
+    """
+    Extra ``SocketIO.init_app`` options selecting how workers relay events to
+    each other's clients, from ``SOCKETIO_MESSAGE_QUEUE``:
+
+    * ``unix:///path/events.sock`` - the local broker (``flask --app app event-broker``)
+    * ``postgresql://...`` - LISTEN/NOTIFY on a PostgreSQL database
+    * ``redis://``, ``amqp://``, ``kafka://``, ``zmq+tcp://`` - Flask-SocketIO's own managers
+
+    Unset means a single worker and no bus.
+    """
+    url = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return {}
+    manager = create_client_manager(url)
+    if manager is not None:
+        return {'client_manager': manager}
+    return {'message_queue': url}
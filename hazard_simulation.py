@@ -0,0 +1,384 @@
+import os
+import math
+import zlib
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from records import Atmosphere, RegionBounds, Terrain, Threat
+from population_grid import KM_PER_DEGREE, population_index
+import metrics
+
+DEFAULT_GRID_SIZE = 512
+HORIZON_HOURS = (1, 3, 6, 12)
+
+# Fire spread: base rate on flat ground with full dry fuel and no wind, in km/h
+FIRE_BASE_RATE_KMH = 0.3
+FIRE_WIND_COEFFICIENT = 0.06   # per km/h of wind, along the spread direction
+FIRE_SLOPE_COEFFICIENT = 3.5   # per unit rise over run
+MIN_FUEL_VEGETATION = 0.15
+# Travel time standing in for "never" (hours); far beyond any projection horizon
+UNREACHABLE_HOURS = 1e6
+# Down-and-up pass pairs; paths that double back vertically more often than this are cut short
+MAX_SWEEPS = 6
+CONVERGED_HOURS = 1e-4
+
+# Flood routing
+FLOOD_DEPTH_M = 0.3
+EVACUATION_RADIUS_KM = 1.0
+FLOW_VELOCITY_KMH = 2.0
+MANNING_ROUGHNESS = 0.05
+MIN_CHANNEL_SLOPE = 1e-3
+
+HAZARD_SIMULATION_SECONDS = metrics.histogram(
+    'hazard_simulation_duration_seconds',
+    'Time to project the spread of one fire or flood threat',
+    ('hazard',))
+
+# (row offset, column offset, bearing in degrees clockwise from north) of the 8 neighbours
+_NEIGHBOURS = ((-1, 0, 0.0), (-1, 1, 45.0), (0, 1, 90.0), (1, 1, 135.0),
+               (1, 0, 180.0), (1, -1, 225.0), (0, -1, 270.0), (-1, -1, 315.0))
+
+
+@lru_cache(maxsize=16)
+def _smooth_noise(seed: int, rows: int, cols: int, features: float) -> np.ndarray:
+    """Zero-mean, unit-variance noise with about ``features`` hills and hollows across the grid"""
+    rng = np.random.default_rng(seed)
+    spectrum = np.fft.rfft2(rng.standard_normal((rows, cols)))
+    ky = np.fft.fftfreq(rows)[:, None]
+    kx = np.fft.rfftfreq(cols)[None, :]
+    scale = features / max(rows, cols)
+    spectrum *= np.exp(-(ky ** 2 + kx ** 2) / (2 * scale ** 2))
+    field = np.fft.irfft2(spectrum, s=(rows, cols))
+    field -= field.mean()
+    field /= field.std() or 1.0
+    field.setflags(write=False)
+    return field
+
+
+class HazardGrid:
+    """
+    Raster of a region for hazard simulation (north-up): elevation in metres,
+    vegetation fraction and open water. The satellite pipeline reports terrain
+    statistics rather than rasters, so the surfaces are smooth random fields
+    derived from the region bounds and scaled to those statistics: mean
+    elevation, mean slope, vegetation index and water coverage.
+    """
+
+    def __init__(self, bounds: RegionBounds, terrain: Terrain, size: int = DEFAULT_GRID_SIZE):
+        self.bounds = bounds
+        self.rows = self.cols = size
+        self.lat_step = (bounds.max_latitude - bounds.min_latitude) / size
+        self.lon_step = (bounds.max_longitude - bounds.min_longitude) / size
+        center_lat = math.radians((bounds.min_latitude + bounds.max_latitude) / 2)
+        self.dy_km = max(self.lat_step * KM_PER_DEGREE, 1e-6)
+        self.dx_km = max(self.lon_step * KM_PER_DEGREE * math.cos(center_lat), 1e-6)
+        self.cell_area_km2 = self.dy_km * self.dx_km
+
+        key = f'{bounds.min_latitude:.4f},{bounds.max_latitude:.4f},{bounds.min_longitude:.4f},{bounds.max_longitude:.4f}'
+        seed = zlib.crc32(key.encode())
+        relief = _smooth_noise(seed, size, size, 10)
+        cover = _smooth_noise(seed + 1, size, size, 25)
+
+        # Scale relief so the mean gradient matches the reported mean slope
+        gradient_y, gradient_x = np.gradient(relief, self.dy_km * 1000, self.dx_km * 1000)
+        mean_gradient = float(np.hypot(gradient_y, gradient_x).mean()) or 1.0
+        relief_m = math.tan(math.radians(terrain.slope_angle_avg)) / mean_gradient
+        self.elevation = terrain.average_elevation + relief * relief_m
+
+        # The lowest ground holds the region's open water
+        water_fraction = min(max(terrain.water_body_coverage, 0.0), 0.9)
+        self.water = relief <= np.quantile(relief, water_fraction) if water_fraction > 0 else np.zeros_like(relief, bool)
+        self.vegetation = np.clip(terrain.vegetation_index + 0.2 * cover, 0.0, 1.0)
+        self.vegetation[self.water] = 0.0
+
+    def cell_of(self, latitude: Optional[float], longitude: Optional[float]) -> Tuple[int, int]:
+        """Grid cell of a point (the region center when the point is unknown), clamped to the grid"""
+        if latitude is None or longitude is None:
+            return self.rows // 2, self.cols // 2
+        row = int((self.bounds.max_latitude - latitude) / self.lat_step) if self.lat_step else 0
+        col = int((longitude - self.bounds.min_longitude) / self.lon_step) if self.lon_step else 0
+        return min(max(row, 0), self.rows - 1), min(max(col, 0), self.cols - 1)
+
+    def latitudes(self) -> np.ndarray:
+        return self.bounds.max_latitude - (np.arange(self.rows) + 0.5) * self.lat_step
+
+    def longitudes(self) -> np.ndarray:
+        return self.bounds.min_longitude + (np.arange(self.cols) + 0.5) * self.lon_step
+
+    def bbox(self, mask: np.ndarray) -> Optional[Dict[str, float]]:
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if not len(rows):
+            return None
+        return {
+            'min_latitude': float(self.bounds.max_latitude - (rows[-1] + 1) * self.lat_step),
+            'max_latitude': float(self.bounds.max_latitude - rows[0] * self.lat_step),
+            'min_longitude': float(self.bounds.min_longitude + cols[0] * self.lon_step),
+            'max_longitude': float(self.bounds.min_longitude + (cols[-1] + 1) * self.lon_step)
+        }
+
+    def neighbour_slices(self, array: np.ndarray, dr: int, dc: int) -> Tuple[Tuple[slice, slice], Tuple[slice, slice]]:
+        """Slices selecting cells and their (dr, dc) neighbours where both are on the grid"""
+        rows, cols = array.shape
+        source = (slice(max(0, -dr), rows - max(0, dr)), slice(max(0, -dc), cols - max(0, dc)))
+        target = (slice(max(0, dr), rows - max(0, -dr)), slice(max(0, dc), cols - max(0, -dc)))
+        return source, target
+
+    def step_km(self, dr: int, dc: int) -> float:
+        return math.hypot(dr * self.dy_km, dc * self.dx_km)
+
+
+def _fire_costs(grid: HazardGrid, atmosphere: Atmosphere) -> Dict[Tuple[int, int], np.ndarray]:
+    """
+    Hours for fire to cross from each cell to its neighbour in every direction,
+    indexed by (dr, dc) and aligned with the slices from neighbour_slices.
+    """
+    fuel = np.clip((grid.vegetation - MIN_FUEL_VEGETATION) / (1 - MIN_FUEL_VEGETATION), 0.0, 1.0)
+    dryness = min(max(1 - atmosphere.humidity_percent / 100, 0.1), 1.0) \
+        * (1 + max(atmosphere.temperature_celsius - 25, 0) / 30)
+    # Fire runs downwind: towards the bearing opposite to where the wind comes from
+    downwind = math.radians(atmosphere.wind_direction_deg + 180)
+
+    costs = {}
+    for dr, dc, bearing in _NEIGHBOURS:
+        source, target = grid.neighbour_slices(grid.elevation, dr, dc)
+        distance_km = grid.step_km(dr, dc)
+        rise = (grid.elevation[target] - grid.elevation[source]) / (distance_km * 1000)
+        wind = math.exp(FIRE_WIND_COEFFICIENT * atmosphere.wind_speed_kmh * math.cos(math.radians(bearing) - downwind))
+        rate = FIRE_BASE_RATE_KMH * dryness * wind * fuel[target] * np.clip(np.exp(FIRE_SLOPE_COEFFICIENT * rise), 0.3, 5.0)
+        with np.errstate(divide='ignore'):
+            costs[(dr, dc)] = np.where(rate > 1e-6, distance_km / rate, UNREACHABLE_HOURS)
+    return costs
+
+
+def _relax_row(row: np.ndarray, east: np.ndarray, west: np.ndarray) -> np.ndarray:
+    """
+    Let fire run along one row in both directions. ``east`` and ``west`` are
+    the cumulative costs of the eastward and westward moves from column 0, so
+    the best arrival through any earlier (or later) cell of the row is a
+    prefix (or suffix) minimum.
+    """
+    row = np.minimum(row, east + np.minimum.accumulate(row - east))
+    return np.minimum(row, np.minimum.accumulate((row + west)[::-1])[::-1] - west)
+
+
+def fire_arrival_hours(grid: HazardGrid, atmosphere: Atmosphere, ignition: Tuple[int, int],
+                       limit_hours: float = UNREACHABLE_HOURS) -> np.ndarray:
+    """
+    Hours until fire started at ``ignition`` reaches each cell. This is the
+    fixed point of the fire cellular automaton (a cell ignites once the front
+    crosses from any burning neighbour, at a rate set by fuel, dryness, wind
+    and slope), computed by fast sweeping: passes down and up the grid relax
+    one row at a time from the row before it, then along the row itself, and
+    repeat until no arrival time improves. Fronts that do not double back
+    vertically settle in a single pair of passes.
+
+    Only times up to ``limit_hours`` are exact; rows the fire cannot reach
+    within it are skipped, and later times are upper bounds.
+    """
+    costs = _fire_costs(grid, atmosphere)
+    pad = ((0, 0), (1, 0))
+    east = np.pad(np.cumsum(costs[(0, 1)], axis=1), pad)
+    west = np.pad(np.cumsum(costs[(0, -1)], axis=1), pad)
+
+    arrival = np.full((grid.rows, grid.cols), UNREACHABLE_HOURS)
+    arrival[ignition] = 0.0
+    arrival[ignition[0]] = _relax_row(arrival[ignition[0]], east[ignition[0]], west[ignition[0]])
+
+    down, down_east, down_west = costs[(1, 0)], costs[(1, 1)], costs[(1, -1)]
+    up, up_east, up_west = costs[(-1, 0)], costs[(-1, 1)], costs[(-1, -1)]
+    for _ in range(MAX_SWEEPS):
+        previous = arrival.copy()
+        for row in range(1, grid.rows):
+            above = arrival[row - 1]
+            if above.min() > limit_hours:
+                continue
+            reached = above + down[row - 1]
+            np.minimum(reached[1:], above[:-1] + down_east[row - 1], out=reached[1:])
+            np.minimum(reached[:-1], above[1:] + down_west[row - 1], out=reached[:-1])
+            arrival[row] = _relax_row(np.minimum(arrival[row], reached), east[row], west[row])
+        for row in range(grid.rows - 2, -1, -1):
+            below = arrival[row + 1]
+            if below.min() > limit_hours:
+                continue
+            reached = below + up[row]
+            np.minimum(reached[1:], below[:-1] + up_east[row], out=reached[1:])
+            np.minimum(reached[:-1], below[1:] + up_west[row], out=reached[:-1])
+            arrival[row] = _relax_row(np.minimum(arrival[row], reached), east[row], west[row])
+        # Rounding in the prefix sums can shave off fractions of a second indefinitely
+        improved = (previous - arrival)[arrival <= limit_hours]
+        if not improved.size or improved.max() < CONVERGED_HOURS:
+            break
+    return arrival
+
+
+def _horizon(grid: HazardGrid, hours: float, mask: np.ndarray, density: np.ndarray) -> Dict[str, Any]:
+    return {
+        'hours': hours,
+        'area_km2': float(mask.sum() * grid.cell_area_km2),
+        'affected_population': int((density * mask).sum() * grid.cell_area_km2),
+        'bbox': grid.bbox(mask)
+    }
+
+
+def simulate_fire(grid: HazardGrid, atmosphere: Atmosphere, latitude: Optional[float], longitude: Optional[float],
+                  density: np.ndarray, horizons: Sequence[float] = HORIZON_HOURS) -> Dict[str, Any]:
+    """Project a fire front from the threat position over ``horizons`` hours"""
+    ignition = grid.cell_of(latitude, longitude)
+    arrival = fire_arrival_hours(grid, atmosphere, ignition, horizons[-1])
+
+    rows = (np.arange(grid.rows) - ignition[0])[:, None] * grid.dy_km
+    cols = (np.arange(grid.cols) - ignition[1])[None, :] * grid.dx_km
+    burned = arrival <= horizons[-1]
+    reach_km = float(np.sqrt(rows ** 2 + cols ** 2)[burned].max()) if burned.any() else 0.0
+
+    return {
+        'hazard': 'fire',
+        'horizons': [_horizon(grid, hours, arrival <= hours, density) for hours in horizons],
+        'spread_rate_kmh': reach_km / horizons[-1]
+    }
+
+
+def _flow_receivers(grid: HazardGrid) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Steepest-descent (D8) receiver of every cell as a flat index, the slope
+    towards it and the step length in km. Cells draining off the grid or
+    into a depression get the outlet index ``rows * cols``.
+    """
+    elevation = grid.elevation
+    rows, cols = elevation.shape
+    outlet = rows * cols
+    # Off-grid neighbours sit a metre below the edge so border cells can drain out
+    padded = np.pad(elevation, 1, mode='edge')
+    padded[0, :] -= 1
+    padded[-1, :] -= 1
+    padded[:, 0] -= 1
+    padded[:, -1] -= 1
+
+    best_slope = np.zeros_like(elevation)
+    best = np.full(elevation.shape, -1, dtype=np.int8)
+    for index, (dr, dc, _) in enumerate(_NEIGHBOURS):
+        neighbour = padded[1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols]
+        slope = (elevation - neighbour) / (grid.step_km(dr, dc) * 1000)
+        steeper = slope > best_slope
+        best_slope[steeper] = slope[steeper]
+        best[steeper] = index
+
+    offsets = np.array([(dr, dc) for dr, dc, _ in _NEIGHBOURS] + [(0, 0)])
+    steps = np.array([grid.step_km(dr, dc) for dr, dc, _ in _NEIGHBOURS] + [0.0])
+    row_index, col_index = np.indices(elevation.shape)
+    target_rows = row_index + offsets[best, 0]
+    target_cols = col_index + offsets[best, 1]
+    on_grid = (best >= 0) & (target_rows >= 0) & (target_rows < rows) & (target_cols >= 0) & (target_cols < cols)
+    receivers = np.where(on_grid, target_rows * cols + target_cols, outlet).ravel()
+    return receivers, best_slope.ravel(), np.where(best >= 0, steps[best], 0.0).ravel()
+
+
+def _accumulate(receivers: np.ndarray, weights: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Upstream sum of ``weights`` at every cell and each cell's flow-path length
+    to its outlet, by pointer doubling: after k rounds every cell has gathered
+    the cells up to 2**k steps upstream, so the rounds are logarithmic in the
+    longest flow path and each is a single bincount.
+    """
+    outlet = len(receivers)
+    pointer = np.append(receivers, outlet)
+    gathered = np.append(weights, 0.0)
+    distance = np.append(lengths, 0.0)
+    while (pointer[:outlet] != outlet).any():
+        pushed = np.bincount(pointer, weights=gathered, minlength=outlet + 1)
+        pushed[outlet] = 0.0
+        gathered = gathered + pushed
+        distance = distance + distance[pointer]
+        pointer = pointer[pointer]
+    return gathered[:outlet], distance[:outlet]
+
+
+def simulate_flood(grid: HazardGrid, atmosphere: Atmosphere, terrain: Terrain, latitude: Optional[float],
+                   longitude: Optional[float], density: np.ndarray,
+                   horizons: Sequence[float] = HORIZON_HOURS) -> Dict[str, Any]:
+    """
+    Route the current rainfall over the terrain: runoff accumulates down the
+    steepest-descent flow network, water depth follows from Manning's
+    equation for the accumulated discharge, and discharge builds up over the
+    region's time of concentration.
+    """
+    receivers, slope, lengths = _flow_receivers(grid)
+    upstream_cells, flow_length_km = _accumulate(receivers, np.ones(receivers.shape), lengths)
+    upstream_cells = upstream_cells.reshape(grid.rows, grid.cols)
+
+    runoff = min(0.3 + 0.4 * terrain.soil_moisture + 0.3 * terrain.urban_coverage, 0.95)
+    rain_m_per_s = max(atmosphere.precipitation_mm, 0.0) / 1000 / 3600
+    discharge = upstream_cells * grid.cell_area_km2 * 1e6 * rain_m_per_s * runoff
+    width_m = min(grid.dx_km, grid.dy_km) * 1000
+    channel_slope = np.maximum(slope.reshape(grid.rows, grid.cols), MIN_CHANNEL_SLOPE)
+    full_depth = (discharge * MANNING_ROUGHNESS / (width_m * np.sqrt(channel_slope))) ** 0.6
+    # Open water is already at its normal level
+    full_depth[grid.water] = 0.0
+    concentration_hours = max(float(flow_length_km.max()) / FLOW_VELOCITY_KMH, 1e-6)
+
+    results = []
+    for hours in horizons:
+        depth = full_depth * min(hours / concentration_hours, 1.0) ** 0.6
+        flooded = depth >= FLOOD_DEPTH_M
+        horizon = _horizon(grid, hours, flooded, density)
+        horizon['max_depth_m'] = float(depth.max())
+        results.append(horizon)
+
+    flooded = full_depth * min(horizons[-1] / concentration_hours, 1.0) ** 0.6 >= FLOOD_DEPTH_M
+    water_level = float(np.percentile(full_depth[flooded], 95)) if flooded.any() else float(full_depth.max())
+
+    # Hours until water first reaches flood depth near the threat position
+    row, col = grid.cell_of(latitude, longitude)
+    reach_rows = max(1, int(EVACUATION_RADIUS_KM / grid.dy_km))
+    reach_cols = max(1, int(EVACUATION_RADIUS_KM / grid.dx_km))
+    nearby = full_depth[max(0, row - reach_rows):row + reach_rows + 1, max(0, col - reach_cols):col + reach_cols + 1]
+    with np.errstate(divide='ignore'):
+        onset = np.where(nearby >= FLOOD_DEPTH_M,
+                         concentration_hours * (FLOOD_DEPTH_M / np.maximum(nearby, 1e-9)) ** (1 / 0.6), np.inf)
+    evacuation_hours = float(onset.min()) if np.isfinite(onset.min()) else None
+
+    return {
+        'hazard': 'flood',
+        'horizons': results,
+        'water_level_m': water_level,
+        'evacuation_time_hours': evacuation_hours,
+        'concentration_hours': concentration_hours
+    }
+
+
+def _grid_size_from_env() -> int:
+    value = os.environ.get('HAZARD_GRID_SIZE')
+    return int(value) if value else DEFAULT_GRID_SIZE
+
+
+def project_threat(threat: Threat, region_name: str, bounds: RegionBounds, terrain: Terrain,
+                   atmosphere: Atmosphere, size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Spread projection for a fire or flood threat, or None for other hazards"""
+    if threat.type not in ('fire', 'flood'):
+        return None
+
+    start = time.perf_counter()
+    grid = HazardGrid(bounds, terrain, size or _grid_size_from_env())
+    density = population_index.grid(region_name, bounds).density_grid(grid.latitudes(), grid.longitudes())
+    if threat.type == 'fire':
+        projection = simulate_fire(grid, atmosphere, threat.latitude, threat.longitude, density)
+    else:
+        projection = simulate_flood(grid, atmosphere, terrain, threat.latitude, threat.longitude, density)
+
+    elapsed = time.perf_counter() - start
+    HAZARD_SIMULATION_SECONDS.labels(hazard=threat.type).observe(elapsed)
+    latitude, longitude = threat.latitude, threat.longitude
+    if latitude is None or longitude is None:
+        latitude = (bounds.min_latitude + bounds.max_latitude) / 2
+        longitude = (bounds.min_longitude + bounds.max_longitude) / 2
+    projection.update({
+        'origin': {'latitude': latitude, 'longitude': longitude},
+        'grid': {'rows': grid.rows, 'cols': grid.cols, 'cell_km': [grid.dy_km, grid.dx_km]},
+        'simulation_seconds': elapsed
+    })
+    return projection
+
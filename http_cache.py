@@ -0,0 +1,148 @@
+import gzip
+import os
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import make_response, request
+
+from app import db
+from models import ChangeLogEntry
+import metrics
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ALERTS_SCOPE = 'alerts'
+
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css',
+                          'application/javascript', 'text/javascript', 'image/svg+xml')
+
+CONDITIONAL_REQUESTS = metrics.counter(
+    'http_conditional_requests',
+    'Conditional GETs on versioned endpoints by result (not_modified, full)',
+    ('endpoint', 'result'))
+COMPRESSED_RESPONSES = metrics.counter(
+    'http_compressed_responses',
+    'Responses compressed on the fly, by encoding',
+    ('encoding',))
+COMPRESSION_SAVED_BYTES = metrics.counter(
+    'http_compression_saved_bytes',
+    'Response bytes saved by compression')
+
+
+def region_scope(region_id: int) -> str:
+    return f'region:{region_id}'
+
+
+class ChangeVersions:
+    """
+    Validators for cacheable API data, built from the change feed: every
+    change to alerts or monitoring status is logged with a global sequence
+    number in the same transaction, so the newest committed entry identifies
+    the data version identically in every worker and across restarts. Scopes
+    share that version, so a change to one region also revalidates the
+    others. As with the identity cache, validators also roll over every
+    ``ttl`` seconds, which bounds staleness for changes made outside the feed.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+
+    def latest(self) -> Tuple[int, Optional[datetime]]:
+        """Sequence number and time of the newest committed change"""
+        row = db.session.query(ChangeLogEntry.id, ChangeLogEntry.created_at)\
+            .order_by(ChangeLogEntry.id.desc()).first()
+        return (row.id, row.created_at) if row else (0, None)
+
+    def validators(self, scope: str) -> Tuple[str, datetime]:
+        """Weak ETag and Last-Modified time for a scope's current version"""
+        seq, changed_at = self.latest()
+        epoch = int(time.time() // self.ttl)
+        etag = f'W/"{scope}-{seq}-{epoch}"'
+        # Last-Modified rolls over with the epoch too, so If-Modified-Since revalidates on the same schedule
+        modified = int(epoch * self.ttl)
+        if changed_at is not None:
+            modified = max(modified, int(changed_at.replace(tzinfo=timezone.utc).timestamp()))
+        return etag, datetime.fromtimestamp(modified, tz=timezone.utc)
+
+
+def _ttl_from_env() -> float:
+    value = os.environ.get('HTTP_CACHE_TTL_SECONDS')
+    return float(value) if value else 30.0
+
+
+change_versions = ChangeVersions(_ttl_from_env())
+
+
+def conditional(scope: Callable[..., str]):
+    """
+    Serve a GET endpoint with version-based ETag and Last-Modified validators.
+    ``scope`` maps the view's arguments to a ChangeVersions scope. A request
+    whose If-None-Match matches the current version gets a 304 after one indexed
+    lookup of the newest change, before the view (and its queries) run.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Validators are taken before the view runs, so a change during it only costs a refetch
+            etag, last_modified = change_versions.validators(scope(*args, **kwargs))
+
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match:
+                not_modified = etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match == '*'
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified <= since
+
+            if not_modified:
+                CONDITIONAL_REQUESTS.labels(endpoint=request.endpoint, result='not_modified').inc()
+                response = make_response('', 304)
+            else:
+                CONDITIONAL_REQUESTS.labels(endpoint=request.endpoint, result='full').inc()
+                response = make_response(view(*args, **kwargs))
+
+            if response.status_code in (200, 304):
+                response.headers['ETag'] = etag
+                response.last_modified = last_modified
+                # Always revalidate; the 304 path is cheap
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def _compress(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding, body = 'br', brotli.compress(data, quality=5)
+    elif accepted['gzip']:
+        encoding, body = 'gzip', gzip.compress(data, compresslevel=6)
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    COMPRESSED_RESPONSES.labels(encoding=encoding).inc()
+    COMPRESSION_SAVED_BYTES.inc(len(data) - len(body))
+    return response
+
+
+def init_app(app):
+    """Compress larger text and JSON responses with brotli (if installed) or gzip"""
+    app.after_request(_compress)
@@ -0,0 +1,206 @@
+import os
+import threading
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from records import SatelliteObservation
+
+# Feature vector layout shared by every model version
+FEATURE_NAMES = [
+    'temperature_celsius',
+    'humidity_percent',
+    'precipitation_mm',
+    'wind_speed_kmh',
+    'average_elevation',
+    'elevation_variance',
+    'slope_angle_avg',
+    'vegetation_index',
+    'water_body_coverage',
+    'soil_moisture',
+    'surface_temperature',
+    'anomaly_score',
+    'significant_changes_detected',
+    'change_thermal_anomaly',
+    'change_smoke_detection',
+    'change_water_level_change',
+    'change_ground_deformation',
+    'change_vegetation_loss',
+]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+_CHANGE_FEATURES = [name for name in FEATURE_NAMES if name.startswith('change_')]
+
+
+def extract_features(satellite_data) -> np.ndarray:
+    """Flatten a satellite observation (record or dict form) into the model feature vector"""
+    observation = SatelliteObservation.from_dict(satellite_data)
+    terrain = observation.terrain_analysis
+    atmospheric = observation.atmospheric_conditions
+    changes = observation.change_detection
+    change_types = {change.get('type') for change in changes.change_types}
+
+    return np.array([
+        atmospheric.temperature_celsius,
+        atmospheric.humidity_percent,
+        atmospheric.precipitation_mm,
+        atmospheric.wind_speed_kmh,
+        terrain.average_elevation,
+        terrain.elevation_variance,
+        terrain.slope_angle_avg,
+        terrain.vegetation_index,
+        terrain.water_body_coverage,
+        terrain.soil_moisture,
+        terrain.surface_temperature,
+        changes.anomaly_score,
+        changes.significant_changes_detected,
+    ] + [1.0 if name[len('change_'):] in change_types else 0.0 for name in _CHANGE_FEATURES],
+        dtype=np.float64)
+
+
+def extract_feature_matrix(observations: Sequence) -> np.ndarray:
+    """Stack feature vectors for batched scoring"""
+    if not observations:
+        return np.empty((0, len(FEATURE_NAMES)))
+    return np.vstack([extract_features(observation) for observation in observations])
+
+
+class DetectionModel:
+    """
+    Interface for disaster detection backends. ``predict_proba`` scores a batch
+    of feature vectors and returns one probability column per disaster type.
+    """
+
+    version: str
+    disaster_types: List[str]
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, features: np.ndarray) -> List[Dict[str, float]]:
+        """Score a batch and return ``{disaster_type: probability}`` per row"""
+        probabilities = self.predict_proba(np.atleast_2d(features))
+        return [dict(zip(self.disaster_types, row.tolist())) for row in probabilities]
+
+
+class LogisticDetectionModel(DetectionModel):
+    """
+    CPU-only multi-label logistic scorer: features are standardized and scored
+    against one coefficient column per disaster type in a single matrix product.
+    """
+
+    def __init__(self, version: str, disaster_types: List[str], means: np.ndarray,
+                 scales: np.ndarray, coefficients: np.ndarray, intercepts: np.ndarray):
+        self.version = version
+        self.disaster_types = list(disaster_types)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.intercepts = np.asarray(intercepts, dtype=np.float64)
+
+        # Fold standardization into the weights so scoring is one GEMM plus a sigmoid
+        self._weights = self.coefficients / self.scales[:, None]
+        self._bias = self.intercepts - self.means @ self._weights
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        logits = np.atleast_2d(features) @ self._weights + self._bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    @classmethod
+    def load(cls, path: str) -> 'LogisticDetectionModel':
+        """Load trained weights from an .npz file written by ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            if list(data['feature_names']) != FEATURE_NAMES:
+                raise ValueError(f"Model {path} was trained on a different feature layout")
+            return cls(str(data['version']), [str(t) for t in data['disaster_types']],
+                       data['means'], data['scales'], data['coefficients'], data['intercepts'])
+
+    def save(self, path: str):
+        np.savez(path, version=self.version, disaster_types=np.array(self.disaster_types),
+                 feature_names=np.array(FEATURE_NAMES), means=self.means, scales=self.scales,
+                 coefficients=self.coefficients, intercepts=self.intercepts)
+
+
+def _builtin_v2_1_3() -> LogisticDetectionModel:
+    """
+    Built-in coefficients for model v2.1.3, expressed on standardized features.
+    They encode the same physical risk factors as the original rule set (heat,
+    dryness and thermal anomalies for fire; rain, low ground and water level
+    changes for flood; deformation for seismic; wet steep slopes for landslide).
+    """
+    disaster_types = ['fire', 'flood', 'earthquake', 'landslide']
+
+    # Centres and spreads of the observed feature ranges
+    means = np.zeros(len(FEATURE_NAMES))
+    scales = np.ones(len(FEATURE_NAMES))
+    for name, (mean, scale) in {
+        'temperature_celsius': (17.5, 16.0),
+        'humidity_percent': (60.0, 17.0),
+        'precipitation_mm': (10.0, 5.8),
+        'wind_speed_kmh': (25.0, 14.0),
+        'average_elevation': (400.0, 130.0),
+        'elevation_variance': (275.0, 130.0),
+        'slope_angle_avg': (7.5, 4.3),
+        'vegetation_index': (0.55, 0.15),
+        'water_body_coverage': (0.08, 0.04),
+        'soil_moisture': (0.5, 0.23),
+        'surface_temperature': (27.5, 7.2),
+        'anomaly_score': (0.5, 0.29),
+        'significant_changes_detected': (2.5, 1.7),
+    }.items():
+        means[FEATURE_INDEX[name]] = mean
+        scales[FEATURE_INDEX[name]] = scale
+
+    coefficients = np.zeros((len(FEATURE_NAMES), len(disaster_types)))
+    intercepts = np.array([-4.2, -4.8, -3.6, -3.2])
+    for disaster_type, weights in {
+        'fire': {'temperature_celsius': 1.3, 'humidity_percent': -1.1, 'vegetation_index': -0.9,
+                 'wind_speed_kmh': 0.4, 'surface_temperature': 0.5,
+                 'change_thermal_anomaly': 2.2, 'change_smoke_detection': 1.6},
+        'flood': {'precipitation_mm': 1.5, 'average_elevation': -1.0, 'water_body_coverage': 0.5,
+                  'soil_moisture': 0.6, 'change_water_level_change': 2.4},
+        'earthquake': {'elevation_variance': 1.1, 'anomaly_score': 0.4,
+                       'change_ground_deformation': 3.2},
+        'landslide': {'slope_angle_avg': 1.3, 'soil_moisture': 1.1, 'precipitation_mm': 0.5,
+                      'significant_changes_detected': 0.8, 'change_vegetation_loss': 0.6},
+    }.items():
+        column = disaster_types.index(disaster_type)
+        for name, weight in weights.items():
+            coefficients[FEATURE_INDEX[name], column] = weight
+
+    return LogisticDetectionModel('v2.1.3', disaster_types, means, scales, coefficients, intercepts)
+
+
+BUILTIN_MODELS = {
+    'v2.1.3': _builtin_v2_1_3,
+}
+
+_loaded_models: Dict[str, DetectionModel] = {}
+_models_lock = threading.Lock()
+
+
+def load_model(version: str, model_dir: Optional[str] = None) -> DetectionModel:
+    """
+    Load a model version once per process. Trained weights in
+    ``<MODEL_DIR>/<version>.npz`` take precedence over the built-in coefficients.
+    """
+    model = _loaded_models.get(version)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        model = _loaded_models.get(version)
+        if model is None:
+            model_dir = model_dir or os.environ.get('MODEL_DIR')
+            path = os.path.join(model_dir, f'{version}.npz') if model_dir else None
+            if path and os.path.exists(path):
+                model = LogisticDetectionModel.load(path)
+            elif version in BUILTIN_MODELS:
+                model = BUILTIN_MODELS[version]()
+            else:
+                raise ValueError(f"Unknown detection model version '{version}'")
+
+            _loaded_models[version] = model
+            logging.info(f"Detection model {version} loaded ({type(model).__name__})")
+    return model
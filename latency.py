@@ -0,0 +1,125 @@
+import json
+import os
+import random
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+
+class LatencyModel:
+    """
+    Base latency model used by the mock processors to simulate acquisition and
+    inference delays. Subclasses decide how long an operation takes; ``wait``
+    performs the actual sleep so load tests can swap in a zero-latency model.
+    """
+
+    def delay_for(self, operation: str, rng: random.Random) -> float:
+        raise NotImplementedError
+
+    def wait(self, operation: str, rng: random.Random) -> float:
+        """Sleep for the modelled delay of an operation and return it"""
+        delay = self.delay_for(operation, rng)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class ZeroLatency(LatencyModel):
+    """No simulated delay - runs the pipeline at CPU speed"""
+
+    def delay_for(self, operation: str, rng: random.Random) -> float:
+        return 0.0
+
+
+class UniformLatency(LatencyModel):
+    """Uniformly distributed delay, optionally scaled (e.g. 0.1 for 10x faster)"""
+
+    def __init__(self, low: float, high: float, scale: float = 1.0):
+        self.low = low
+        self.high = high
+        self.scale = scale
+
+    def delay_for(self, operation: str, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high) * self.scale
+
+
+class RecordingLatency(LatencyModel):
+    """
+    Wraps another latency model and records every delay it produces, so a
+    production-like latency profile can be saved and replayed exactly.
+    """
+
+    def __init__(self, inner: LatencyModel):
+        self.inner = inner
+        self.trace: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def delay_for(self, operation: str, rng: random.Random) -> float:
+        delay = self.inner.delay_for(operation, rng)
+        with self._lock:
+            self.trace.setdefault(operation, []).append(delay)
+        return delay
+
+    def save(self, path: str):
+        """Write the recorded trace as JSON ({operation: [delays...]})"""
+        with self._lock:
+            trace = {op: list(delays) for op, delays in self.trace.items()}
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+
+
+class TraceLatency(LatencyModel):
+    """
+    Replays a recorded latency trace. Delays are returned per operation in the
+    recorded order and wrap around when the trace is exhausted.
+    """
+
+    def __init__(self, trace: Dict[str, List[float]], scale: float = 1.0):
+        self.trace = trace
+        self.scale = scale
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, scale: float = 1.0) -> 'TraceLatency':
+        with open(path) as f:
+            return cls(json.load(f), scale=scale)
+
+    def delay_for(self, operation: str, rng: random.Random) -> float:
+        delays = self.trace.get(operation)
+        if not delays:
+            return 0.0
+        with self._lock:
+            position = self._positions.get(operation, 0)
+            self._positions[operation] = (position + 1) % len(delays)
+        return delays[position] * self.scale
+
+
+def latency_from_env(low: float, high: float) -> LatencyModel:
+    """
+    Build the latency model selected by the SIMULATED_LATENCY environment variable:
+    ``uniform`` (default), ``zero``, ``scale:<factor>`` or ``trace:<path>``.
+    """
+    setting = os.environ.get('SIMULATED_LATENCY', 'uniform')
+
+    if setting == 'zero':
+        return ZeroLatency()
+    if setting.startswith('scale:'):
+        return UniformLatency(low, high, scale=float(setting.split(':', 1)[1]))
+    if setting.startswith('trace:'):
+        return TraceLatency.from_file(setting.split(':', 1)[1])
+    if setting != 'uniform':
+        logging.warning(f"Unknown SIMULATED_LATENCY setting '{setting}', using uniform latency")
+    return UniformLatency(low, high)
+
+
+def rng_from_env(seed: Optional[int] = None) -> random.Random:
+    """
+    Create a per-instance random generator. An explicit seed wins over the
+    SIMULATED_SEED environment variable; without either the generator is
+    seeded from system entropy.
+    """
+    if seed is None and os.environ.get('SIMULATED_SEED'):
+        seed = int(os.environ['SIMULATED_SEED'])
+    return random.Random(seed)
@@ -1,6 +1,9 @@
-from app import app, socketio
+from app import app, socketio, init_database
 
 if __name__ == '__main__':
+    # Local development: make sure the schema and seed data exist
+    init_database()
+    
     # Start the monitoring service
     from monitoring_service import start_monitoring
     start_monitoring()
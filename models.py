@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from enum import Enum
 from app import db
@@ -115,6 +116,9 @@ class Alert(db.Model):
     acknowledged_by = db.relationship('User', foreign_keys=[acknowledged_by_id])
     resolved_by = db.relationship('User', foreign_keys=[resolved_by_id])
     
+    # Closed alerts past retention move to AlertArchive (see archival.py)
+    is_archived = False
+    
     def __init__(self, **kwargs):
         super(Alert, self).__init__(**kwargs)
 
@@ -159,4 +163,209 @@ class SystemConfiguration(db.Model):
     updated_by = db.relationship('User', backref='config_updates')
 
     def __repr__(self):
-        return f'<SystemConfiguration {self.key}>'
\ No newline at end of file
+        return f'<SystemConfiguration {self.key}>'
+
+class AlertDailyRollup(db.Model):
+    """Materialized per-day alert counts, maintained incrementally by statistics_service"""
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), nullable=False)
+    disaster_type = db.Column(db.Enum(DisasterType), nullable=False)
+    severity = db.Column(db.Enum(AlertSeverity), nullable=False)
+    
+    alert_count = db.Column(db.Integer, nullable=False, default=0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'region_id', 'disaster_type', 'severity', name='uq_alert_daily_rollup_key'),
+    )
+
+    def __repr__(self):
+        return f'<AlertDailyRollup {self.day} region={self.region_id} {self.alert_count}>'
+
+class StatisticsWatermark(db.Model):
+    """High-water mark of alerts already folded into the statistics rollups"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    last_alert_id = db.Column(db.Integer, nullable=False, default=0)
+    last_detected_at = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<StatisticsWatermark {self.name} {self.last_alert_id}>'
+
+class StatisticsGap(db.Model):
+    """Alert id below the rollup watermark that had not committed when the watermark passed it"""
+    id = db.Column(db.Integer, primary_key=True)
+    alert_id = db.Column(db.Integer, unique=True, nullable=False)
+    found_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<StatisticsGap {self.alert_id}>'
+
+
+class ResponseTimeBin(db.Model):
+    """One bin of a shared response-time sketch, maintained by response_analytics"""
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(50), nullable=False)
+    dimension = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    bin_index = db.Column(db.Integer, nullable=False)
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+    seconds_sum = db.Column(db.Float, nullable=False, default=0.0)
+    min_seconds = db.Column(db.Float, nullable=False)
+    max_seconds = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('metric', 'dimension', 'key', 'bin_index', name='uq_response_time_bin_key'),
+    )
+
+    def __repr__(self):
+        return f'<ResponseTimeBin {self.metric} {self.dimension}={self.key} [{self.bin_index}] {self.count}>'
+
+
+class AlertArchive(db.Model):
+    """Closed alerts moved out of the hot Alert table by archival.py; ids are kept from Alert"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), nullable=False, index=True)
+    
+    disaster_type = db.Column(db.Enum(DisasterType), nullable=False)
+    severity = db.Column(db.Enum(AlertSeverity), nullable=False)
+    status = db.Column(db.Enum(AlertStatus), nullable=False)
+    
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    affected_radius_km = db.Column(db.Float)
+    
+    confidence_score = db.Column(db.Float)
+    prediction_model = db.Column(db.String(100))
+    satellite_image_id = db.Column(db.String(100))
+    
+    estimated_affected_population = db.Column(db.Integer)
+    estimated_damage_level = db.Column(db.String(50))
+    
+    detected_at = db.Column(db.DateTime, index=True)
+    acknowledged_at = db.Column(db.DateTime)
+    resolved_at = db.Column(db.DateTime)
+    
+    acknowledged_by_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    resolved_by_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    region = db.relationship('Region')
+    acknowledged_by = db.relationship('User', foreign_keys=[acknowledged_by_id])
+    resolved_by = db.relationship('User', foreign_keys=[resolved_by_id])
+    
+    is_archived = True
+
+    def __repr__(self):
+        return f'<AlertArchive {self.title} - {self.severity.value}>'
+
+class ChangeLogEntry(db.Model):
+    """One alert or monitoring-status change; the id is the change feed sequence number"""
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<ChangeLogEntry {self.id} {self.event}>'
+
+class ChangeSequence(db.Model):
+    """Single-row counter the change feed takes sequence numbers from as each transaction commits"""
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class HazardProjection(db.Model):
+    """Simulated spread of a fire or flood alert over the next hours, for evacuation planning"""
+    id = db.Column(db.Integer, primary_key=True)
+    # Not a foreign key: the alert may since have moved to AlertArchive under the same id
+    alert_id = db.Column(db.Integer, nullable=False, index=True)
+    hazard_type = db.Column(db.String(20), nullable=False)
+    horizon_hours = db.Column(db.Float)
+    affected_area_km2 = db.Column(db.Float)
+    affected_population = db.Column(db.Integer)
+    spread_rate_kmh = db.Column(db.Float)
+    water_level_m = db.Column(db.Float)
+    evacuation_time_hours = db.Column(db.Float)
+    projection = db.Column(db.Text, nullable=False)  # JSON: per-horizon area, population and extent
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def from_projection(cls, alert_id: int, projection: dict) -> 'HazardProjection':
+        final = projection['horizons'][-1]
+        return cls(
+            alert_id=alert_id,
+            hazard_type=projection['hazard'],
+            horizon_hours=final['hours'],
+            affected_area_km2=final['area_km2'],
+            affected_population=final['affected_population'],
+            spread_rate_kmh=projection.get('spread_rate_kmh'),
+            water_level_m=projection.get('water_level_m'),
+            evacuation_time_hours=projection.get('evacuation_time_hours'),
+            projection=json.dumps(projection)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'alert_id': self.alert_id,
+            'hazard_type': self.hazard_type,
+            'horizon_hours': self.horizon_hours,
+            'affected_area_km2': self.affected_area_km2,
+            'affected_population': self.affected_population,
+            'spread_rate_kmh': self.spread_rate_kmh,
+            'water_level_m': self.water_level_m,
+            'evacuation_time_hours': self.evacuation_time_hours,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            **json.loads(self.projection)
+        }
+
+    def __repr__(self):
+        return f'<HazardProjection alert={self.alert_id} {self.hazard_type}>'
+
+class Incident(db.Model):
+    """One disaster seen as alerts across neighbouring regions and over time, linked by correlation.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    disaster_type = db.Column(db.Enum(DisasterType), nullable=False)
+    severity = db.Column(db.Enum(AlertSeverity), nullable=False)  # highest among its alerts
+    
+    alert_count = db.Column(db.Integer, nullable=False, default=0)
+    estimated_affected_population = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Extent of the linked alert positions
+    min_latitude = db.Column(db.Float)
+    max_latitude = db.Column(db.Float)
+    min_longitude = db.Column(db.Float)
+    max_longitude = db.Column(db.Float)
+    
+    first_detected_at = db.Column(db.DateTime, index=True)
+    last_detected_at = db.Column(db.DateTime, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    links = db.relationship('IncidentAlert', backref='incident', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<Incident {self.id} {self.disaster_type.value} alerts={self.alert_count}>'
+
+class IncidentAlert(db.Model):
+    """Membership of an alert in an incident"""
+    id = db.Column(db.Integer, primary_key=True)
+    incident_id = db.Column(db.Integer, db.ForeignKey('incident.id'), nullable=False, index=True)
+    # Not a foreign key: the alert may since have moved to AlertArchive under the same id
+    alert_id = db.Column(db.Integer, nullable=False, unique=True)
+    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), nullable=False)
+    # Distance to the nearest alert already in the incident when this one joined (None for the first)
+    link_distance_km = db.Column(db.Float)
+    linked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    region = db.relationship('Region')
+
+    def __repr__(self):
+        return f'<IncidentAlert incident={self.incident_id} alert={self.alert_id}>'
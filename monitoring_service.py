@@ -2,15 +2,38 @@ import logging
 import threading
 import time
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import update
 
-from app import app, db, socketio
-from models import Region, MonitoringStatus, Alert, AlertStatus
-from satellite_processor import SatelliteDataProcessor
-from ai_detector import DisasterDetectionAI
+from app import app, db
+from models import Region, MonitoringStatus, Alert, AlertStatus, DisasterType, AlertSeverity, HazardProjection
+from records import Atmosphere, SatelliteObservation, Threat
+import services
+from analysis_executor import AnalysisTask, analysis_executor
+from realtime import emit_event
+from change_feed import PendingChange, change_feed
+from correlation import incident_correlator
+from status_buffer import status_buffer
+from screening import ScreeningDecision, region_screener
+from sqlite_profile import sqlite_writer
+from statistics_service import refresh_statistics
+from archival import archive_closed_alerts
+import metrics
+
+MONITORING_CYCLE_SECONDS = metrics.histogram(
+    'monitoring_cycle_duration_seconds',
+    'Duration of a full monitoring cycle over all monitored regions',
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+MONITOR_REGION_SECONDS = metrics.histogram(
+    'monitor_region_duration_seconds',
+    'Duration of monitoring a single region (acquisition, analysis and persistence)')
+DB_COMMIT_SECONDS = metrics.histogram(
+    'db_commit_duration_seconds',
+    'Database commit latency by operation',
+    ('operation',))
 
 class MonitoringService:
     """
@@ -21,8 +44,6 @@ class MonitoringService:
     def __init__(self):
         self.scheduler = BackgroundScheduler()
         self.is_running = False
-        self.satellite_processor = SatelliteDataProcessor()
-        self.ai_detector = DisasterDetectionAI()
         self._lock = threading.Lock()
         
     def start_monitoring(self):
@@ -30,6 +51,10 @@ class MonitoringService:
         with self._lock:
             if not self.is_running:
                 try:
+                    # Spawn and warm up the analysis workers before the first cycle
+                    analysis_executor.start()
+                    status_buffer.start()
+                    
                     # Schedule monitoring jobs
                     self.scheduler.add_job(
                         func=self._monitor_all_regions,
@@ -47,6 +72,22 @@ class MonitoringService:
                         replace_existing=True
                     )
                     
+                    self.scheduler.add_job(
+                        func=self._refresh_statistics,
+                        trigger=IntervalTrigger(minutes=1),  # Fold new alerts into statistics rollups
+                        id='statistics_refresh',
+                        name='Statistics Rollup Refresh',
+                        replace_existing=True
+                    )
+                    
+                    self.scheduler.add_job(
+                        func=self._archive_alerts,
+                        trigger=IntervalTrigger(days=1),  # Move old closed alerts to the archive daily
+                        id='alert_archival',
+                        name='Alert Archival',
+                        replace_existing=True
+                    )
+                    
                     self.scheduler.start()
                     self.is_running = True
                     
@@ -54,7 +95,7 @@ class MonitoringService:
                     
                     # Emit status update
                     with app.app_context():
-                        socketio.emit('monitoring_status', {
+                        emit_event('monitoring_status', {
                             'status': 'started',
                             'message': 'Real-time monitoring has been activated'
                         })
@@ -68,13 +109,16 @@ class MonitoringService:
             if self.is_running:
                 try:
                     self.scheduler.shutdown()
+                    analysis_executor.shutdown()
+                    # Queued status updates must not be lost on shutdown
+                    status_buffer.stop()
                     self.is_running = False
                     
                     logging.info("Monitoring service stopped")
                     
                     # Emit status update
                     with app.app_context():
-                        socketio.emit('monitoring_status', {
+                        emit_event('monitoring_status', {
                             'status': 'stopped',
                             'message': 'Real-time monitoring has been deactivated'
                         })
@@ -84,120 +128,200 @@ class MonitoringService:
     
     def _monitor_all_regions(self):
         """Monitor all active regions for potential disasters"""
-        with app.app_context():
+        with app.app_context(), MONITORING_CYCLE_SECONDS.time():
             try:
                 regions = Region.query.filter_by(is_monitored=True).all()
+                context = region_screener.region_context([region.id for region in regions])
                 
+                # Hand each region to the analysis pool as soon as its data arrives, so
+                # analysis of earlier regions overlaps acquisition of later ones
+                pending = []
+                decisions = []
                 for region in regions:
-                    self._monitor_region(region)
-                    
+                    try:
+                        decision = self._screen_region(region, **context[region.id])
+                        decisions.append(decision)
+                        if not decision.analyze:
+                            # Benign quick look: no acquisition or analysis this cycle
+                            status_buffer.update(region.id, {'is_monitoring': True, 'updated_at': datetime.utcnow()})
+                            continue
+                        
+                        quick_look = decision.quick_look
+                        observation = self._acquire_region_data(
+                            region, quick_look.atmospheric_conditions if quick_look else None)
+                        pending.append((region, observation, analysis_executor.submit(observation, region.name),
+                                        decision))
+                    except Exception as e:
+                        logging.error(f"Error acquiring satellite data for {region.name}: {str(e)}")
+                region_screener.record_cycle(decisions)
+                
+                for region, observation, analysis, decision in pending:
+                    self._monitor_region(region, observation, analysis, decision)
+                
+                # Write this cycle's status updates now rather than on the next tick
+                status_buffer.flush()
+                
                 logging.debug(f"Completed monitoring cycle for {len(regions)} regions")
                 
             except Exception as e:
                 logging.error(f"Error in monitoring cycle: {str(e)}")
     
-    def _monitor_region(self, region: Region):
-        """Monitor a specific region for disasters"""
+    def _screen_region(self, region: Region, threat_level: Optional[str] = None,
+                       open_alerts: int = 0) -> ScreeningDecision:
+        """Quick-look a region to decide whether it needs full acquisition and analysis"""
         try:
-            # Get or create monitoring status
-            monitoring_status = MonitoringStatus.query.filter_by(region_id=region.id).first()
-            if not monitoring_status:
-                monitoring_status = MonitoringStatus(region_id=region.id)
-                db.session.add(monitoring_status)
-            
-            monitoring_status.is_monitoring = True
-            monitoring_status.last_analysis_at = datetime.utcnow()
-            
-            # Process satellite data
-            satellite_data = self.satellite_processor.get_region_data(
+            with services.satellite_processor() as processor:
+                quick_look = processor.screen(
+                    region.min_latitude, region.max_latitude,
+                    region.min_longitude, region.max_longitude
+                )
+        except Exception as e:
+            # Never skip a region because its screening failed
+            logging.error(f"Error screening {region.name}: {str(e)}")
+            quick_look = None
+        return region_screener.decide(region.id, quick_look, threat_level, open_alerts)
+    
+    def _acquire_region_data(self, region: Region, atmosphere: Optional[Atmosphere] = None) -> SatelliteObservation:
+        """Acquire the latest satellite data for a region, reusing quick-look weather when given"""
+        with services.satellite_processor() as processor:
+            return processor.acquire(
                 region.min_latitude, region.max_latitude,
-                region.min_longitude, region.max_longitude
+                region.min_longitude, region.max_longitude,
+                atmosphere
             )
+    
+    @metrics.timed(MONITOR_REGION_SECONDS)
+    def _monitor_region(self, region: Region, observation: Optional[SatelliteObservation] = None,
+                        analysis: Optional[AnalysisTask] = None, decision: Optional[ScreeningDecision] = None):
+        """
+        Monitor a specific region for disasters. When the monitoring cycle has
+        already screened the region, acquired the data and submitted its
+        analysis, they are passed in.
+        """
+        # Status fields are written behind by the status buffer, batched with other regions
+        status = {'is_monitoring': True, 'last_analysis_at': datetime.utcnow()}
+        try:
+            # Process satellite data
+            if observation is None:
+                observation = self._acquire_region_data(region)
             
-            monitoring_status.last_satellite_data_at = datetime.utcnow()
+            status['last_satellite_data_at'] = datetime.utcnow()
             
-            # Run AI analysis
-            analysis_result = self.ai_detector.analyze_region_data(satellite_data, region.name)
+            # Run AI analysis in the analysis process pool
+            if analysis is None:
+                analysis = analysis_executor.submit(observation, region.name)
+            analysis_result = analysis.result()
+            region_screener.record_analysis(decision, analysis_result,
+                                            observation.processing_time + analysis_result.processing_time)
             
             # Update monitoring status with results
-            monitoring_status.threat_level = analysis_result.get('threat_level', 'normal')
-            monitoring_status.anomalies_detected = analysis_result.get('anomalies_count', 0)
-            monitoring_status.processing_time_seconds = analysis_result.get('processing_time', 0)
-            monitoring_status.updated_at = datetime.utcnow()
-            
-            # Generate alerts for detected threats
-            new_alerts = []
-            threats = analysis_result.get('threats', [])
+            status.update(
+                threat_level=analysis_result.threat_level,
+                anomalies_detected=analysis_result.anomalies_count,
+                processing_time_seconds=analysis_result.processing_time,
+                updated_at=datetime.utcnow()
+            )
             
-            for threat in threats:
-                # Check if similar alert already exists
-                existing_alert = Alert.query.filter_by(
-                    region_id=region.id,
-                    disaster_type=threat['type'],
-                    status=AlertStatus.ACTIVE
-                ).first()
-                
-                if not existing_alert:
-                    alert = self._create_alert_from_threat(region, threat)
-                    new_alerts.append(alert)
-                    db.session.add(alert)
+            # Generate alerts for detected threats, serialized with other background writes
+            with DB_COMMIT_SECONDS.labels(operation='monitor_region').time():
+                changes = sqlite_writer.run_write(self._store_alerts, region.id, analysis_result.threats)
             
-            db.session.commit()
+            new_alerts = sum(1 for change in changes if change.event == 'new_alert')
+            if changes:
+                # Emit real-time updates for the new alerts and the incidents they joined
+                change_feed.publish(changes)
+                logging.info(f"Generated {new_alerts} new alerts for {region.name}")
             
-            # Emit real-time updates if new alerts created
-            if new_alerts:
-                for alert in new_alerts:
-                    socketio.emit('new_alert', {
-                        'alert_id': alert.id,
-                        'region_name': region.name,
-                        'disaster_type': alert.disaster_type.value,
-                        'severity': alert.severity.value,
-                        'title': alert.title,
-                        'confidence': alert.confidence_score,
-                        'detected_at': alert.detected_at.isoformat()
-                    })
-                
-                logging.info(f"Generated {len(new_alerts)} new alerts for {region.name}")
-            
-            # Emit region status update
-            socketio.emit('region_status_update', {
+            status_buffer.update(region.id, status, notification={
                 'region_id': region.id,
                 'region_name': region.name,
-                'threat_level': monitoring_status.threat_level,
-                'anomalies': monitoring_status.anomalies_detected,
-                'last_analysis': monitoring_status.last_analysis_at.isoformat(),
-                'new_alerts': len(new_alerts)
+                'threat_level': status['threat_level'],
+                'anomalies': status['anomalies_detected'],
+                'last_analysis': status['last_analysis_at'].isoformat(),
+                'new_alerts': new_alerts
             })
             
         except Exception as e:
             logging.error(f"Error monitoring region {region.name}: {str(e)}")
+            db.session.rollback()
             
             # Update monitoring status with error
-            if 'monitoring_status' in locals():
-                monitoring_status.threat_level = 'error'
-                monitoring_status.updated_at = datetime.utcnow()
-                db.session.commit()
+            status.update(threat_level='error', updated_at=datetime.utcnow())
+            status_buffer.update(region.id, status)
     
-    def _create_alert_from_threat(self, region: Region, threat: dict) -> Alert:
-        """Create an Alert object from a detected threat"""
-        from models import DisasterType, AlertSeverity
+    def _store_alerts(self, region_id: int, threats: List[Threat]) -> List[PendingChange]:
+        """
+        Add alerts for threats without an active alert of the same type and link
+        them to incidents, logged for the change feed. Runs on the writer thread,
+        so the region is loaded in its session.
+        """
+        region = db.session.get(Region, region_id)
+        new_alerts = []
+        projections = []
         
+        for threat in threats:
+            # Check if similar alert already exists
+            existing_alert = Alert.query.filter_by(
+                region_id=region.id,
+                disaster_type=DisasterType(threat.type),
+                status=AlertStatus.ACTIVE
+            ).first()
+            
+            if not existing_alert:
+                alert = self._create_alert_from_threat(region, threat)
+                new_alerts.append(alert)
+                db.session.add(alert)
+                if threat.projection:
+                    projections.append((alert, threat.projection))
+        
+        if not new_alerts:
+            return []
+        
+        # Log the alerts in the same transaction so reconnecting clients can replay them
+        db.session.flush()
+        for alert, projection in projections:
+            db.session.add(HazardProjection.from_projection(alert.id, projection))
+        changes = [change_feed.record('new_alert', {
+            'alert_id': alert.id,
+            'region_name': region.name,
+            'disaster_type': alert.disaster_type.value,
+            'severity': alert.severity.value,
+            'title': alert.title,
+            'confidence': alert.confidence_score,
+            'detected_at': alert.detected_at.isoformat()
+        }) for alert in new_alerts]
+        return changes + incident_correlator.correlate(new_alerts)
+    
+    def _create_alert_from_threat(self, region: Region, threat: Threat) -> Alert:
+        """Create an Alert object from a detected threat"""
         alert = Alert(
             region_id=region.id,
-            disaster_type=DisasterType(threat['type']),
-            severity=AlertSeverity(threat['severity']),
-            title=threat['title'],
-            description=threat['description'],
-            latitude=threat.get('latitude', region.center_latitude),
-            longitude=threat.get('longitude', region.center_longitude),
-            confidence_score=threat.get('confidence', 0.0),
-            prediction_model=threat.get('model', 'DisasterDetectionAI'),
-            estimated_affected_population=threat.get('affected_population', 0),
+            disaster_type=DisasterType(threat.type),
+            severity=AlertSeverity(threat.severity),
+            title=threat.title,
+            description=threat.description,
+            latitude=threat.latitude if threat.latitude is not None else region.center_latitude,
+            longitude=threat.longitude if threat.longitude is not None else region.center_longitude,
+            confidence_score=threat.confidence,
+            prediction_model=threat.model or 'DisasterDetectionAI',
+            estimated_affected_population=threat.affected_population,
+            affected_radius_km=threat.affected_radius_km,
             detected_at=datetime.utcnow()
         )
         
         return alert
     
+    def _refresh_statistics(self):
+        """Incrementally refresh the materialized statistics rollups"""
+        with app.app_context():
+            sqlite_writer.run_write(refresh_statistics)
+    
+    def _archive_alerts(self):
+        """Move closed alerts past retention out of the hot alert table and prune the change log"""
+        with app.app_context():
+            sqlite_writer.run_write(archive_closed_alerts)
+            sqlite_writer.run_write(change_feed.prune)
+    
     def _update_system_health(self):
         """Update system health metrics"""
         with app.app_context():
@@ -208,17 +332,17 @@ class MonitoringService:
                 monitoring_regions = MonitoringStatus.query.filter_by(is_monitoring=True).count()
                 
                 # Update all monitoring statuses with system health
-                monitoring_statuses = MonitoringStatus.query.all()
-                
-                for status in monitoring_statuses:
-                    # Mock system metrics (in real implementation, get actual metrics)
-                    status.cpu_usage = min(50 + (active_alerts * 2), 95)  # Mock CPU usage
-                    status.memory_usage = min(40 + (monitoring_regions * 3), 90)  # Mock memory usage
+                # Mock system metrics (in real implementation, get actual metrics)
+                cpu_usage = min(50 + (active_alerts * 2), 95)  # Mock CPU usage
+                memory_usage = min(40 + (monitoring_regions * 3), 90)  # Mock memory usage
                 
-                db.session.commit()
+                with DB_COMMIT_SECONDS.labels(operation='system_health').time():
+                    sqlite_writer.run_write(lambda: db.session.execute(
+                        update(MonitoringStatus).values(cpu_usage=cpu_usage, memory_usage=memory_usage)
+                    ))
                 
                 # Emit system health update
-                socketio.emit('system_health_update', {
+                emit_event('system_health_update', {
                     'timestamp': datetime.utcnow().isoformat(),
                     'active_alerts': active_alerts,
                     'monitoring_regions': monitoring_regions,
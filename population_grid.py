@@ -0,0 +1,246 @@
+import os
+import math
+import zlib
+import logging
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from records import RegionBounds, Threat
+import metrics
+
+KM_PER_DEGREE = 111.32
+DEFAULT_CELL_DEGREES = 0.005
+# North-south strips a circular or polygonal footprint is split into; each is one box query
+FOOTPRINT_STRIPS = 16
+
+# Metropolitan populations used to scale the synthetic grid when no raster file exists
+REGION_POPULATIONS = {
+    'Delhi': 30000000,
+    'Mumbai': 20000000,
+    'Bangalore': 12500000,
+    'Pune': 7500000,
+    'Jammu': 1500000
+}
+DEFAULT_REGION_POPULATION = 5000000
+
+POPULATION_GRID_LOADS = metrics.counter(
+    'population_grid_loads',
+    'Population grids loaded into memory, by source (file, synthetic)',
+    ('source',))
+
+
+class PopulationGrid:
+    """
+    Gridded population of a region (north-up, one count per cell) with a
+    summed-area table, so the population inside any box is four lookups.
+    Lookups interpolate the table bilinearly, which is exact for population
+    spread evenly within each cell, so partial cells count proportionally.
+    Circles and polygons are split into a fixed number of strips, making
+    every footprint query O(1) in the grid size.
+    """
+
+    def __init__(self, population: np.ndarray, min_lat: float, max_lat: float,
+                 min_lon: float, max_lon: float):
+        self.rows, self.cols = population.shape
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+        self.min_lon = min_lon
+        self.max_lon = max_lon
+        self.lat_step = (max_lat - min_lat) / self.rows
+        self.lon_step = (max_lon - min_lon) / self.cols
+
+        self.population = np.asarray(population, dtype=np.float64)
+        self.cell_area_km2 = (self.lat_step * KM_PER_DEGREE) * (self.lon_step * KM_PER_DEGREE) \
+            * math.cos(math.radians((min_lat + max_lat) / 2))
+
+        table = np.zeros((self.rows + 1, self.cols + 1), dtype=np.float64)
+        np.cumsum(np.cumsum(self.population, axis=0, dtype=np.float64), axis=1, out=table[1:, 1:])
+        self._table = table
+
+    @property
+    def total(self) -> float:
+        return float(self._table[-1, -1])
+
+    def covers(self, bounds: RegionBounds) -> bool:
+        return (self.min_lat <= bounds.min_latitude and bounds.max_latitude <= self.max_lat
+                and self.min_lon <= bounds.min_longitude and bounds.max_longitude <= self.max_lon)
+
+    def _cumulative(self, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """Population above row ``y`` and left of column ``x`` (fractional cell coordinates)"""
+        y = np.clip(y, 0, self.rows)
+        x = np.clip(x, 0, self.cols)
+        y0 = np.minimum(np.floor(y).astype(np.intp), self.rows - 1)
+        x0 = np.minimum(np.floor(x).astype(np.intp), self.cols - 1)
+        fy = y - y0
+        fx = x - x0
+        table = self._table
+        top = table[y0, x0] * (1 - fx) + table[y0, x0 + 1] * fx
+        bottom = table[y0 + 1, x0] * (1 - fx) + table[y0 + 1, x0 + 1] * fx
+        return top * (1 - fy) + bottom * fy
+
+    def _boxes(self, y0: np.ndarray, y1: np.ndarray, x0: np.ndarray, x1: np.ndarray) -> float:
+        """Total population of boxes given in cell coordinates"""
+        if len(y0) == 0:
+            return 0.0
+        total = (self._cumulative(y1, x1) - self._cumulative(y0, x1)
+                 - self._cumulative(y1, x0) + self._cumulative(y0, x0))
+        return float(np.maximum(total, 0.0).sum())
+
+    def _rows(self, latitude) -> np.ndarray:
+        return (self.max_lat - np.asarray(latitude, dtype=np.float64)) / self.lat_step
+
+    def _cols(self, longitude) -> np.ndarray:
+        return (np.asarray(longitude, dtype=np.float64) - self.min_lon) / self.lon_step
+
+    def density_grid(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """People per km² at every (latitude, longitude) pair of two axes; zero outside the grid"""
+        rows = np.floor(self._rows(latitudes)).astype(np.intp)
+        cols = np.floor(self._cols(longitudes)).astype(np.intp)
+        density = self.population[np.ix_(np.clip(rows, 0, self.rows - 1), np.clip(cols, 0, self.cols - 1))]
+        inside = np.outer((rows >= 0) & (rows < self.rows), (cols >= 0) & (cols < self.cols))
+        return np.where(inside, density / self.cell_area_km2, 0.0)
+
+    def box_population(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> float:
+        return self._boxes(self._rows([max_lat]), self._rows([min_lat]),
+                           self._cols([min_lon]), self._cols([max_lon]))
+
+    def circle_population(self, latitude: float, longitude: float, radius_km: float) -> float:
+        """Population within ``radius_km`` of a point"""
+        if radius_km <= 0:
+            return 0.0
+        # Strip widths are chosen so each strip has the area of the circle slice it replaces
+        edges = np.linspace(-radius_km, radius_km, FOOTPRINT_STRIPS + 1)
+        clipped = np.clip(edges / radius_km, -1.0, 1.0)
+        integral = edges * np.sqrt(np.maximum(radius_km ** 2 - edges ** 2, 0.0)) + radius_km ** 2 * np.arcsin(clipped)
+        half_widths = np.diff(integral) / (2 * np.diff(edges))
+
+        km_per_lon = KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6)
+        south = latitude + edges[:-1] / KM_PER_DEGREE
+        north = latitude + edges[1:] / KM_PER_DEGREE
+        return self._boxes(self._rows(north), self._rows(south),
+                           self._cols(longitude - half_widths / km_per_lon),
+                           self._cols(longitude + half_widths / km_per_lon))
+
+    def polygon_population(self, ring: Sequence[Sequence[float]]) -> float:
+        """Population inside a closed ring of [longitude, latitude] pairs (even-odd rule)"""
+        points = np.asarray(ring, dtype=np.float64)
+        if len(points) < 3:
+            return 0.0
+        xs, ys = self._cols(points[:, 0]), self._rows(points[:, 1])
+        edges = np.linspace(ys.min(), ys.max(), FOOTPRINT_STRIPS + 1)
+
+        y0, y1, x0, x1 = [], [], [], []
+        for top, bottom in zip(edges[:-1], edges[1:]):
+            middle = (top + bottom) / 2
+            crossings = []
+            for i in range(len(points) - 1):
+                ya, yb = ys[i], ys[i + 1]
+                if (ya <= middle) != (yb <= middle):
+                    crossings.append(xs[i] + (middle - ya) * (xs[i + 1] - xs[i]) / (yb - ya))
+            crossings.sort()
+            for left, right in zip(crossings[::2], crossings[1::2]):
+                y0.append(top)
+                y1.append(bottom)
+                x0.append(left)
+                x1.append(right)
+        return self._boxes(np.array(y0), np.array(y1), np.array(x0), np.array(x1))
+
+    @classmethod
+    def load(cls, path: str) -> 'PopulationGrid':
+        """Load a grid saved as .npz with a ``population`` array and its bounds"""
+        with np.load(path) as data:
+            return cls(data['population'], float(data['min_latitude']), float(data['max_latitude']),
+                       float(data['min_longitude']), float(data['max_longitude']))
+
+    @classmethod
+    def synthetic(cls, region_name: str, bounds: RegionBounds, total_population: float,
+                  cell_degrees: float = DEFAULT_CELL_DEGREES) -> 'PopulationGrid':
+        """
+        Plausible stand-in raster: a dense urban core at the region center, a
+        few secondary centers and a rural floor, scaled to ``total_population``.
+        The layout is derived from the region name, so every process builds
+        the same grid.
+        """
+        rows = max(1, math.ceil((bounds.max_latitude - bounds.min_latitude) / cell_degrees))
+        cols = max(1, math.ceil((bounds.max_longitude - bounds.min_longitude) / cell_degrees))
+        y, x = np.mgrid[0:rows, 0:cols].astype(np.float64)
+        y = (y + 0.5) / rows
+        x = (x + 0.5) / cols
+
+        rng = np.random.default_rng(zlib.crc32(region_name.encode()))
+        density = np.full((rows, cols), 0.05) + np.exp(-((y - 0.5) ** 2 + (x - 0.5) ** 2) / (2 * 0.2 ** 2))
+        for center_y, center_x in rng.uniform(0.15, 0.85, size=(3, 2)):
+            density += 0.3 * np.exp(-((y - center_y) ** 2 + (x - center_x) ** 2) / (2 * 0.08 ** 2))
+        density *= total_population / density.sum()
+
+        return cls(density, bounds.min_latitude, bounds.max_latitude, bounds.min_longitude, bounds.max_longitude)
+
+
+class PopulationExposureIndex:
+    """
+    Population grids per region, built once per process on first use. A grid
+    is read from ``<POPULATION_GRID_DIR>/<region name>.npz`` when present and
+    covering the region's bounds, and otherwise synthesized from the region's
+    metropolitan population, so the cached grid always covers the bounds it
+    was built for.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._grids: Dict[str, PopulationGrid] = {}
+        self._lock = threading.Lock()
+
+    def grid(self, region_name: str, bounds: RegionBounds) -> PopulationGrid:
+        grid = self._grids.get(region_name)
+        if grid is not None and grid.covers(bounds):
+            return grid
+        with self._lock:
+            grid = self._grids.get(region_name)
+            if grid is None or not grid.covers(bounds):
+                grid = self._load(region_name, bounds)
+                self._grids[region_name] = grid
+            return grid
+
+    def _load(self, region_name: str, bounds: RegionBounds) -> PopulationGrid:
+        if self.directory:
+            path = os.path.join(self.directory, f'{region_name}.npz')
+            if os.path.exists(path):
+                try:
+                    grid = PopulationGrid.load(path)
+                    if grid.covers(bounds):
+                        POPULATION_GRID_LOADS.labels(source='file').inc()
+                        return grid
+                    logging.warning(f"Population grid {path} does not cover the bounds of {region_name}; "
+                                    f"using a synthetic grid")
+                except Exception as e:
+                    logging.error(f"Error loading population grid {path}: {str(e)}")
+
+        POPULATION_GRID_LOADS.labels(source='synthetic').inc()
+        return PopulationGrid.synthetic(region_name, bounds,
+                                        REGION_POPULATIONS.get(region_name, DEFAULT_REGION_POPULATION))
+
+    def affected_population(self, region_name: str, bounds: RegionBounds, threat: Threat) -> int:
+        """
+        Population inside a threat's footprint: its change polygons when imagery
+        located it, otherwise the circle of ``affected_radius_km`` around its
+        position (the region center when it has none).
+        """
+        grid = self.grid(region_name, bounds)
+        if threat.change_polygons:
+            return int(sum(grid.polygon_population(polygon['polygon'])
+                           for polygon in threat.change_polygons if polygon.get('polygon')))
+
+        latitude, longitude = self._position(threat, bounds)
+        return int(grid.circle_population(latitude, longitude, threat.affected_radius_km or 0.0))
+
+    @staticmethod
+    def _position(threat: Threat, bounds: RegionBounds) -> Tuple[float, float]:
+        if threat.latitude is not None and threat.longitude is not None:
+            return threat.latitude, threat.longitude
+        return ((bounds.min_latitude + bounds.max_latitude) / 2,
+                (bounds.min_longitude + bounds.max_longitude) / 2)
+
+
+population_index = PopulationExposureIndex(os.environ.get('POPULATION_GRID_DIR'))
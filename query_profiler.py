@@ -0,0 +1,178 @@
+import os
+import re
+import time
+import heapq
+import threading
+import logging
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statement shapes repeated at least this often in one request are flagged as N+1
+N_PLUS_ONE_THRESHOLD = 5
+SLOWEST_STATEMENTS = 5
+RECENT_PROFILES = 200
+
+_IN_LIST = re.compile(r'IN\s*\((?:\s*(?:\?|%\([^)]*\)s|:\w+|\d+)\s*,?)+\)', re.IGNORECASE)
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so repeated queries differing only in values compare equal"""
+    shape = _STRING.sub('?', statement)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    shape = _NUMBER.sub('?', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryProfile:
+    """Query statistics collected for a single request"""
+
+    def __init__(self, endpoint: str, path: str, method: str):
+        self.endpoint = endpoint
+        self.path = path
+        self.method = method
+        self.started_at = datetime.utcnow()
+        self.query_count = 0
+        self.total_time = 0.0
+        self.status_code = None
+        self._slowest: List[Tuple[float, int, str]] = []
+        self._shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.query_count += 1
+        self.total_time += duration
+        self._shapes[statement_shape(statement)] += 1
+
+        entry = (duration, self.query_count, statement)
+        if len(self._slowest) < SLOWEST_STATEMENTS:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def slowest(self) -> List[Dict[str, Any]]:
+        return [{'duration_ms': duration * 1000, 'statement': statement}
+                for duration, _, statement in sorted(self._slowest, reverse=True)]
+
+    @property
+    def repeated_statements(self) -> List[Dict[str, Any]]:
+        """Statement shapes executed often enough to suggest an N+1 pattern"""
+        return [{'shape': shape, 'count': count}
+                for shape, count in self._shapes.most_common()
+                if count >= N_PLUS_ONE_THRESHOLD]
+
+    def header_value(self) -> str:
+        return (f'queries={self.query_count}; db_ms={self.total_time * 1000:.1f}; '
+                f'n_plus_one={len(self.repeated_statements)}')
+
+
+class QueryProfiler:
+    """
+    Opt-in per-request SQL profiler. Hooks SQLAlchemy engine events, attributes
+    each statement to the current Flask request, reports a summary in the
+    X-Query-Profile response header and keeps recent profiles for the admin page.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.recent: deque = deque(maxlen=RECENT_PROFILES)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_PROFILING', os.environ.get('SQL_PROFILING') == '1')
+        if not self.enabled:
+            return
+
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+        app.before_request(self._start_profile)
+        app.after_request(self._finish_profile)
+        logging.info("SQL query profiling enabled")
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('query_start_time')
+        if not start_times:
+            return
+        duration = time.perf_counter() - start_times.pop()
+
+        # Queries from the scheduler thread or CLI have no request to attribute to
+        if has_request_context():
+            profile = g.get('query_profile')
+            if profile is not None:
+                profile.record(statement, duration)
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute, so drop its start time here;
+        # connect errors have no execution context and never pushed one
+        conn = exception_context.connection
+        if conn is None or exception_context.execution_context is None:
+            return
+        start_times = conn.info.get('query_start_time')
+        if start_times:
+            start_times.pop()
+
+    def _start_profile(self):
+        g.query_profile = QueryProfile(request.endpoint or 'unmatched', request.path, request.method)
+
+    def _finish_profile(self, response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+
+        profile.status_code = response.status_code
+        response.headers['X-Query-Profile'] = profile.header_value()
+        response.headers['Server-Timing'] = f'db;dur={profile.total_time * 1000:.1f};desc="{profile.query_count} queries"'
+
+        with self._lock:
+            self.recent.append(profile)
+        if profile.repeated_statements:
+            logging.warning(f"Possible N+1 query pattern on {profile.endpoint}: "
+                            f"{profile.repeated_statements[0]['count']}x "
+                            f"{profile.repeated_statements[0]['shape'][:120]}")
+        return response
+
+    def endpoint_summary(self) -> List[Dict[str, Any]]:
+        """Aggregate recent profiles per endpoint, most expensive first"""
+        with self._lock:
+            profiles = list(self.recent)
+
+        summary: Dict[str, Dict[str, Any]] = {}
+        for profile in profiles:
+            entry = summary.setdefault(profile.endpoint, {
+                'endpoint': profile.endpoint,
+                'requests': 0,
+                'total_queries': 0,
+                'max_queries': 0,
+                'total_db_ms': 0.0,
+                'n_plus_one_requests': 0
+            })
+            entry['requests'] += 1
+            entry['total_queries'] += profile.query_count
+            entry['max_queries'] = max(entry['max_queries'], profile.query_count)
+            entry['total_db_ms'] += profile.total_time * 1000
+            if profile.repeated_statements:
+                entry['n_plus_one_requests'] += 1
+
+        for entry in summary.values():
+            entry['avg_queries'] = entry['total_queries'] / entry['requests']
+            entry['avg_db_ms'] = entry['total_db_ms'] / entry['requests']
+
+        return sorted(summary.values(), key=lambda e: e['avg_db_ms'], reverse=True)
+
+    def recent_profiles(self, limit: int = 50) -> List[QueryProfile]:
+        with self._lock:
+            return list(self.recent)[-limit:][::-1]
+
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,332 @@
+import os
+import json
+import shutil
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+
+# Band order of every tile: (bands, rows, cols)
+BAND_NAMES = ('blue', 'green', 'red', 'nir', 'swir', 'thermal')
+BAND_INDEX = {name: i for i, name in enumerate(BAND_NAMES)}
+
+TIMESTAMP_FORMAT = '%Y%m%dT%H%M%S%f'
+
+RASTER_TILE_CACHE = metrics.counter(
+    'raster_tile_cache_requests',
+    'Memory-mapped tile lookups by result (hit, miss)',
+    ('result',))
+RASTER_MAPPED_BYTES = metrics.gauge(
+    'raster_mapped_bytes',
+    'Bytes of tile data currently memory-mapped by the raster store')
+
+
+class RegionGrid:
+    """Pixel grid of a region: geographic bounds, scene size and tiling"""
+
+    def __init__(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                 height: int, width: int, tile_size: int, bands: int = len(BAND_NAMES),
+                 dtype: str = 'float32'):
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+        self.min_lon = min_lon
+        self.max_lon = max_lon
+        self.height = height
+        self.width = width
+        self.tile_size = tile_size
+        self.bands = bands
+        self.dtype = dtype
+
+    @property
+    def tile_rows(self) -> int:
+        return -(-self.height // self.tile_size)
+
+    @property
+    def tile_cols(self) -> int:
+        return -(-self.width // self.tile_size)
+
+    @property
+    def pixel_area_km2(self) -> float:
+        """Approximate ground area of one pixel"""
+        center_lat = np.radians((self.min_lat + self.max_lat) / 2)
+        height_km = (self.max_lat - self.min_lat) * 111.32
+        width_km = (self.max_lon - self.min_lon) * 111.32 * np.cos(center_lat)
+        return float(height_km * width_km / (self.height * self.width))
+
+    def tile_shape(self, tile_row: int, tile_col: int) -> Tuple[int, int, int]:
+        rows = min(self.tile_size, self.height - tile_row * self.tile_size)
+        cols = min(self.tile_size, self.width - tile_col * self.tile_size)
+        return self.bands, rows, cols
+
+    def bbox_to_window(self, min_lat: float, max_lat: float,
+                       min_lon: float, max_lon: float) -> Tuple[int, int, int, int]:
+        """
+        Pixel window (row0, row1, col0, col1) covering a bounding box, clamped to
+        the grid; row 0 is the north edge. A box outside the grid gives an empty
+        window (row0 == row1 or col0 == col1).
+        """
+        lat_span = self.max_lat - self.min_lat
+        lon_span = self.max_lon - self.min_lon
+        row0 = int(np.floor((self.max_lat - max_lat) / lat_span * self.height))
+        row1 = int(np.ceil((self.max_lat - min_lat) / lat_span * self.height))
+        col0 = int(np.floor((min_lon - self.min_lon) / lon_span * self.width))
+        col1 = int(np.ceil((max_lon - self.min_lon) / lon_span * self.width))
+        row0, col0 = min(max(row0, 0), self.height), min(max(col0, 0), self.width)
+        return (row0, max(min(row1, self.height), row0), col0, max(min(col1, self.width), col0))
+
+    def window_to_bbox(self, row0: int, row1: int, col0: int, col1: int) -> Dict[str, float]:
+        lat_step = (self.max_lat - self.min_lat) / self.height
+        lon_step = (self.max_lon - self.min_lon) / self.width
+        return {
+            'min_latitude': self.max_lat - row1 * lat_step,
+            'max_latitude': self.max_lat - row0 * lat_step,
+            'min_longitude': self.min_lon + col0 * lon_step,
+            'max_longitude': self.min_lon + col1 * lon_step
+        }
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RegionGrid':
+        return cls(**data)
+
+
+class RasterTileStore:
+    """
+    On-disk store of multi-band raster tiles, one ``.npy`` file per
+    (region, acquisition time, tile). Tiles are opened as read-only memory maps
+    and kept in an LRU bounded by ``page_budget_bytes`` of mapped data, so
+    windowed reads touch only the pages they need and whole scenes are never
+    loaded into RAM.
+
+    Layout: ``<root>/<region>/grid.json`` and
+    ``<root>/<region>/<acquired_at>/<tile_row>_<tile_col>.npy``.
+    """
+
+    def __init__(self, root_dir: str, page_budget_bytes: int = 256 * 1024 * 1024,
+                 max_acquisitions: int = 8):
+        self.root_dir = root_dir
+        self.page_budget_bytes = page_budget_bytes
+        self.max_acquisitions = max_acquisitions
+        self._grids: Dict[str, RegionGrid] = {}
+        self._open_tiles: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._mapped_bytes = 0
+        self._lock = threading.RLock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    # Region grids
+
+    def _region_dir(self, region: str) -> str:
+        return os.path.join(self.root_dir, region)
+
+    def ensure_grid(self, region: str, grid: RegionGrid) -> RegionGrid:
+        """Register a region's pixel grid, keeping an existing definition if present"""
+        existing = self.get_grid(region)
+        if existing is not None:
+            return existing
+
+        os.makedirs(self._region_dir(region), exist_ok=True)
+        path = os.path.join(self._region_dir(region), 'grid.json')
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(grid.to_dict(), f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._grids[region] = grid
+        return grid
+
+    def get_grid(self, region: str) -> Optional[RegionGrid]:
+        grid = self._grids.get(region)
+        if grid is None:
+            path = os.path.join(self._region_dir(region), 'grid.json')
+            if not os.path.exists(path):
+                return None
+            with open(path) as f:
+                grid = RegionGrid.from_dict(json.load(f))
+            with self._lock:
+                self._grids[region] = grid
+        return grid
+
+    # Acquisitions
+
+    def acquisitions(self, region: str) -> List[datetime]:
+        """Acquisition times stored for a region, oldest first"""
+        region_dir = self._region_dir(region)
+        if not os.path.isdir(region_dir):
+            return []
+        times = []
+        for name in os.listdir(region_dir):
+            try:
+                times.append(datetime.strptime(name, TIMESTAMP_FORMAT))
+            except ValueError:
+                continue
+        return sorted(times)
+
+    def _tile_path(self, region: str, acquired_at: datetime, tile_row: int, tile_col: int) -> str:
+        return os.path.join(self._region_dir(region), acquired_at.strftime(TIMESTAMP_FORMAT),
+                            f'{tile_row}_{tile_col}.npy')
+
+    def write_tile(self, region: str, acquired_at: datetime, tile_row: int, tile_col: int,
+                   data: np.ndarray):
+        """Write one tile atomically (readers never see a partial file)"""
+        path = self._tile_path(region, acquired_at, tile_row, tile_col)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(data))
+        os.replace(tmp_path, path)
+
+    def write_scene(self, region: str, acquired_at: datetime, scene: np.ndarray):
+        """Split a (bands, rows, cols) scene into tiles and store them"""
+        grid = self.get_grid(region)
+        if grid is None:
+            raise ValueError(f"No grid registered for region '{region}'")
+        for tile_row in range(grid.tile_rows):
+            for tile_col in range(grid.tile_cols):
+                r0, c0 = tile_row * grid.tile_size, tile_col * grid.tile_size
+                self.write_tile(region, acquired_at, tile_row, tile_col,
+                                scene[:, r0:r0 + grid.tile_size, c0:c0 + grid.tile_size])
+        self.prune(region)
+
+    def prune(self, region: str):
+        """Drop the oldest acquisitions beyond ``max_acquisitions``"""
+        times = self.acquisitions(region)
+        for acquired_at in times[:-self.max_acquisitions] if self.max_acquisitions else []:
+            directory = os.path.join(self._region_dir(region), acquired_at.strftime(TIMESTAMP_FORMAT))
+            with self._lock:
+                for key in [key for key in self._open_tiles if key.startswith(directory + os.sep)]:
+                    self._release(key)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    # Memory-mapped reads
+
+    def open_tile(self, region: str, acquired_at: datetime, tile_row: int,
+                  tile_col: int) -> Optional[np.ndarray]:
+        """Memory-map a tile read-only; returns None if the tile does not exist"""
+        path = self._tile_path(region, acquired_at, tile_row, tile_col)
+        with self._lock:
+            tile = self._open_tiles.get(path)
+            if tile is not None:
+                self._open_tiles.move_to_end(path)
+                RASTER_TILE_CACHE.labels(result='hit').inc()
+                return tile
+
+        if not os.path.exists(path):
+            return None
+        tile = np.load(path, mmap_mode='r')
+        RASTER_TILE_CACHE.labels(result='miss').inc()
+
+        with self._lock:
+            existing = self._open_tiles.get(path)
+            if existing is not None:
+                # Another thread mapped it meanwhile; keep one map so the byte count stays exact
+                self._open_tiles.move_to_end(path)
+                return existing
+            self._open_tiles[path] = tile
+            self._mapped_bytes += tile.nbytes
+            # Evict least recently used maps until within the page budget (always keep this one)
+            while self._mapped_bytes > self.page_budget_bytes and len(self._open_tiles) > 1:
+                self._release(next(iter(self._open_tiles)))
+            RASTER_MAPPED_BYTES.set(self._mapped_bytes)
+        return tile
+
+    def _release(self, path: str):
+        tile = self._open_tiles.pop(path, None)
+        if tile is not None:
+            # The mapping is unmapped once the last view of it is garbage collected
+            self._mapped_bytes -= tile.nbytes
+
+    def read_window(self, region: str, acquired_at: datetime, row0: int, row1: int,
+                    col0: int, col1: int, bands: Optional[List[int]] = None) -> np.ndarray:
+        """
+        Read a pixel window. A window inside a single tile is returned as a
+        zero-copy view of the memory map when ``bands`` is None or a run of
+        consecutive band indices; other band lists, and windows spanning
+        tiles, are assembled into a new array. Missing tiles read as NaN, and
+        an empty window reads as an empty array.
+        """
+        grid = self.get_grid(region)
+        if grid is None:
+            raise ValueError(f"No grid registered for region '{region}'")
+        band_index = slice(None) if bands is None else _band_slice(bands) or list(bands)
+        size = grid.tile_size
+
+        if row1 <= row0 or col1 <= col0:
+            band_count = grid.bands if bands is None else len(bands)
+            return np.empty((band_count, max(row1 - row0, 0), max(col1 - col0, 0)), dtype=grid.dtype)
+
+        first_tile_row, last_tile_row = row0 // size, (row1 - 1) // size
+        first_tile_col, last_tile_col = col0 // size, (col1 - 1) // size
+
+        if first_tile_row == last_tile_row and first_tile_col == last_tile_col:
+            tile = self.open_tile(region, acquired_at, first_tile_row, first_tile_col)
+            if tile is not None:
+                r, c = first_tile_row * size, first_tile_col * size
+                return tile[band_index, row0 - r:row1 - r, col0 - c:col1 - c]
+
+        band_list = list(range(grid.bands)) if bands is None else list(bands)
+        window = np.empty((len(band_list), row1 - row0, col1 - col0), dtype=grid.dtype)
+        for tile_row in range(first_tile_row, last_tile_row + 1):
+            for tile_col in range(first_tile_col, last_tile_col + 1):
+                r, c = tile_row * size, tile_col * size
+                tile = self.open_tile(region, acquired_at, tile_row, tile_col)
+                if tile is None:
+                    _, rows, cols = grid.tile_shape(tile_row, tile_col)
+                else:
+                    rows, cols = tile.shape[1], tile.shape[2]
+                src_r0, src_r1 = max(row0 - r, 0), min(row1 - r, rows)
+                src_c0, src_c1 = max(col0 - c, 0), min(col1 - c, cols)
+                dst_rows = slice(r + src_r0 - row0, r + src_r1 - row0)
+                dst_cols = slice(c + src_c0 - col0, c + src_c1 - col0)
+                if tile is None:
+                    window[:, dst_rows, dst_cols] = np.nan
+                    continue
+                # Copy band by band with basic slicing so each pixel is copied once
+                for i, band in enumerate(band_list):
+                    window[i, dst_rows, dst_cols] = tile[band, src_r0:src_r1, src_c0:src_c1]
+        return window
+
+    def read_bbox(self, region: str, acquired_at: datetime, min_lat: float, max_lat: float,
+                  min_lon: float, max_lon: float, bands: Optional[List[int]] = None) -> np.ndarray:
+        """Read the pixels covering a geographic bounding box"""
+        grid = self.get_grid(region)
+        if grid is None:
+            raise ValueError(f"No grid registered for region '{region}'")
+        row0, row1, col0, col1 = grid.bbox_to_window(min_lat, max_lat, min_lon, max_lon)
+        return self.read_window(region, acquired_at, row0, row1, col0, col1, bands)
+
+
+def _band_slice(bands: List[int]) -> Optional[slice]:
+    """Basic slice selecting ``bands`` if they are consecutive ascending indices, so indexing stays a view"""
+    bands = list(bands)
+    if bands and bands == list(range(bands[0], bands[0] + len(bands))):
+        return slice(bands[0], bands[0] + len(bands))
+    return None
+
+
+_default_store: Optional[RasterTileStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_raster_store() -> Optional[RasterTileStore]:
+    """The process-wide store configured by RASTER_STORE_DIR, or None if imagery is disabled"""
+    global _default_store
+
+    root_dir = os.environ.get('RASTER_STORE_DIR')
+    if not root_dir:
+        return None
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = RasterTileStore(
+                    root_dir,
+                    page_budget_bytes=int(os.environ.get('RASTER_PAGE_BUDGET_MB', 256)) * 1024 * 1024
+                )
+                logging.info(f"Raster tile store opened at {root_dir}")
+    return _default_store
@@ -0,0 +1,19 @@
+import time
+from typing import Any, Dict
+
+from app import socketio
+import metrics
+
+SOCKETIO_EMIT_SECONDS = metrics.histogram(
+    'socketio_emit_duration_seconds',
+    'Time spent fanning out a Socket.IO event to connected clients',
+    ('event',))
+
+
+def emit_event(event: str, payload: Dict[str, Any], **kwargs):
+    """Broadcast a Socket.IO event to clients, recording fan-out latency"""
+    start = time.perf_counter()
+    try:
+        socketio.emit(event, payload, **kwargs)
+    finally:
+        SOCKETIO_EMIT_SECONDS.labels(event=event).observe(time.perf_counter() - start)
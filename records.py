@@ -0,0 +1,251 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+class Record:
+    """
+    Base for the slotted analysis records. Records carry no per-instance
+    ``__dict__``; ``to_dict`` produces the dict shape used by templates, JSON
+    responses and the database layer, and ``from_dict`` accepts it back
+    (missing keys fall back to the field defaults).
+    """
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        if isinstance(data, cls):
+            return data
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+@dataclass(slots=True)
+class RegionBounds(Record):
+    min_latitude: float
+    max_latitude: float
+    min_longitude: float
+    max_longitude: float
+
+
+@dataclass(slots=True)
+class DataSource(Record):
+    satellite: str
+    image_type: str
+    resolution: str
+    cloud_cover: float
+    quality_score: float
+    acquisition_angle: float
+
+
+@dataclass(slots=True)
+class ImageMetadata(Record):
+    image_id: str
+    pixel_count: int
+    bands_available: int
+    bit_depth: int
+    compression: str
+    geometric_accuracy: float
+    radiometric_quality: float
+
+
+@dataclass(slots=True)
+class Atmosphere(Record):
+    visibility_km: float = 20.0
+    humidity_percent: float = 50.0
+    temperature_celsius: float = 20.0
+    wind_speed_kmh: float = 0.0
+    # Direction the wind blows from, degrees clockwise from north
+    wind_direction_deg: float = 0.0
+    precipitation_mm: float = 0.0
+    atmospheric_pressure: float = 1013.0
+    aerosol_optical_depth: float = 0.3
+
+
+@dataclass(slots=True)
+class Terrain(Record):
+    average_elevation: float = 300.0
+    elevation_variance: float = 100.0
+    slope_angle_avg: float = 5.0
+    vegetation_index: float = 0.5
+    water_body_coverage: float = 0.05
+    urban_coverage: float = 0.5
+    soil_moisture: float = 0.3
+    surface_temperature: float = 25.0
+
+
+@dataclass(slots=True)
+class ChangeDetection(Record):
+    temporal_comparison_days: int = 0
+    significant_changes_detected: int = 0
+    # Detected change dicts: type, severity, area_km2 and (from imagery) polygons
+    change_types: List[Dict[str, Any]] = field(default_factory=list)
+    change_confidence: float = 0.0
+    anomaly_score: float = 0.0
+    trend_direction: str = 'stable'
+    change_magnitude: float = 0.0
+    changed_area_km2: Optional[float] = None
+    imagery: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        # Fields only reported by imagery-based detection are omitted when absent
+        for name in ('changed_area_km2', 'imagery'):
+            if data[name] is None:
+                del data[name]
+        return data
+
+
+@dataclass(slots=True)
+class SatelliteObservation(Record):
+    """One acquisition over a region, as produced by SatelliteDataProcessor"""
+
+    acquisition_time: str
+    region_bounds: RegionBounds
+    data_sources: List[DataSource] = field(default_factory=list)
+    image_metadata: Optional[ImageMetadata] = None
+    atmospheric_conditions: Atmosphere = field(default_factory=Atmosphere)
+    terrain_analysis: Terrain = field(default_factory=Terrain)
+    change_detection: ChangeDetection = field(default_factory=ChangeDetection)
+    processing_time: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'acquisition_time': self.acquisition_time,
+            'region_bounds': self.region_bounds.to_dict(),
+            'data_sources': [source.to_dict() for source in self.data_sources],
+            'image_metadata': self.image_metadata.to_dict() if self.image_metadata else {},
+            'atmospheric_conditions': self.atmospheric_conditions.to_dict(),
+            'terrain_analysis': self.terrain_analysis.to_dict(),
+            'change_detection': self.change_detection.to_dict(),
+            'processing_time': self.processing_time
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SatelliteObservation':
+        if isinstance(data, cls):
+            return data
+        bounds = data.get('region_bounds')
+        metadata = data.get('image_metadata')
+        return cls(
+            acquisition_time=data.get('acquisition_time', ''),
+            region_bounds=RegionBounds.from_dict(bounds) if bounds else RegionBounds(0.0, 0.0, 0.0, 0.0),
+            data_sources=[DataSource.from_dict(source) for source in data.get('data_sources', [])],
+            image_metadata=ImageMetadata.from_dict(metadata) if metadata else None,
+            atmospheric_conditions=Atmosphere.from_dict(data.get('atmospheric_conditions', {})),
+            terrain_analysis=Terrain.from_dict(data.get('terrain_analysis', {})),
+            change_detection=ChangeDetection.from_dict(data.get('change_detection', {})),
+            processing_time=data.get('processing_time', 0.0)
+        )
+
+
+@dataclass(slots=True)
+class QuickLook(Record):
+    """Cheap screening pass over a region: weather, data quality and stream health, without imagery"""
+
+    acquisition_time: str
+    region_bounds: RegionBounds
+    atmospheric_conditions: Atmosphere = field(default_factory=Atmosphere)
+    quality: Dict[str, Any] = field(default_factory=dict)
+    stream: Dict[str, Any] = field(default_factory=dict)
+    processing_time: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'acquisition_time': self.acquisition_time,
+            'region_bounds': self.region_bounds.to_dict(),
+            'atmospheric_conditions': self.atmospheric_conditions.to_dict(),
+            'quality': self.quality,
+            'stream': self.stream,
+            'processing_time': self.processing_time
+        }
+
+
+@dataclass(slots=True)
+class Threat(Record):
+    """
+    A detected threat. Fields common to every disaster type are attributes;
+    type-specific estimates (spread rate, water level, magnitude, ...) live in
+    ``details`` and are flattened into the dict form.
+    """
+
+    type: str
+    severity: str
+    confidence: float
+    title: str
+    description: str
+    model: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    affected_population: int = 0
+    risk_factors: List[str] = field(default_factory=list)
+    details: Dict[str, Any] = field(default_factory=dict)
+    affected_area_km2: Optional[float] = None
+    change_polygons: Optional[List[Dict[str, Any]]] = None
+    # Footprint used for exposure when no change polygons locate the threat
+    affected_radius_km: Optional[float] = None
+    # Hazard spread projection for fire and flood threats (see hazard_simulation.py)
+    projection: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'type': self.type,
+            'severity': self.severity,
+            'confidence': self.confidence,
+            'title': self.title,
+            'description': self.description,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'affected_population': self.affected_population,
+            'model': self.model,
+            'risk_factors': self.risk_factors
+        }
+        data.update(self.details)
+        if self.affected_area_km2 is not None:
+            data['affected_area_km2'] = self.affected_area_km2
+        if self.change_polygons is not None:
+            data['change_polygons'] = self.change_polygons
+        if self.affected_radius_km is not None:
+            data['affected_radius_km'] = self.affected_radius_km
+        if self.projection is not None:
+            data['projection'] = self.projection
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Threat':
+        if isinstance(data, cls):
+            return data
+        fields = {name: data[name] for name in cls.__slots__ if name in data and name != 'details'}
+        fields['details'] = {key: value for key, value in data.items() if key not in cls.__slots__}
+        return cls(**fields)
+
+
+@dataclass(slots=True)
+class AnalysisResult(Record):
+    """Outcome of analyzing one observation with DisasterDetectionAI"""
+
+    region_name: str
+    analysis_timestamp: str
+    model_version: str
+    processing_time: float = 0.0
+    threat_level: str = 'normal'
+    anomalies_count: int = 0
+    threats: List[Threat] = field(default_factory=list)
+    risk_assessment: Dict[str, Any] = field(default_factory=dict)
+    confidence_metrics: Dict[str, float] = field(default_factory=dict)
+    recommendations: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['threats'] = [threat.to_dict() for threat in self.threats]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AnalysisResult':
+        if isinstance(data, cls):
+            return data
+        result = super(AnalysisResult, cls).from_dict(data)
+        result.threats = [Threat.from_dict(threat) for threat in result.threats]
+        return result
@@ -0,0 +1,271 @@
+import math
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from app import db
+from models import Alert, AlertArchive, Region, ResponseTimeBin, StatisticsWatermark, User
+
+TIME_TO_ACKNOWLEDGE = 'time_to_acknowledge'
+TIME_TO_RESOLVE = 'time_to_resolve'
+DIMENSIONS = ('region', 'disaster_type', 'department')
+UNASSIGNED_DEPARTMENT = 'Unassigned'
+PERCENTILES = (0.5, 0.9, 0.99)
+# Bin index stored for values at or below the sketch's min_value
+ZERO_BIN = -(2 ** 31)
+BACKFILL_MARKER = 'response_time_bins'
+
+# (metric, dimension, key, bin index) -> [count, seconds sum, min seconds, max seconds]
+BinDeltas = Dict[Tuple[str, str, str, int], List[float]]
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch with bounded relative error (DDSketch-style).
+    Values are mapped to logarithmic bins, so memory depends on the dynamic range
+    of the data rather than the number of observations.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def index(self, value: float) -> int:
+        """Bin a value falls in, ZERO_BIN for values at or below min_value"""
+        if value <= self.min_value:
+            return ZERO_BIN
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float):
+        self.add_bin(self.index(value), 1, value, value, value)
+
+    def add_bin(self, index: int, count: int, total: float, low: float, high: float):
+        """Add ``count`` values summing to ``total`` within [low, high] to one bin"""
+        if index == ZERO_BIN:
+            self.zero_count += count
+        else:
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.sum += total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def merge(self, other: 'QuantileSketch'):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint of the bin in log space keeps the error within relative_accuracy
+                value = 2 * math.pow(self.gamma, index) / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {'count': self.count, 'mean_seconds': self.mean}
+        for q in PERCENTILES:
+            summary[f'p{int(q * 100)}_seconds'] = self.quantile(q)
+        return summary
+
+
+class ResponseTimeAnalytics:
+    """
+    Time-to-acknowledge and time-to-resolve distributions, overall and per
+    region, disaster type and responder department. The sketch bins live in
+    the ResponseTimeBin table and are incremented in the same transaction that
+    acknowledges or resolves an alert, so every worker reports the same numbers
+    and reading them never scans the alert table. History from before the table
+    existed is folded in once by ``backfill`` (run from init_database).
+    """
+
+    def __init__(self):
+        self._indexer = QuantileSketch()
+
+    def _bin_deltas(self, metric: str, observations: Iterable[Tuple[float, str, str, Optional[str]]],
+                    deltas: Optional[BinDeltas] = None) -> BinDeltas:
+        """Fold (seconds, region name, disaster type, department) observations into per-bin [count, sum, min, max]"""
+        deltas = {} if deltas is None else deltas
+        for seconds, region_name, disaster_type, department in observations:
+            seconds = max(seconds, 0.0)
+            index = self._indexer.index(seconds)
+            for dimension, key in (('overall', 'all'), ('region', region_name),
+                                   ('disaster_type', disaster_type),
+                                   ('department', department or UNASSIGNED_DEPARTMENT)):
+                delta = deltas.get((metric, dimension, key, index))
+                if delta is None:
+                    deltas[(metric, dimension, key, index)] = [1, seconds, seconds, seconds]
+                else:
+                    delta[0] += 1
+                    delta[1] += seconds
+                    delta[2] = min(delta[2], seconds)
+                    delta[3] = max(delta[3], seconds)
+        return deltas
+
+    def _apply_deltas(self, deltas: BinDeltas):
+        """Increment bin rows in the current transaction, creating missing ones"""
+        for (metric, dimension, key, index), (count, total, low, high) in deltas.items():
+            if self._increment(metric, dimension, key, index, count, total, low, high):
+                continue
+            try:
+                # A savepoint, so losing an insert race to another worker does not abort the caller's transaction
+                with db.session.begin_nested():
+                    db.session.add(ResponseTimeBin(metric=metric, dimension=dimension, key=key, bin_index=index,
+                                                   count=count, seconds_sum=total,
+                                                   min_seconds=low, max_seconds=high))
+            except IntegrityError:
+                self._increment(metric, dimension, key, index, count, total, low, high)
+
+    def _increment(self, metric: str, dimension: str, key: str, index: int,
+                   count: int, total: float, low: float, high: float) -> bool:
+        return db.session.execute(
+            update(ResponseTimeBin)
+            .where(ResponseTimeBin.metric == metric, ResponseTimeBin.dimension == dimension,
+                   ResponseTimeBin.key == key, ResponseTimeBin.bin_index == index)
+            .values(count=ResponseTimeBin.count + count,
+                    seconds_sum=ResponseTimeBin.seconds_sum + total,
+                    min_seconds=case((ResponseTimeBin.min_seconds > low, low), else_=ResponseTimeBin.min_seconds),
+                    max_seconds=case((ResponseTimeBin.max_seconds < high, high), else_=ResponseTimeBin.max_seconds))
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+
+    def record(self, metric: str, at: datetime, department: Optional[str],
+               alerts: Iterable[Tuple[Optional[datetime], str, str]]):
+        """
+        Record alerts acknowledged or resolved together at ``at``; ``alerts`` holds
+        (detected_at, region name, disaster type). Runs inside the caller's
+        transaction (the writer thread's, on SQLite) and does not commit.
+        """
+        observations = [((at - detected_at).total_seconds(), region_name, disaster_type, department)
+                        for detected_at, region_name, disaster_type in alerts if detected_at]
+        if observations:
+            self._apply_deltas(self._bin_deltas(metric, observations))
+
+    def backfill(self) -> int:
+        """
+        Fold response times already in alert history into the bins, once per
+        database: a marker row claimed in the same transaction keeps concurrent
+        or repeated runs from counting history twice. Returns the alerts folded.
+        """
+        if StatisticsWatermark.query.filter_by(name=BACKFILL_MARKER).first():
+            return 0
+
+        loaded = 0
+        try:
+            marker = StatisticsWatermark(name=BACKFILL_MARKER, last_alert_id=0)
+            db.session.add(marker)
+            db.session.flush()
+            loaded = self._load_history()
+            marker.refreshed_at = datetime.utcnow()
+            db.session.commit()
+            logging.info(f"Response time analytics backfilled from {loaded} historic alerts")
+        except IntegrityError:
+            db.session.rollback()
+            logging.debug("Response time history already backfilled by a concurrent run")
+            return 0
+        except Exception as e:
+            logging.error(f"Error backfilling response time history: {str(e)}")
+            db.session.rollback()
+            return 0
+        return loaded
+
+    def _load_history(self) -> int:
+        acknowledger = aliased(User)
+        resolver = aliased(User)
+        deltas: BinDeltas = {}
+        loaded = 0
+
+        # Archived alerts keep their response times, so history covers both tables
+        for model in (Alert, AlertArchive):
+            rows = db.session.query(
+                model.detected_at, model.acknowledged_at, model.resolved_at,
+                model.disaster_type, Region.name,
+                acknowledger.department, resolver.department
+            ).join(Region, model.region_id == Region.id)\
+             .outerjoin(acknowledger, model.acknowledged_by_id == acknowledger.id)\
+             .outerjoin(resolver, model.resolved_by_id == resolver.id)\
+             .filter(model.detected_at.isnot(None),
+                     (model.acknowledged_at.isnot(None)) | (model.resolved_at.isnot(None)))\
+             .yield_per(5000)
+
+            for detected_at, acknowledged_at, resolved_at, disaster_type, region_name, ack_dept, res_dept in rows:
+                if acknowledged_at:
+                    self._bin_deltas(TIME_TO_ACKNOWLEDGE, [((acknowledged_at - detected_at).total_seconds(),
+                                                            region_name, disaster_type.value, ack_dept)], deltas)
+                if resolved_at:
+                    self._bin_deltas(TIME_TO_RESOLVE, [((resolved_at - detected_at).total_seconds(),
+                                                        region_name, disaster_type.value, res_dept)], deltas)
+                loaded += 1
+
+        self._apply_deltas(deltas)
+        return loaded
+
+    def _sketches(self, metric: str, dimension: str) -> Dict[str, QuantileSketch]:
+        sketches: Dict[str, QuantileSketch] = {}
+        rows = db.session.query(
+            ResponseTimeBin.key, ResponseTimeBin.bin_index, ResponseTimeBin.count,
+            ResponseTimeBin.seconds_sum, ResponseTimeBin.min_seconds, ResponseTimeBin.max_seconds
+        ).filter(ResponseTimeBin.metric == metric, ResponseTimeBin.dimension == dimension).all()
+        for key, index, count, total, low, high in rows:
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = QuantileSketch()
+            sketch.add_bin(index, count, total, low, high)
+        return sketches
+
+    def summary(self, metric: str, dimension: str = 'overall') -> List[Dict[str, Any]]:
+        """Distribution summaries for one metric and dimension, largest groups first"""
+        rows = [dict(key=key, **sketch.summary()) for key, sketch in self._sketches(metric, dimension).items()]
+        return sorted(rows, key=lambda row: row['count'], reverse=True)
+
+    def overall(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for metric in (TIME_TO_ACKNOWLEDGE, TIME_TO_RESOLVE):
+            rows = self.summary(metric)
+            result[metric] = rows[0] if rows else QuantileSketch().summary()
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        """Overall numbers plus per-dimension breakdowns for both metrics"""
+        return {
+            'overall': self.overall(),
+            'breakdowns': {
+                dimension: {
+                    TIME_TO_ACKNOWLEDGE: self.summary(TIME_TO_ACKNOWLEDGE, dimension),
+                    TIME_TO_RESOLVE: self.summary(TIME_TO_RESOLVE, dimension)
+                }
+                for dimension in DIMENSIONS
+            }
+        }
+
+
+response_analytics = ResponseTimeAnalytics()
@@ -1,28 +1,41 @@
+import hmac
+import heapq
 import logging
 import random
 from datetime import datetime, timedelta
-from flask import render_template, request, redirect, url_for, flash, jsonify, abort
+import os
+from flask import render_template, request, redirect, url_for, flash, jsonify, abort, Response
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 from sqlalchemy import func, desc
 
 from app import app, db, socketio
-from models import (User, Region, Alert, MonitoringStatus, SystemConfiguration,
-                   UserRole, DisasterType, AlertSeverity, AlertStatus)
-from satellite_processor import SatelliteDataProcessor
-from ai_detector import DisasterDetectionAI
+from realtime import emit_event
+from change_feed import MAX_CHANGES_PER_RESPONSE, change_feed
+from correlation import CORRELATION_WINDOW_HOURS, describe_incidents, incident_alerts, incident_correlator
+from http_cache import ALERTS_SCOPE, conditional, region_scope
+from sqlite_profile import sqlite_writer
+from query_profiler import query_profiler
+from statistics_service import refresh_statistics, get_statistics
+from response_analytics import response_analytics
+import metrics
+from models import (User, Region, Alert, AlertArchive, MonitoringStatus, SystemConfiguration,
+                   UserRole, DisasterType, AlertSeverity, AlertStatus, HazardProjection, Incident)
+from archival import ARCHIVED_STATUSES
+from alert_actions import BULK_ACTION_ROLES, BulkActionError, bulk_update_alerts, update_alert
+import services
+from analysis_executor import analysis_executor
 from monitoring_service import get_monitoring_service
 
-# Initialize services
-satellite_processor = SatelliteDataProcessor()
-ai_detector = DisasterDetectionAI()
-
 @app.route('/')
 def index():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
     return redirect(url_for('login'))
 
+def _record_login(user_id):
+    db.session.get(User, user_id).last_login = datetime.utcnow()
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -36,8 +49,7 @@ def login():
         
         if user and password and user.password_hash and check_password_hash(user.password_hash, password):
             login_user(user)
-            user.last_login = datetime.utcnow()
-            db.session.commit()
+            sqlite_writer.run_write(_record_login, user.id)
             
             flash(f'Welcome back, {user.full_name}!', 'success')
             return redirect(url_for('dashboard'))
@@ -106,19 +118,27 @@ def alerts():
     disaster_type_filter = request.args.get('disaster_type')
     region_filter = request.args.get('region')
     
-    # Build query
-    query = Alert.query.join(Region)
+    include_archived = request.args.get('include_archived') == '1'
     
-    if severity_filter:
-        query = query.filter(Alert.severity == AlertSeverity(severity_filter))
-    if status_filter:
-        query = query.filter(Alert.status == AlertStatus(status_filter))
-    if disaster_type_filter:
-        query = query.filter(Alert.disaster_type == DisasterType(disaster_type_filter))
-    if region_filter:
-        query = query.filter(Region.name == region_filter)
+    def filtered(model):
+        query = model.query.join(Region, model.region_id == Region.id)
+        if severity_filter:
+            query = query.filter(model.severity == AlertSeverity(severity_filter))
+        if status_filter:
+            query = query.filter(model.status == AlertStatus(status_filter))
+        if disaster_type_filter:
+            query = query.filter(model.disaster_type == DisasterType(disaster_type_filter))
+        if region_filter:
+            query = query.filter(Region.name == region_filter)
+        return query.order_by(desc(model.detected_at))
     
-    alerts = query.order_by(desc(Alert.detected_at)).all()
+    alerts = filtered(Alert).all()
+    
+    # The archive only holds closed alerts, so skip it when filtering for open ones
+    if include_archived and (not status_filter or AlertStatus(status_filter) in ARCHIVED_STATUSES):
+        archived = filtered(AlertArchive).all()
+        alerts = list(heapq.merge(alerts, archived, key=lambda alert: alert.detected_at or datetime.min,
+                                  reverse=True))
     regions = Region.query.all()
     
     return render_template('alerts.html',
@@ -128,11 +148,13 @@ def alerts():
                              'severity': severity_filter,
                              'status': status_filter,
                              'disaster_type': disaster_type_filter,
-                             'region': region_filter
+                             'region': region_filter,
+                             'include_archived': include_archived
                          },
                          severity_options=AlertSeverity,
                          status_options=AlertStatus,
                          disaster_type_options=DisasterType,
+                         can_bulk_update=current_user.role in BULK_ACTION_ROLES,
                          datetime=datetime)
 
 @app.route('/alerts/<int:alert_id>/acknowledge', methods=['POST'])
@@ -140,20 +162,8 @@ def alerts():
 def acknowledge_alert(alert_id):
     alert = Alert.query.get_or_404(alert_id)
     
-    if alert.status == AlertStatus.ACTIVE:
-        alert.status = AlertStatus.ACKNOWLEDGED
-        alert.acknowledged_at = datetime.utcnow()
-        alert.acknowledged_by_id = current_user.id
-        
-        db.session.commit()
-        
-        # Emit socket event for real-time update
-        socketio.emit('alert_updated', {
-            'alert_id': alert.id,
-            'status': alert.status.value,
-            'acknowledged_by': current_user.full_name
-        })
-        
+    # Written through the writer thread and emitted for real-time update
+    if update_alert(alert.id, 'acknowledge', current_user):
         flash(f'Alert "{alert.title}" has been acknowledged', 'success')
     else:
         flash('Alert cannot be acknowledged in its current state', 'error')
@@ -165,26 +175,33 @@ def acknowledge_alert(alert_id):
 def resolve_alert(alert_id):
     alert = Alert.query.get_or_404(alert_id)
     
-    if alert.status in [AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED]:
-        alert.status = AlertStatus.RESOLVED
-        alert.resolved_at = datetime.utcnow()
-        alert.resolved_by_id = current_user.id
-        
-        db.session.commit()
-        
-        # Emit socket event for real-time update
-        socketio.emit('alert_updated', {
-            'alert_id': alert.id,
-            'status': alert.status.value,
-            'resolved_by': current_user.full_name
-        })
-        
+    # Written through the writer thread and emitted for real-time update
+    if update_alert(alert.id, 'resolve', current_user):
         flash(f'Alert "{alert.title}" has been resolved', 'success')
     else:
         flash('Alert cannot be resolved in its current state', 'error')
     
     return redirect(url_for('alerts'))
 
+@app.route('/api/alerts/bulk', methods=['POST'])
+@login_required
+def bulk_alert_action():
+    """Acknowledge or resolve many alerts at once, selected by id list or by filter"""
+    if current_user.role not in BULK_ACTION_ROLES:
+        return jsonify({'error': 'You do not have permission to update alerts in bulk'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    try:
+        updated = bulk_update_alerts(action, current_user,
+                                     alert_ids=data.get('alert_ids'),
+                                     filters=data.get('filter'))
+    except BulkActionError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'action': action, 'updated': len(updated),
+                     'alert_ids': [row['alert_id'] for row in updated]})
+
 @app.route('/regions')
 @login_required
 def regions():
@@ -194,6 +211,56 @@ def regions():
     
     return render_template('regions.html', regions=regions, datetime=datetime)
 
+def _store_region_analysis(region_id, analysis_result):
+    """
+    Update a region's monitoring status and add alerts for an on-demand analysis,
+    linked to incidents. Runs on the writer thread, so the region is loaded here.
+    """
+    region = db.session.get(Region, region_id)
+    monitoring_status = MonitoringStatus.query.filter_by(region_id=region.id).first()
+    if not monitoring_status:
+        monitoring_status = MonitoringStatus()
+        monitoring_status.region_id = region.id
+        db.session.add(monitoring_status)
+
+    monitoring_status.last_analysis_at = datetime.utcnow()
+    monitoring_status.threat_level = analysis_result.threat_level
+    monitoring_status.anomalies_detected = analysis_result.anomalies_count
+    monitoring_status.processing_time_seconds = analysis_result.processing_time
+
+    # Generate alerts if threats detected
+    alerts = []
+    projections = []
+    for threat in analysis_result.threats:
+        alert = Alert()
+        alert.region_id = region.id
+        alert.disaster_type = DisasterType(threat.type)
+        alert.severity = AlertSeverity(threat.severity)
+        alert.title = threat.title
+        alert.description = threat.description
+        alert.latitude = threat.latitude if threat.latitude is not None else region.center_latitude
+        alert.longitude = threat.longitude if threat.longitude is not None else region.center_longitude
+        alert.confidence_score = threat.confidence
+        alert.prediction_model = threat.model or 'DisasterDetectionAI'
+        alert.estimated_affected_population = threat.affected_population
+        alert.affected_radius_km = threat.affected_radius_km
+        db.session.add(alert)
+        alerts.append(alert)
+        if threat.projection:
+            projections.append((alert, threat.projection))
+
+    db.session.flush()
+    for alert, projection in projections:
+        db.session.add(HazardProjection.from_projection(alert.id, projection))
+
+    return [change_feed.record('region_analyzed', {
+        'region_id': region.id,
+        'region_name': region.name,
+        'threat_level': analysis_result.threat_level,
+        'anomalies': analysis_result.anomalies_count,
+        'threats_detected': len(analysis_result.threats)
+    })] + incident_correlator.correlate(alerts)
+
 @app.route('/regions/<int:region_id>/analyze', methods=['POST'])
 @login_required
 def analyze_region(region_id):
@@ -201,55 +268,23 @@ def analyze_region(region_id):
     
     try:
         # Process satellite data for the region
-        satellite_data = satellite_processor.get_region_data(
-            region.min_latitude, region.max_latitude,
-            region.min_longitude, region.max_longitude
-        )
-        
-        # Run AI analysis
-        analysis_result = ai_detector.analyze_region_data(satellite_data, region.name)
-        
-        # Update monitoring status
-        monitoring_status = MonitoringStatus.query.filter_by(region_id=region.id).first()
-        if not monitoring_status:
-            monitoring_status = MonitoringStatus()
-            monitoring_status.region_id = region.id
-            db.session.add(monitoring_status)
-        
-        monitoring_status.last_analysis_at = datetime.utcnow()
-        monitoring_status.threat_level = analysis_result.get('threat_level', 'normal')
-        monitoring_status.anomalies_detected = analysis_result.get('anomalies_count', 0)
-        monitoring_status.processing_time_seconds = analysis_result.get('processing_time', 0)
-        
-        # Generate alerts if threats detected
-        if analysis_result.get('threats'):
-            for threat in analysis_result['threats']:
-                alert = Alert()
-                alert.region_id = region.id
-                alert.disaster_type = DisasterType(threat['type'])
-                alert.severity = AlertSeverity(threat['severity'])
-                alert.title = threat['title']
-                alert.description = threat['description']
-                alert.latitude = threat.get('latitude', region.center_latitude)
-                alert.longitude = threat.get('longitude', region.center_longitude)
-                alert.confidence_score = threat.get('confidence', 0.0)
-                alert.prediction_model = threat.get('model', 'DisasterDetectionAI')
-                alert.estimated_affected_population = threat.get('affected_population', 0)
-                db.session.add(alert)
+        with services.satellite_processor() as processor:
+            observation = processor.acquire(
+                region.min_latitude, region.max_latitude,
+                region.min_longitude, region.max_longitude
+            )
         
-        db.session.commit()
+        # Run AI analysis in the analysis process pool
+        analysis_result = analysis_executor.analyze(observation, region.name)
         
-        # Emit socket event for real-time update
-        socketio.emit('region_analyzed', {
-            'region_id': region.id,
-            'region_name': region.name,
-            'threat_level': analysis_result.get('threat_level', 'normal'),
-            'anomalies': analysis_result.get('anomalies_count', 0),
-            'threats_detected': len(analysis_result.get('threats', []))
-        })
+        # Store the results through the writer thread, serialized with background writes
+        changes = sqlite_writer.run_write(_store_region_analysis, region.id, analysis_result)
+
+        # Emit socket events for real-time update
+        change_feed.publish(changes)
         
         flash(f'Region "{region.name}" analysis completed. '
-              f'Threat level: {analysis_result.get("threat_level", "normal")}', 'info')
+              f'Threat level: {analysis_result.threat_level}', 'info')
         
     except Exception as e:
         logging.error(f"Error analyzing region {region.name}: {str(e)}")
@@ -292,48 +327,33 @@ def stop_monitoring():
 @app.route('/statistics')
 @login_required
 def statistics():
-    # Generate historic data if there are no alerts
-    if Alert.query.count() == 0:
-        generate_historic_alerts()
+    # Optional date range (YYYY-MM-DD), served from the daily rollups
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        flash('Invalid date range, expected YYYY-MM-DD', 'error')
+        start_date = end_date = None
     
-    # Alert statistics by type
-    alert_by_type = db.session.query(
-        Alert.disaster_type,
-        func.count(Alert.id).label('count')
-    ).group_by(Alert.disaster_type).all()
-    
-    # Alert statistics by severity
-    alert_by_severity = db.session.query(
-        Alert.severity,
-        func.count(Alert.id).label('count')
-    ).group_by(Alert.severity).all()
-    
-    # Regional statistics
-    regional_stats = db.session.query(
-        Region.name,
-        func.count(Alert.id).label('alert_count'),
-        func.avg(Alert.confidence_score).label('avg_confidence')
-    ).outerjoin(Alert).group_by(Region.name).all()
-    
-    # Weekly alert trends
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    daily_alerts = db.session.query(
-        func.date(Alert.detected_at).label('date'),
-        func.count(Alert.id).label('count')
-    ).filter(Alert.detected_at >= seven_days_ago)\
-     .group_by(func.date(Alert.detected_at))\
-     .order_by(func.date(Alert.detected_at)).all()
+    # Fold in any alerts created since the last scheduled refresh (cheap primary-key range scan),
+    # through the writer thread like the scheduled refresh
+    sqlite_writer.run_write(refresh_statistics, max_batches=1)
+    stats = get_statistics(start_date, end_date)
     
     return render_template('statistics.html',
-                         alert_by_type=alert_by_type,
-                         alert_by_severity=alert_by_severity,
-                         regional_stats=regional_stats,
-                         daily_alerts=daily_alerts,
+                         alert_by_type=stats['alert_by_type'],
+                         alert_by_severity=stats['alert_by_severity'],
+                         regional_stats=stats['regional_stats'],
+                         daily_alerts=stats['daily_alerts'],
+                         response_times=response_analytics.report(),
+                         start_date=start_date,
+                         end_date=end_date,
                          datetime=datetime)
 
 # API endpoints for AJAX requests
 @app.route('/api/regions/<int:region_id>/status')
 @login_required
+@conditional(lambda region_id: region_scope(region_id))
 def get_region_status(region_id):
     monitoring_status = MonitoringStatus.query.filter_by(region_id=region_id).first()
     if not monitoring_status:
@@ -346,8 +366,67 @@ def get_region_status(region_id):
         'anomalies': monitoring_status.anomalies_detected
     })
 
+@app.route('/api/alerts/<int:alert_id>/projection')
+@login_required
+def get_alert_projection(alert_id):
+    # Latest simulated spread of a fire or flood alert, for evacuation planning
+    projection = HazardProjection.query.filter_by(alert_id=alert_id)\
+        .order_by(desc(HazardProjection.created_at)).first()
+    if not projection:
+        return jsonify({'error': 'No projection for this alert'}), 404
+    
+    return jsonify(projection.to_dict())
+
+@app.route('/api/incidents')
+@login_required
+def get_incidents():
+    # Incidents with alerts detected in the last `hours`, most recently active first
+    hours = request.args.get('hours', CORRELATION_WINDOW_HOURS, type=float)
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    query = Incident.query.filter(Incident.last_detected_at >= datetime.utcnow() - timedelta(hours=hours))
+    
+    disaster_type = request.args.get('disaster_type')
+    if disaster_type:
+        try:
+            query = query.filter(Incident.disaster_type == DisasterType(disaster_type))
+        except ValueError:
+            return jsonify({'error': f'Unknown disaster type: {disaster_type}'}), 400
+    
+    incidents = query.order_by(desc(Incident.last_detected_at)).limit(limit).all()
+    return jsonify(describe_incidents(incidents))
+
+@app.route('/api/incidents/<int:incident_id>')
+@login_required
+def get_incident(incident_id):
+    incident = db.session.get(Incident, incident_id)
+    if not incident:
+        return jsonify({'error': 'Incident not found'}), 404
+    
+    return jsonify(dict(describe_incidents([incident])[0], alerts=incident_alerts(incident)))
+
+@app.route('/api/analytics/response-times')
+@login_required
+def get_response_times():
+    return jsonify(response_analytics.report())
+
+@app.route('/api/satellite/sources')
+@login_required
+def get_satellite_sources():
+    # Circuit state and recent latency of each satellite data source
+    with services.satellite_processor() as processor:
+        return jsonify(processor.source_fetcher.stats())
+
+@app.route('/api/changes')
+@login_required
+def get_changes():
+    # Deltas for a client that last saw sequence number `since` (omit it to just learn the latest)
+    since = request.args.get('since', type=int)
+    limit = min(request.args.get('limit', MAX_CHANGES_PER_RESPONSE, type=int), MAX_CHANGES_PER_RESPONSE)
+    return jsonify(change_feed.changes_since(since, limit))
+
 @app.route('/api/alerts/recent')
 @login_required
+@conditional(lambda: ALERTS_SCOPE)
 def get_recent_alerts():
     alerts = Alert.query.filter(
         Alert.status.in_([AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED])
@@ -361,6 +440,33 @@ def get_recent_alerts():
         'detected_at': alert.detected_at.isoformat()
     } for alert in alerts])
 
+@app.route('/metrics')
+def metrics_endpoint():
+    # Scrapers cannot log in, so they present METRICS_TOKEN as a bearer token; administrators
+    # may also read the metrics from their session. METRICS_PUBLIC=1 opts out of both checks.
+    if os.environ.get('METRICS_PUBLIC') != '1':
+        token = os.environ.get('METRICS_TOKEN')
+        presented = request.headers.get('Authorization', '')
+        if not (token and hmac.compare_digest(presented, f'Bearer {token}')):
+            if not current_user.is_authenticated:
+                abort(401)
+            if current_user.role != UserRole.ADMINISTRATOR:
+                abort(403)
+    
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profiling')
+@login_required
+def admin_profiling():
+    if current_user.role != UserRole.ADMINISTRATOR:
+        abort(403)
+    
+    return render_template('profiling.html',
+                         profiling_enabled=query_profiler.enabled,
+                         endpoint_summary=query_profiler.endpoint_summary(),
+                         recent_profiles=query_profiler.recent_profiles(),
+                         datetime=datetime)
+
 # Socket events
 @socketio.on('connect')
 def handle_connect():
@@ -369,6 +475,17 @@ def handle_connect():
     else:
         logging.warning('Unauthenticated user attempted WebSocket connection')
 
+@socketio.on('resume')
+def handle_resume(data):
+    # A reconnecting client replays the changes it missed instead of reloading
+    if not current_user.is_authenticated:
+        return
+    try:
+        since = int(data['since']) if data and data.get('since') is not None else None
+    except (TypeError, ValueError):
+        since = None
+    emit_event('changes', change_feed.changes_since(since), to=request.sid)
+
 @socketio.on('disconnect')
 def handle_disconnect():
     if current_user.is_authenticated:
@@ -509,3 +626,7 @@ def initialize_default_data():
         
         db.session.commit()
         logging.info("Default regions and monitoring status created")
+    
+    # Seed demonstration history once, instead of from the statistics page
+    if Alert.query.count() == 0 and AlertArchive.query.count() == 0:
+        generate_historic_alerts()
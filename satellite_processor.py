@@ -1,19 +1,67 @@
+import os
 import random
 import time
 import logging
+import zlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import json
 
+import numpy as np
+
+from latency import LatencyModel, latency_from_env, rng_from_env
+from change_detection import change_detector
+from raster_store import BAND_INDEX, BAND_NAMES, RasterTileStore, RegionGrid, get_raster_store
+from records import (Atmosphere, ChangeDetection, ImageMetadata, QuickLook, RegionBounds,
+                     SatelliteObservation, Terrain)
+from satellite_sources import SourceFetcher, fetcher_from_env, get_source_fetcher
+import metrics
+
+SATELLITE_ACQUISITION_SECONDS = metrics.histogram(
+    'satellite_acquisition_duration_seconds',
+    'SatelliteDataProcessor.get_region_data latency')
+SATELLITE_SCREENING_SECONDS = metrics.histogram(
+    'satellite_screening_duration_seconds',
+    'SatelliteDataProcessor.screen latency')
+
 class SatelliteDataProcessor:
     """
     Mock satellite data processor that simulates real satellite data acquisition and processing.
     In a real implementation, this would connect to actual satellite data APIs.
+
+    Randomness comes from a per-instance ``random.Random`` (pass ``seed`` for
+    reproducible runs) and simulated delays from an injectable latency model.
+
+    ``acquire`` returns a SatelliteObservation record; ``get_region_data``
+    returns the same observation in its dict form. ``screen`` is the cheap
+    quick-look pass the monitoring cycle uses to decide whether a region
+    needs a full acquisition.
+
+    ``acquire`` gets its data source products through a SourceFetcher
+    (see satellite_sources), which queries the sources in parallel with
+    timeouts, hedged requests and per-source circuit breakers.
+
+    When a raster store is configured (``raster_store`` or RASTER_STORE_DIR),
+    each acquisition also ingests a synthetic multi-band scene into the store and
+    change detection diffs the two most recent scenes of the region.
     """
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, latency: Optional[LatencyModel] = None,
+                 rng: Optional[random.Random] = None, raster_store: Optional[RasterTileStore] = None,
+                 screening_latency: Optional[LatencyModel] = None, source_fetcher: Optional[SourceFetcher] = None):
         self.data_sources = ['Sentinel-2', 'Landsat-8', 'MODIS', 'Sentinel-1']
-        self.image_types = ['optical', 'infrared', 'radar', 'multispectral']
+        self.rng = rng or rng_from_env(seed)
+        # An injected latency model applies to this processor's own sources; otherwise the
+        # process-wide fetcher is shared so circuit breakers and latency stats see every acquisition
+        if source_fetcher is None:
+            source_fetcher = (fetcher_from_env(self.data_sources, latency, self.rng) if latency is not None
+                              else get_source_fetcher())
+        self.source_fetcher = source_fetcher
+        # Quick-look products are small and pre-processed, so screening is much cheaper than acquisition
+        self.screening_latency = screening_latency or latency_from_env(0.05, 0.2)
+        self.raster_store = raster_store if raster_store is not None else get_raster_store()
+        self.scene_size = int(os.environ.get('RASTER_SCENE_SIZE', 512))
+        self.tile_size = int(os.environ.get('RASTER_TILE_SIZE', 256))
         
     def get_region_data(self, min_lat: float, max_lat: float, 
                        min_lon: float, max_lon: float) -> Dict[str, Any]:
@@ -21,75 +69,87 @@ class SatelliteDataProcessor:
         Simulate satellite data acquisition for a given geographic region.
         Returns mock satellite data that would normally come from real satellites.
         """
+        return self.acquire(min_lat, max_lat, min_lon, max_lon).to_dict()
+    
+    @metrics.timed(SATELLITE_SCREENING_SECONDS)
+    def screen(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> QuickLook:
+        """
+        Simulate a quick-look pass over a region: coarse atmospheric conditions,
+        data quality validation and the real-time stream summary, without
+        acquiring or ingesting imagery.
+        """
+        start_time = time.time()
+        self.screening_latency.wait('satellite_screening', self.rng)
+        
+        quick_look = QuickLook(
+            acquisition_time=datetime.utcnow().isoformat(),
+            region_bounds=RegionBounds(min_lat, max_lat, min_lon, max_lon),
+            atmospheric_conditions=self._generate_atmospheric_data(),
+            stream=self.process_real_time_stream()
+        )
+        quick_look.quality = self.validate_data_quality(quick_look.to_dict())
+        quick_look.processing_time = time.time() - start_time
+        return quick_look
+    
+    @metrics.timed(SATELLITE_ACQUISITION_SECONDS)
+    def acquire(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                atmosphere: Optional[Atmosphere] = None) -> SatelliteObservation:
+        """
+        Simulate satellite data acquisition for a region, as a SatelliteObservation
+        record. ``atmosphere`` reuses the conditions from a preceding quick look.
+        """
         start_time = time.time()
+        region_bounds = RegionBounds(min_lat, max_lat, min_lon, max_lon)
+        
+        # Products from several sources in parallel, with timeouts, hedging and circuit breakers
+        data_sources = self.source_fetcher.fetch(region_bounds)
         
-        # Simulate processing delay
-        time.sleep(random.uniform(0.5, 2.0))
+        region_key = None
+        if self.raster_store is not None:
+            region_key = self._ingest_scene(min_lat, max_lat, min_lon, max_lon, datetime.utcnow())
         
         # Generate mock satellite metadata
-        satellite_data = {
-            'acquisition_time': datetime.utcnow().isoformat(),
-            'region_bounds': {
-                'min_latitude': min_lat,
-                'max_latitude': max_lat,
-                'min_longitude': min_lon,
-                'max_longitude': max_lon
-            },
-            'data_sources': self._generate_mock_sources(),
-            'image_metadata': self._generate_image_metadata(),
-            'atmospheric_conditions': self._generate_atmospheric_data(),
-            'terrain_analysis': self._generate_terrain_analysis(min_lat, max_lat, min_lon, max_lon),
-            'change_detection': self._generate_change_detection(),
-            'processing_time': time.time() - start_time
-        }
+        observation = SatelliteObservation(
+            acquisition_time=datetime.utcnow().isoformat(),
+            region_bounds=region_bounds,
+            data_sources=data_sources,
+            image_metadata=self._generate_image_metadata(),
+            atmospheric_conditions=atmosphere or self._generate_atmospheric_data(),
+            terrain_analysis=self._generate_terrain_analysis(min_lat, max_lat, min_lon, max_lon),
+            change_detection=self._generate_change_detection(region_key)
+        )
+        observation.processing_time = time.time() - start_time
         
         logging.debug(f"Generated satellite data for region: {min_lat},{min_lon} to {max_lat},{max_lon}")
-        return satellite_data
+        return observation
     
-    def _generate_mock_sources(self) -> List[Dict[str, Any]]:
-        """Generate mock satellite data sources"""
-        num_sources = random.randint(2, 4)
-        sources = []
-        
-        for i in range(num_sources):
-            source = {
-                'satellite': random.choice(self.data_sources),
-                'image_type': random.choice(self.image_types),
-                'resolution': random.choice(['10m', '30m', '100m', '250m']),
-                'cloud_cover': random.uniform(0, 30),
-                'quality_score': random.uniform(0.7, 1.0),
-                'acquisition_angle': random.uniform(-30, 30)
-            }
-            sources.append(source)
-        
-        return sources
-    
-    def _generate_image_metadata(self) -> Dict[str, Any]:
+    def _generate_image_metadata(self) -> ImageMetadata:
         """Generate mock image processing metadata"""
-        return {
-            'image_id': f"IMG_{int(time.time())}_{random.randint(1000, 9999)}",
-            'pixel_count': random.randint(1000000, 10000000),
-            'bands_available': random.randint(4, 13),
-            'bit_depth': random.choice([8, 16, 32]),
-            'compression': 'JPEG2000',
-            'geometric_accuracy': random.uniform(1.0, 5.0),
-            'radiometric_quality': random.uniform(0.8, 1.0)
-        }
+        return ImageMetadata(
+            image_id=f"IMG_{int(time.time())}_{self.rng.randint(1000, 9999)}",
+            pixel_count=self.rng.randint(1000000, 10000000),
+            bands_available=self.rng.randint(4, 13),
+            bit_depth=self.rng.choice([8, 16, 32]),
+            compression='JPEG2000',
+            geometric_accuracy=self.rng.uniform(1.0, 5.0),
+            radiometric_quality=self.rng.uniform(0.8, 1.0)
+        )
     
-    def _generate_atmospheric_data(self) -> Dict[str, Any]:
+    def _generate_atmospheric_data(self) -> Atmosphere:
         """Generate mock atmospheric conditions"""
-        return {
-            'visibility_km': random.uniform(5, 50),
-            'humidity_percent': random.uniform(30, 90),
-            'temperature_celsius': random.uniform(-10, 45),
-            'wind_speed_kmh': random.uniform(0, 50),
-            'precipitation_mm': random.uniform(0, 20),
-            'atmospheric_pressure': random.uniform(980, 1030),
-            'aerosol_optical_depth': random.uniform(0.1, 0.8)
-        }
+        return Atmosphere(
+            visibility_km=self.rng.uniform(5, 50),
+            humidity_percent=self.rng.uniform(30, 90),
+            temperature_celsius=self.rng.uniform(-10, 45),
+            wind_speed_kmh=self.rng.uniform(0, 50),
+            precipitation_mm=self.rng.uniform(0, 20),
+            atmospheric_pressure=self.rng.uniform(980, 1030),
+            aerosol_optical_depth=self.rng.uniform(0.1, 0.8),
+            wind_direction_deg=self.rng.uniform(0, 360)
+        )
     
     def _generate_terrain_analysis(self, min_lat: float, max_lat: float, 
-                                 min_lon: float, max_lon: float) -> Dict[str, Any]:
+                                 min_lon: float, max_lon: float) -> Terrain:
         """Generate mock terrain analysis data"""
         # Simple logic to vary data based on region (very basic simulation)
         center_lat = (min_lat + max_lat) / 2
@@ -106,42 +166,113 @@ class SatelliteDataProcessor:
             elevation_base = 300
             vegetation_base = 0.5
         
-        return {
-            'average_elevation': elevation_base + random.uniform(-100, 300),
-            'elevation_variance': random.uniform(50, 500),
-            'slope_angle_avg': random.uniform(0, 15),
-            'vegetation_index': vegetation_base + random.uniform(-0.2, 0.3),
-            'water_body_coverage': random.uniform(0.01, 0.15),
-            'urban_coverage': random.uniform(0.2, 0.8),
-            'soil_moisture': random.uniform(0.1, 0.9),
-            'surface_temperature': random.uniform(15, 40)
-        }
+        return Terrain(
+            average_elevation=elevation_base + self.rng.uniform(-100, 300),
+            elevation_variance=self.rng.uniform(50, 500),
+            slope_angle_avg=self.rng.uniform(0, 15),
+            vegetation_index=vegetation_base + self.rng.uniform(-0.2, 0.3),
+            water_body_coverage=self.rng.uniform(0.01, 0.15),
+            urban_coverage=self.rng.uniform(0.2, 0.8),
+            soil_moisture=self.rng.uniform(0.1, 0.9),
+            surface_temperature=self.rng.uniform(15, 40)
+        )
     
-    def _generate_change_detection(self) -> Dict[str, Any]:
-        """Generate mock change detection analysis"""
-        return {
-            'temporal_comparison_days': random.randint(1, 30),
-            'significant_changes_detected': random.randint(0, 5),
-            'change_types': self._generate_change_types(),
-            'change_confidence': random.uniform(0.6, 0.95),
-            'anomaly_score': random.uniform(0, 1),
-            'trend_direction': random.choice(['stable', 'increasing', 'decreasing']),
-            'change_magnitude': random.uniform(0, 0.5)
-        }
+    def _generate_change_detection(self, region_key: Optional[str] = None) -> ChangeDetection:
+        """Generate change detection analysis, from stored imagery when available"""
+        if region_key is not None:
+            changes = change_detector.detect(self.raster_store, region_key)
+            if changes is not None:
+                return changes
+
+        return ChangeDetection(
+            temporal_comparison_days=self.rng.randint(1, 30),
+            significant_changes_detected=self.rng.randint(0, 5),
+            change_types=self._generate_change_types(),
+            change_confidence=self.rng.uniform(0.6, 0.95),
+            anomaly_score=self.rng.uniform(0, 1),
+            trend_direction=self.rng.choice(['stable', 'increasing', 'decreasing']),
+            change_magnitude=self.rng.uniform(0, 0.5)
+        )
+    
+    @staticmethod
+    def _region_key(min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> str:
+        return f"{min_lat:.4f}_{max_lat:.4f}_{min_lon:.4f}_{max_lon:.4f}"
+    
+    def _ingest_scene(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                      acquired_at: datetime) -> str:
+        """Synthesize a multi-band scene for the region and write it to the raster store"""
+        region_key = self._region_key(min_lat, max_lat, min_lon, max_lon)
+        grid = self.raster_store.ensure_grid(region_key, RegionGrid(
+            min_lat, max_lat, min_lon, max_lon,
+            height=self.scene_size, width=self.scene_size, tile_size=self.tile_size))
+        self.raster_store.write_scene(region_key, acquired_at, self._synthesize_scene(region_key, grid))
+        return region_key
+    
+    def _synthesize_scene(self, region_key: str, grid: RegionGrid) -> np.ndarray:
+        """
+        Mock imagery: a land cover that is fixed per region, plus per-acquisition
+        sensor noise and occasional transient events (burn scars, flooding).
+        """
+        # The land cover is seeded by the region so consecutive scenes line up
+        base_rng = np.random.default_rng(zlib.crc32(region_key.encode()))
+        scene_rng = np.random.default_rng(self.rng.getrandbits(64))
+        shape = (grid.height, grid.width)
+
+        vegetation = _smooth_field(base_rng, shape, 8)
+        water = _smooth_field(base_rng, shape, 6) > 0.8
+        terrain_heat = _smooth_field(base_rng, shape, 4)
+
+        scene = np.empty((grid.bands,) + shape, dtype=grid.dtype)
+        scene[BAND_INDEX['blue']] = 0.06 + 0.02 * vegetation
+        scene[BAND_INDEX['green']] = 0.08 + 0.04 * vegetation
+        scene[BAND_INDEX['red']] = 0.18 - 0.12 * vegetation
+        scene[BAND_INDEX['nir']] = 0.2 + 0.3 * vegetation
+        scene[BAND_INDEX['swir']] = 0.25 - 0.1 * vegetation
+        scene[BAND_INDEX['thermal']] = 295.0 + 10.0 * terrain_heat
+
+        scene[BAND_INDEX['green'], water] = 0.12
+        scene[BAND_INDEX['nir'], water] = 0.03
+        scene[BAND_INDEX['swir'], water] = 0.02
+
+        rows, cols = np.ogrid[:grid.height, :grid.width]
+
+        def blob():
+            center_r, center_c = scene_rng.integers(0, grid.height), scene_rng.integers(0, grid.width)
+            radius = scene_rng.uniform(0.02, 0.08) * grid.height
+            return (rows - center_r) ** 2 + (cols - center_c) ** 2 <= radius ** 2
+
+        if scene_rng.random() < 0.1:  # Active fire: hot, burned vegetation under a smoke plume
+            burn = blob()
+            scene[BAND_INDEX['thermal'], burn] += 30.0
+            scene[BAND_INDEX['nir'], burn] = 0.08
+            scene[BAND_INDEX['swir'], burn] = 0.35
+            plume = blob()
+            scene[BAND_INDEX['blue'], plume] += 0.08
+            scene[BAND_INDEX['green'], plume] += 0.06
+        if scene_rng.random() < 0.1:  # Flooding: standing water over land
+            flood = blob()
+            scene[BAND_INDEX['green'], flood] = 0.12
+            scene[BAND_INDEX['nir'], flood] = 0.03
+            scene[BAND_INDEX['swir'], flood] = 0.02
+
+        reflectance = [BAND_INDEX[name] for name in BAND_NAMES if name != 'thermal']
+        scene[reflectance] += scene_rng.normal(0, 0.005, (len(reflectance),) + shape).astype(grid.dtype)
+        scene[BAND_INDEX['thermal']] += scene_rng.normal(0, 0.5, shape).astype(grid.dtype)
+        return scene
     
     def _generate_change_types(self) -> List[Dict[str, Any]]:
         """Generate mock detected changes"""
         possible_changes = [
-            {'type': 'vegetation_loss', 'severity': 'moderate', 'area_km2': random.uniform(0.1, 10)},
-            {'type': 'water_level_change', 'severity': 'low', 'area_km2': random.uniform(0.5, 5)},
-            {'type': 'urban_expansion', 'severity': 'low', 'area_km2': random.uniform(0.2, 3)},
-            {'type': 'thermal_anomaly', 'severity': 'high', 'area_km2': random.uniform(0.1, 2)},
-            {'type': 'ground_deformation', 'severity': 'critical', 'area_km2': random.uniform(0.05, 1)},
-            {'type': 'smoke_detection', 'severity': 'high', 'area_km2': random.uniform(1, 15)}
+            {'type': 'vegetation_loss', 'severity': 'moderate', 'area_km2': self.rng.uniform(0.1, 10)},
+            {'type': 'water_level_change', 'severity': 'low', 'area_km2': self.rng.uniform(0.5, 5)},
+            {'type': 'urban_expansion', 'severity': 'low', 'area_km2': self.rng.uniform(0.2, 3)},
+            {'type': 'thermal_anomaly', 'severity': 'high', 'area_km2': self.rng.uniform(0.1, 2)},
+            {'type': 'ground_deformation', 'severity': 'critical', 'area_km2': self.rng.uniform(0.05, 1)},
+            {'type': 'smoke_detection', 'severity': 'high', 'area_km2': self.rng.uniform(1, 15)}
         ]
         
-        num_changes = random.randint(0, 3)
-        return random.sample(possible_changes, num_changes)
+        num_changes = self.rng.randint(0, 3)
+        return self.rng.sample(possible_changes, num_changes)
     
     def get_historical_data(self, region_name: str, days_back: int = 30) -> List[Dict[str, Any]]:
         """
@@ -153,11 +284,11 @@ class SatelliteDataProcessor:
             date = datetime.utcnow() - timedelta(days=i)
             data_point = {
                 'date': date.isoformat(),
-                'vegetation_index': random.uniform(0.3, 0.8),
-                'surface_temperature': random.uniform(20, 40),
-                'precipitation_index': random.uniform(0, 1),
-                'anomaly_score': random.uniform(0, 0.3),
-                'cloud_cover': random.uniform(0, 50)
+                'vegetation_index': self.rng.uniform(0.3, 0.8),
+                'surface_temperature': self.rng.uniform(20, 40),
+                'precipitation_index': self.rng.uniform(0, 1),
+                'anomaly_score': self.rng.uniform(0, 0.3),
+                'cloud_cover': self.rng.uniform(0, 50)
             }
             historical_data.append(data_point)
         
@@ -168,12 +299,12 @@ class SatelliteDataProcessor:
         Simulate data quality validation
         """
         quality_metrics = {
-            'overall_quality': random.uniform(0.7, 1.0),
-            'geometric_accuracy': random.uniform(0.8, 1.0),
-            'radiometric_accuracy': random.uniform(0.7, 0.95),
-            'temporal_consistency': random.uniform(0.8, 1.0),
-            'spatial_coverage': random.uniform(0.9, 1.0),
-            'data_completeness': random.uniform(0.85, 1.0),
+            'overall_quality': self.rng.uniform(0.7, 1.0),
+            'geometric_accuracy': self.rng.uniform(0.8, 1.0),
+            'radiometric_accuracy': self.rng.uniform(0.7, 0.95),
+            'temporal_consistency': self.rng.uniform(0.8, 1.0),
+            'spatial_coverage': self.rng.uniform(0.9, 1.0),
+            'data_completeness': self.rng.uniform(0.85, 1.0),
             'quality_flags': self._generate_quality_flags()
         }
         
@@ -191,8 +322,8 @@ class SatelliteDataProcessor:
         ]
         
         # Randomly select 0-2 quality issues
-        num_flags = random.randint(0, 2)
-        return random.sample(possible_flags, num_flags)
+        num_flags = self.rng.randint(0, 2)
+        return self.rng.sample(possible_flags, num_flags)
     
     def process_real_time_stream(self) -> Dict[str, Any]:
         """
@@ -200,10 +331,19 @@ class SatelliteDataProcessor:
         """
         return {
             'stream_id': f"STREAM_{int(time.time())}",
-            'data_rate_mbps': random.uniform(10, 100),
-            'latency_seconds': random.uniform(30, 300),
-            'buffer_status': random.uniform(0.1, 0.9),
-            'processing_queue_size': random.randint(0, 50),
-            'active_satellites': random.randint(2, 8),
-            'downlink_quality': random.uniform(0.8, 1.0)
+            'data_rate_mbps': self.rng.uniform(10, 100),
+            'latency_seconds': self.rng.uniform(30, 300),
+            'buffer_status': self.rng.uniform(0.1, 0.9),
+            'processing_queue_size': self.rng.randint(0, 50),
+            'active_satellites': self.rng.randint(2, 8),
+            'downlink_quality': self.rng.uniform(0.8, 1.0)
         }
+
+
+def _smooth_field(rng: np.random.Generator, shape, cells: int) -> np.ndarray:
+    """Smooth random field in [0, 1]: a coarse random grid bilinearly upsampled to ``shape``"""
+    coarse = rng.random((cells + 1, cells + 1))
+    row_pos = np.linspace(0, cells, shape[0])
+    col_pos = np.linspace(0, cells, shape[1])
+    by_rows = np.array([np.interp(row_pos, np.arange(cells + 1), coarse[:, j]) for j in range(cells + 1)]).T
+    return np.array([np.interp(col_pos, np.arange(cells + 1), row) for row in by_rows])
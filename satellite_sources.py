@@ -0,0 +1,414 @@
+import os
+import random
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from latency import LatencyModel, latency_from_env, rng_from_env
+from records import DataSource, RegionBounds
+import metrics
+
+DEFAULT_TIMEOUT_SECONDS = 5.0
+DEFAULT_REQUIRED_SOURCES = 2
+DEFAULT_WORKERS = 16
+# A request still running at its source's p95 gets a backup request to another source
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # until then a source hedges at half the timeout
+LATENCY_WINDOW = 200
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# Products each simulated source returns: (image types, resolutions)
+SOURCE_PROFILES = {
+    'Sentinel-2': (('optical', 'multispectral'), ('10m', '30m')),
+    'Landsat-8': (('optical', 'multispectral', 'infrared'), ('30m', '100m')),
+    'MODIS': (('infrared', 'multispectral'), ('250m',)),
+    'Sentinel-1': (('radar',), ('10m',)),
+}
+
+SATELLITE_SOURCE_FETCH_SECONDS = metrics.histogram(
+    'satellite_source_fetch_duration_seconds',
+    'Latency of successful fetches per satellite source, including ones that finished after their timeout',
+    ('source',))
+SATELLITE_SOURCE_REQUESTS = metrics.counter(
+    'satellite_source_requests',
+    'Satellite source requests by outcome (ok, error, timeout, rejected by an open circuit)',
+    ('source', 'outcome'))
+SATELLITE_SOURCE_HEDGES = metrics.counter(
+    'satellite_source_hedges',
+    'Backup requests sent because a request to this source ran past its hedge delay',
+    ('source',))
+SATELLITE_SOURCE_CIRCUIT_OPEN = metrics.gauge(
+    'satellite_source_circuit_open',
+    'Whether the circuit breaker of a satellite source is open (1) or not (0)',
+    ('source',))
+SATELLITE_SOURCE_SHORTFALLS = metrics.counter(
+    'satellite_source_shortfalls',
+    'Acquisitions that got fewer source products than required')
+
+
+class SourceError(Exception):
+    """Raised when a satellite source, or every source of an acquisition, fails to return a product"""
+
+
+class SourceAdapter:
+    """
+    One satellite data source. ``fetch`` returns the source's product for a
+    region or raises; it may block, and SourceFetcher bounds it with a timeout.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def fetch(self, bounds: RegionBounds) -> DataSource:
+        raise NotImplementedError
+
+
+class SimulatedSource(SourceAdapter):
+    """Mock source with a simulated download delay, standing in for a real satellite data API"""
+
+    def __init__(self, name: str, latency: Optional[LatencyModel] = None, rng: Optional[random.Random] = None):
+        super().__init__(name)
+        self.latency = latency or latency_from_env(0.5, 2.0)
+        self.rng = rng or rng_from_env()
+        self.image_types, self.resolutions = SOURCE_PROFILES.get(
+            name, (('optical', 'infrared', 'radar', 'multispectral'), ('10m', '30m', '100m', '250m')))
+
+    def fetch(self, bounds: RegionBounds) -> DataSource:
+        self.latency.wait('satellite_acquisition', self.rng)
+        return DataSource(
+            satellite=self.name,
+            image_type=self.rng.choice(self.image_types),
+            resolution=self.rng.choice(self.resolutions),
+            cloud_cover=self.rng.uniform(0, 30),
+            quality_score=self.rng.uniform(0.7, 1.0),
+            acquisition_angle=self.rng.uniform(-30, 30)
+        )
+
+
+class FakeSource(SourceAdapter):
+    """
+    Local source with injected faults for tests and benchmarks. Each fetch
+    sleeps ``delay`` seconds, or the next of ``delays`` (cycling), then fails
+    with probability ``failure_rate`` or while ``fail_next`` failures remain.
+    """
+
+    def __init__(self, name: str, delay: float = 0.0, delays: Optional[Sequence[float]] = None,
+                 failure_rate: float = 0.0, rng: Optional[random.Random] = None):
+        super().__init__(name)
+        self.delay = delay
+        self.delays = list(delays) if delays else None
+        self.failure_rate = failure_rate
+        self.rng = rng or random.Random(0)
+        self.calls = 0
+        self._forced_failures = 0
+        self._lock = threading.Lock()
+
+    def fail_next(self, count: int = 1):
+        with self._lock:
+            self._forced_failures += count
+
+    def fetch(self, bounds: RegionBounds) -> DataSource:
+        with self._lock:
+            delay = self.delays[self.calls % len(self.delays)] if self.delays else self.delay
+            self.calls += 1
+            fail = self._forced_failures > 0 or self.rng.random() < self.failure_rate
+            if self._forced_failures > 0:
+                self._forced_failures -= 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise SourceError(f"{self.name}: injected failure")
+        return DataSource(satellite=self.name, image_type='optical', resolution='10m', cloud_cover=0.0,
+                          quality_score=1.0, acquisition_angle=0.0)
+
+
+class CircuitBreaker:
+    """
+    ``failure_threshold`` consecutive failures open the circuit and requests
+    are rejected for ``reset_seconds``. Then a single trial request is let
+    through (half open): success closes the circuit, failure reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in the half-open state this claims the single trial"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if it opened the circuit"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.OPEN:
+                return False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self._trial_in_flight = False
+                return True
+            return False
+
+
+class LatencyTracker:
+    """Sliding window of a source's recent fetch latencies"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+@dataclass
+class _Attempt:
+    source: SourceAdapter
+    started: float
+    hedge_at: float
+    deadline: float
+    future: Optional[Future] = None
+    timed_out: bool = False
+    failed: bool = False
+
+
+@dataclass
+class _Slot:
+    """One product an acquisition needs, and the requests (original, backups) trying to fill it"""
+    attempts: List[_Attempt] = field(default_factory=list)
+    product: Optional[DataSource] = None
+
+
+class SourceFetcher:
+    """
+    Fetches products for an acquisition from several satellite sources
+    concurrently, ``required`` at a time in the configured source order.
+
+    Every request has a ``timeout``. A request still running at its
+    source's p95 latency gets a backup request to the next source (hedging),
+    and the first of the two to answer fills the slot. Failed and timed-out
+    requests are retried on the next source. A circuit breaker per source
+    stops sending requests to one that keeps failing. Requests that finish
+    after their timeout still feed the per-source latency window, so hedge
+    delays track the real tail.
+    """
+
+    def __init__(self, sources: Sequence[SourceAdapter], timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 required: int = DEFAULT_REQUIRED_SOURCES, hedging: bool = True,
+                 breakers: Optional[Dict[str, CircuitBreaker]] = None, workers: int = DEFAULT_WORKERS):
+        self.sources = list(sources)
+        self.timeout = timeout
+        self.required = required
+        self.hedging = hedging
+        self.breakers = breakers or {source.name: CircuitBreaker() for source in self.sources}
+        self.latencies = {source.name: LatencyTracker() for source in self.sources}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='satellite-source')
+        self._lock = threading.Lock()
+
+    @classmethod
+    def simulated(cls, names: Sequence[str], latency: Optional[LatencyModel] = None,
+                  rng: Optional[random.Random] = None, **kwargs) -> 'SourceFetcher':
+        rng = rng or rng_from_env()
+        return cls([SimulatedSource(name, latency, random.Random(rng.getrandbits(64))) for name in names], **kwargs)
+
+    def hedge_delay(self, source: SourceAdapter) -> float:
+        tracker = self.latencies[source.name]
+        if len(tracker) < HEDGE_MIN_SAMPLES:
+            return self.timeout / 2
+        return min(tracker.quantile(HEDGE_QUANTILE), self.timeout)
+
+    def fetch(self, bounds: RegionBounds, required: Optional[int] = None) -> List[DataSource]:
+        """
+        Products from ``required`` different sources, or from as many as
+        answered in time. Raises SourceError if none did.
+        """
+        spares = list(self.sources)
+        slots = [_Slot() for _ in range(min(required or self.required, len(self.sources)))]
+        for slot in slots:
+            self._launch(slot, spares, bounds)
+
+        while True:
+            now = time.monotonic()
+            for slot in slots:
+                if slot.product is None:
+                    self._advance(slot, spares, bounds, now)
+
+            waiting = []
+            hedge_times = []
+            for slot in slots:
+                if slot.product is not None:
+                    continue
+                running = [attempt for attempt in slot.attempts if not attempt.timed_out and not attempt.failed]
+                waiting.extend(running)
+                # Only a slot with a single request in flight hedges (see _advance); a hedge time
+                # of a slot that already has its backup running would wake the loop for nothing
+                if len(running) == 1 and running[0].hedge_at > 0:
+                    hedge_times.append(running[0].hedge_at)
+            if not waiting:
+                break
+            next_event = min(attempt.deadline for attempt in waiting)
+            if self.hedging:
+                next_event = min([next_event] + hedge_times)
+            wait([attempt.future for attempt in waiting], timeout=max(next_event - time.monotonic(), 0.0),
+                 return_when=FIRST_COMPLETED)
+
+        products = [slot.product for slot in slots if slot.product is not None]
+        if not products:
+            raise SourceError(f"No satellite source returned data for {bounds.min_latitude},{bounds.min_longitude} "
+                              f"to {bounds.max_latitude},{bounds.max_longitude}")
+        if len(products) < len(slots):
+            SATELLITE_SOURCE_SHORTFALLS.inc()
+            logging.warning(f"Only {len(products)} of {len(slots)} satellite sources returned data")
+        return products
+
+    def _advance(self, slot: _Slot, spares: List[SourceAdapter], bounds: RegionBounds, now: float):
+        """Take a slot's finished requests, then time out, retry or hedge the rest"""
+        for attempt in slot.attempts:
+            if attempt.timed_out or attempt.failed or not attempt.future.done():
+                continue
+            if attempt.future.exception() is None:
+                slot.product = attempt.future.result()
+                return
+            attempt.failed = True
+
+        running = [attempt for attempt in slot.attempts
+                   if not attempt.timed_out and not attempt.failed and not attempt.future.done()]
+        for attempt in running:
+            if now >= attempt.deadline:
+                self._time_out(attempt)
+        running = [attempt for attempt in running if not attempt.timed_out]
+
+        if not running:
+            self._launch(slot, spares, bounds)
+        elif self.hedging and len(running) == 1 and 0 < running[0].hedge_at <= now:
+            running[0].hedge_at = 0.0
+            if self._launch(slot, spares, bounds):
+                SATELLITE_SOURCE_HEDGES.labels(source=running[0].source.name).inc()
+
+    def _launch(self, slot: _Slot, spares: List[SourceAdapter], bounds: RegionBounds) -> bool:
+        """Send the slot's next request to the first spare source whose circuit allows it"""
+        while spares:
+            source = spares.pop(0)
+            if not self.breakers[source.name].allow():
+                SATELLITE_SOURCE_REQUESTS.labels(source=source.name, outcome='rejected').inc()
+                continue
+            started = time.monotonic()
+            attempt = _Attempt(source, started, started + self.hedge_delay(source), started + self.timeout)
+            attempt.future = self._executor.submit(source.fetch, bounds)
+            attempt.future.add_done_callback(lambda future, attempt=attempt: self._finished(attempt, future))
+            slot.attempts.append(attempt)
+            return True
+        return False
+
+    def _time_out(self, attempt: _Attempt):
+        with self._lock:
+            if attempt.future.done():
+                return
+            attempt.timed_out = True
+        logging.warning(f"Satellite source {attempt.source.name} timed out after {self.timeout:.1f}s")
+        SATELLITE_SOURCE_REQUESTS.labels(source=attempt.source.name, outcome='timeout').inc()
+        self._failed(attempt.source)
+
+    def _finished(self, attempt: _Attempt, future: Future):
+        """Record a request's outcome when it completes, including after its timeout"""
+        elapsed = time.monotonic() - attempt.started
+        with self._lock:
+            late = attempt.timed_out
+        name = attempt.source.name
+        if future.exception() is not None:
+            if not late:
+                logging.warning(f"Satellite source {name} failed: {str(future.exception())}")
+                SATELLITE_SOURCE_REQUESTS.labels(source=name, outcome='error').inc()
+                self._failed(attempt.source)
+            return
+
+        self.latencies[name].observe(elapsed)
+        SATELLITE_SOURCE_FETCH_SECONDS.labels(source=name).observe(elapsed)
+        if not late:
+            SATELLITE_SOURCE_REQUESTS.labels(source=name, outcome='ok').inc()
+            self.breakers[name].record_success()
+            SATELLITE_SOURCE_CIRCUIT_OPEN.labels(source=name).set(0)
+
+    def _failed(self, source: SourceAdapter):
+        if self.breakers[source.name].record_failure():
+            logging.warning(f"Circuit opened for satellite source {source.name}")
+            SATELLITE_SOURCE_CIRCUIT_OPEN.labels(source=source.name).set(1)
+
+    def stats(self) -> List[Dict[str, object]]:
+        """Per-source circuit state and recent latency"""
+        return [{
+            'source': source.name,
+            'circuit': self.breakers[source.name].state,
+            'consecutive_failures': self.breakers[source.name].consecutive_failures,
+            'samples': len(self.latencies[source.name]),
+            'p50_seconds': self.latencies[source.name].quantile(0.5),
+            'p95_seconds': self.latencies[source.name].quantile(HEDGE_QUANTILE),
+            'hedge_delay_seconds': self.hedge_delay(source)
+        } for source in self.sources]
+
+
+def fetcher_from_env(names: Sequence[str], latency: Optional[LatencyModel] = None,
+                     rng: Optional[random.Random] = None) -> SourceFetcher:
+    """Simulated sources configured by SATELLITE_SOURCE_TIMEOUT, SATELLITE_SOURCES_REQUIRED and SATELLITE_SOURCE_HEDGING"""
+    return SourceFetcher.simulated(
+        names, latency, rng,
+        timeout=float(os.environ.get('SATELLITE_SOURCE_TIMEOUT', DEFAULT_TIMEOUT_SECONDS)),
+        required=int(os.environ.get('SATELLITE_SOURCES_REQUIRED', DEFAULT_REQUIRED_SOURCES)),
+        hedging=os.environ.get('SATELLITE_SOURCE_HEDGING', 'on') != 'off'
+    )
+
+
+_default_fetcher: Optional[SourceFetcher] = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_source_fetcher() -> SourceFetcher:
+    """The process-wide fetcher over the simulated sources, so breakers and latency stats are shared"""
+    global _default_fetcher
+
+    if _default_fetcher is None:
+        with _default_fetcher_lock:
+            if _default_fetcher is None:
+                _default_fetcher = fetcher_from_env(list(SOURCE_PROFILES))
+    return _default_fetcher
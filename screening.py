@@ -0,0 +1,194 @@
+import os
+import random
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+
+from app import db
+from models import Alert, AlertStatus, MonitoringStatus
+from records import AnalysisResult, QuickLook
+from latency import rng_from_env
+import metrics
+
+# Coarse quick-look conditions that send a region to full acquisition and analysis
+HEAT_TEMPERATURE_CELSIUS = 32.0   # with humidity at or below DRY_HUMIDITY_PERCENT: fire weather
+DRY_HUMIDITY_PERCENT = 45.0
+HEAVY_RAIN_MM = 15.0
+HIGH_WIND_KMH = 40.0
+SMOKE_AEROSOL_DEPTH = 0.65        # with visibility at or below HAZE_VISIBILITY_KM
+HAZE_VISIBILITY_KM = 15.0
+# A quick look this poor or this old cannot clear a region
+MIN_QUALITY = 0.72
+UNRELIABLE_QUALITY_FLAGS = ('data_gaps',)
+MAX_STREAM_LATENCY_SECONDS = 270.0
+
+DEFAULT_AUDIT_RATE = 0.1
+DEFAULT_MAX_SKIP_STREAK = 3
+# Weight of the latest full acquisition and analysis in the running cost estimate
+COST_SMOOTHING = 0.2
+
+SCREENING_DECISIONS = metrics.counter(
+    'screening_decisions',
+    'Regions screened by the monitoring cycle, by decision (skip, analyze) and reason',
+    ('decision', 'reason'))
+SCREENING_AUDITS = metrics.counter(
+    'screening_audits',
+    'Regions the screen would have skipped that were fully analyzed anyway, by reason',
+    ('reason',))
+SCREENING_FALSE_NEGATIVES = metrics.counter(
+    'screening_false_negatives',
+    'Threats found by full analysis of regions the screen would have skipped, by disaster type',
+    ('disaster_type',))
+SCREENING_COMPUTE_SAVED_SECONDS = metrics.counter(
+    'screening_compute_saved_seconds',
+    'Estimated acquisition and analysis time saved by skipping regions')
+SCREENING_SKIP_RATIO = metrics.gauge(
+    'screening_skip_ratio',
+    'Fraction of regions skipped in the last monitoring cycle')
+
+
+@dataclass
+class ScreeningDecision:
+    """Outcome of screening one region: whether it needs full analysis and why"""
+    region_id: int
+    analyze: bool
+    reason: str
+    triggers: List[str] = field(default_factory=list)
+    # Set when the screen would have skipped the region but it is analyzed anyway
+    audited: bool = False
+    quick_look: Optional[QuickLook] = None
+
+
+class RegionScreener:
+    """
+    Cheap prefilter in front of full acquisition and analysis. A region's
+    quick look (coarse weather, data quality and stream health) is checked
+    against fixed thresholds, and the region is analyzed in full when any is
+    crossed, when its quick look is too poor to rely on, or when it already
+    has a threat or open alerts. Otherwise it is skipped for the cycle.
+
+    Skipping is kept honest two ways. A random ``audit_rate`` of would-be
+    skips is analyzed anyway, and so is any region skipped
+    ``max_skip_streak`` cycles in a row. Threats found in either case are
+    counted as screening false negatives. Skip rate, audits and the estimated
+    compute saved are reported as metrics.
+    """
+
+    def __init__(self, audit_rate: float = DEFAULT_AUDIT_RATE, max_skip_streak: int = DEFAULT_MAX_SKIP_STREAK,
+                 enabled: bool = True, rng: Optional[random.Random] = None):
+        self.audit_rate = audit_rate
+        self.max_skip_streak = max_skip_streak
+        self.enabled = enabled
+        self.rng = rng or rng_from_env()
+        self._skip_streaks: Dict[int, int] = {}
+        self._full_cost_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def region_context(self, region_ids: Sequence[int]) -> Dict[int, Dict[str, object]]:
+        """Current threat level and open alert count per region, in two queries for the whole cycle"""
+        threat_levels = dict(db.session.query(MonitoringStatus.region_id, MonitoringStatus.threat_level)
+                             .filter(MonitoringStatus.region_id.in_(list(region_ids))).all())
+        open_alerts = dict(db.session.query(Alert.region_id, func.count(Alert.id))
+                           .filter(Alert.region_id.in_(list(region_ids)),
+                                   Alert.status.in_([AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED]))
+                           .group_by(Alert.region_id).all())
+        return {region_id: {'threat_level': threat_levels.get(region_id), 'open_alerts': open_alerts.get(region_id, 0)}
+                for region_id in region_ids}
+
+    def triggers(self, quick_look: QuickLook, threat_level: Optional[str] = None, open_alerts: int = 0) -> List[str]:
+        """Every reason the quick look and region state give for a full analysis"""
+        found = []
+        if threat_level not in (None, 'normal'):
+            found.append('active_threat')
+        if open_alerts:
+            found.append('open_alerts')
+
+        atmosphere = quick_look.atmospheric_conditions
+        if atmosphere.temperature_celsius >= HEAT_TEMPERATURE_CELSIUS and atmosphere.humidity_percent <= DRY_HUMIDITY_PERCENT:
+            found.append('fire_weather')
+        if atmosphere.precipitation_mm >= HEAVY_RAIN_MM:
+            found.append('heavy_rain')
+        if atmosphere.wind_speed_kmh >= HIGH_WIND_KMH:
+            found.append('high_wind')
+        if atmosphere.aerosol_optical_depth >= SMOKE_AEROSOL_DEPTH and atmosphere.visibility_km <= HAZE_VISIBILITY_KM:
+            found.append('smoke_haze')
+
+        quality = quick_look.quality
+        if quality.get('overall_quality', 1.0) < MIN_QUALITY \
+                or any(flag in UNRELIABLE_QUALITY_FLAGS for flag in quality.get('quality_flags', [])):
+            found.append('unreliable_quick_look')
+        if quick_look.stream.get('latency_seconds', 0.0) > MAX_STREAM_LATENCY_SECONDS:
+            found.append('stale_stream')
+        return found
+
+    def decide(self, region_id: int, quick_look: Optional[QuickLook], threat_level: Optional[str] = None,
+               open_alerts: int = 0) -> ScreeningDecision:
+        """Decide whether a region needs full acquisition and analysis this cycle; no quick look means it does"""
+        if not self.enabled:
+            return self._record(ScreeningDecision(region_id, True, 'disabled', quick_look=quick_look))
+        if quick_look is None:
+            return self._record(ScreeningDecision(region_id, True, 'no_quick_look'))
+
+        found = self.triggers(quick_look, threat_level, open_alerts)
+        if found:
+            return self._record(ScreeningDecision(region_id, True, found[0], found, quick_look=quick_look))
+
+        with self._lock:
+            streak = self._skip_streaks.get(region_id, 0)
+            audit = self.rng.random() < self.audit_rate
+        if streak >= self.max_skip_streak:
+            return self._record(ScreeningDecision(region_id, True, 'max_skip_streak', audited=True, quick_look=quick_look))
+        if audit:
+            return self._record(ScreeningDecision(region_id, True, 'audit', audited=True, quick_look=quick_look))
+        return self._record(ScreeningDecision(region_id, False, 'benign', quick_look=quick_look))
+
+    def _record(self, decision: ScreeningDecision) -> ScreeningDecision:
+        SCREENING_DECISIONS.labels(decision='analyze' if decision.analyze else 'skip', reason=decision.reason).inc()
+        with self._lock:
+            if decision.analyze:
+                self._skip_streaks.pop(decision.region_id, None)
+            else:
+                self._skip_streaks[decision.region_id] = self._skip_streaks.get(decision.region_id, 0) + 1
+                if self._full_cost_seconds is not None:
+                    screening_seconds = decision.quick_look.processing_time if decision.quick_look else 0.0
+                    SCREENING_COMPUTE_SAVED_SECONDS.inc(max(self._full_cost_seconds - screening_seconds, 0.0))
+        if decision.audited:
+            SCREENING_AUDITS.labels(reason=decision.reason).inc()
+        return decision
+
+    def record_analysis(self, decision: Optional[ScreeningDecision], analysis_result: AnalysisResult,
+                        full_seconds: float):
+        """Feed back a full analysis: its cost for the savings estimate and, for audits, any missed threats"""
+        with self._lock:
+            if self._full_cost_seconds is None:
+                self._full_cost_seconds = full_seconds
+            else:
+                self._full_cost_seconds += COST_SMOOTHING * (full_seconds - self._full_cost_seconds)
+
+        if decision is None or not decision.audited or not analysis_result.threats:
+            return
+        for threat in analysis_result.threats:
+            SCREENING_FALSE_NEGATIVES.labels(disaster_type=threat.type).inc()
+        logging.warning(f"Screening would have skipped {analysis_result.region_name} "
+                        f"({decision.reason} check): full analysis found "
+                        f"{', '.join(threat.type for threat in analysis_result.threats)}")
+
+    def record_cycle(self, decisions: Sequence[ScreeningDecision]):
+        if decisions:
+            SCREENING_SKIP_RATIO.set(sum(1 for decision in decisions if not decision.analyze) / len(decisions))
+
+
+def _screener_from_env() -> RegionScreener:
+    audit_rate = os.environ.get('SCREENING_AUDIT_RATE')
+    max_skip_streak = os.environ.get('SCREENING_MAX_SKIP_STREAK')
+    return RegionScreener(
+        audit_rate=float(audit_rate) if audit_rate else DEFAULT_AUDIT_RATE,
+        max_skip_streak=int(max_skip_streak) if max_skip_streak else DEFAULT_MAX_SKIP_STREAK,
+        enabled=os.environ.get('SCREENING', 'on') != 'off'
+    )
+
+
+region_screener = _screener_from_env()
@@ -0,0 +1,146 @@
+import os
+import queue
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from satellite_processor import SatelliteDataProcessor
+from ai_detector import DisasterDetectionAI
+import metrics
+
+SERVICE_INSTANCES = metrics.gauge(
+    'service_instances',
+    'Instances created per registered service',
+    ('service',))
+SERVICE_POOL_WAIT_SECONDS = metrics.histogram(
+    'service_pool_wait_seconds',
+    'Time spent waiting to check an instance out of a service pool',
+    ('service',))
+
+
+class ServicePool:
+    """
+    Fixed-size pool for services that are not thread-safe. Instances are created
+    on demand up to ``size`` and each is used by one thread at a time.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], size: int):
+        self.name = name
+        self.factory = factory
+        self.size = size
+        self._idle: 'queue.LifoQueue' = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _checkout(self, timeout: Optional[float]) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                SERVICE_INSTANCES.labels(service=self.name).set(self._created)
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        with SERVICE_POOL_WAIT_SECONDS.labels(service=self.name).time():
+            return self._idle.get(timeout=timeout)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        instance = self._checkout(timeout)
+        try:
+            yield instance
+        finally:
+            self._idle.put(instance)
+
+
+class ServiceRegistry:
+    """
+    Process-wide registry of shared services. Thread-safe services get a single
+    lazily created instance shared by routes and the monitoring service, so
+    caches and loaded models exist once per process; services registered with a
+    pool size are handed out one instance per thread via ``acquire``.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._pool_sizes: Dict[str, Optional[int]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._pools: Dict[str, ServicePool] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any], pool_size: Optional[int] = None):
+        """Register a service factory; ``pool_size`` marks the service as not thread-safe"""
+        with self._lock:
+            self._factories[name] = factory
+            self._pool_sizes[name] = pool_size
+            self._instances.pop(name, None)
+            self._pools.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Get the shared instance of a thread-safe service, creating it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._pool_sizes.get(name):
+                raise RuntimeError(f"Service '{name}' is pooled; use acquire() instead of get()")
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = self._factories[name]()
+                self._instances[name] = instance
+                SERVICE_INSTANCES.labels(service=name).set(1)
+                logging.info(f"Service '{name}' initialized")
+        return instance
+
+    @contextmanager
+    def acquire(self, name: str, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Check out an instance: the shared one, or one from the service's pool"""
+        pool_size = self._pool_sizes.get(name)
+        if not pool_size:
+            yield self.get(name)
+            return
+
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = ServicePool(name, self._factories[name], pool_size)
+                    self._pools[name] = pool
+        with pool.acquire(timeout) as instance:
+            yield instance
+
+
+def _pool_size_from_env(variable: str) -> Optional[int]:
+    value = os.environ.get(variable)
+    return int(value) if value else None
+
+
+registry = ServiceRegistry()
+registry.register('satellite_processor', SatelliteDataProcessor,
+                  pool_size=_pool_size_from_env('SATELLITE_PROCESSOR_POOL_SIZE'))
+registry.register('ai_detector', DisasterDetectionAI,
+                  pool_size=_pool_size_from_env('AI_DETECTOR_POOL_SIZE'))
+
+
+def satellite_processor():
+    """Check out the satellite data processor for the duration of a ``with`` block"""
+    return registry.acquire('satellite_processor')
+
+def ai_detector():
+    """Check out the AI disaster detector for the duration of a ``with`` block"""
+    return registry.acquire('ai_detector')
@@ -0,0 +1,132 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from sqlalchemy import event
+
+from app import app, db
+import metrics
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+SQLITE_WRITE_WAIT_SECONDS = metrics.histogram(
+    'sqlite_write_queue_wait_seconds',
+    'Time a write spent queued for the SQLite writer thread')
+SQLITE_WRITE_SECONDS = metrics.histogram(
+    'sqlite_write_duration_seconds',
+    'Time the SQLite writer thread spent running and committing a write')
+SQLITE_WRITE_QUEUE_DEPTH = metrics.gauge(
+    'sqlite_write_queue_depth',
+    'Writes waiting for the SQLite writer thread')
+
+
+def is_sqlite(uri: Optional[str]) -> bool:
+    return bool(uri) and uri.startswith('sqlite')
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL lets readers proceed while the single writer commits
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # Durable at checkpoints rather than every commit; safe with WAL
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_BUSY_TIMEOUT_MS))}")
+        cursor.execute(f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', DEFAULT_MMAP_SIZE))}")
+    finally:
+        cursor.close()
+
+
+class SQLiteWriter:
+    """
+    SQLite production profile. Every connection is switched to WAL with
+    synchronous=NORMAL, a busy timeout and memory-mapped reads, and the writes
+    of this process (monitoring and maintenance jobs, on-demand analysis,
+    alert actions and logins) are serialized through one writer thread so they
+    never contend for the database lock; reads stay concurrent on their own
+    connections. Only startup seeding commits outside it.
+
+    ``run_write`` runs a function in the writer thread, in its own app context
+    and session, and commits it. Pass ids and plain values, never objects
+    bound to the caller's session, and return plain values: the writer's
+    session is closed once the write commits. On other databases, or with
+    SQLITE_PROFILE=off, it runs the function inline in the caller's session.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = (is_sqlite(app.config.get('SQLALCHEMY_DATABASE_URI'))
+                        and os.environ.get('SQLITE_PROFILE', 'on') != 'off')
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            event.listen(db.engine, 'connect', _apply_pragmas)
+        logging.info("SQLite profile enabled: WAL journal and a single writer thread")
+
+    def run_write(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` as a serialized write, commit it and return its result"""
+        if not self.enabled or threading.current_thread() is self._thread:
+            try:
+                result = fn(*args, **kwargs)
+                db.session.commit()
+                return result
+            except Exception:
+                db.session.rollback()
+                raise
+
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((fn, args, kwargs, future, time.perf_counter()))
+        SQLITE_WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+        return future.result()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            SQLITE_WRITE_QUEUE_DEPTH.set(self._queue.qsize())
+            if job is None:
+                return
+
+            fn, args, kwargs, future, queued_at = job
+            SQLITE_WRITE_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            with app.app_context(), SQLITE_WRITE_SECONDS.time():
+                try:
+                    result = fn(*args, **kwargs)
+                    db.session.commit()
+                    future.set_result(result)
+                except Exception as e:
+                    db.session.rollback()
+                    future.set_exception(e)
+
+    def stop(self):
+        """Finish queued writes and stop the writer thread"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+
+
+sqlite_writer = SQLiteWriter()
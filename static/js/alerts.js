@@ -7,8 +7,91 @@ class AlertsManager {
 
     init() {
         this.setupEventListeners();
-        this.setupRealTimeUpdates();
+        // Real-time alert events are delivered by socketClient, which replays missed ones on reconnect
         this.initializeAlertActions();
+        this.setupBulkActions();
+    }
+
+    setupBulkActions() {
+        const toolbar = document.getElementById('bulk-actions');
+        if (!toolbar) return;
+
+        const selectAll = document.getElementById('bulk-select-all');
+        selectAll.addEventListener('change', () => {
+            document.querySelectorAll('.bulk-select').forEach(checkbox => {
+                checkbox.checked = selectAll.checked;
+            });
+            this.updateBulkSelection();
+        });
+
+        document.querySelectorAll('.bulk-select').forEach(checkbox => {
+            checkbox.addEventListener('change', () => this.updateBulkSelection());
+        });
+
+        toolbar.querySelectorAll('[data-bulk-action]').forEach(button => {
+            button.addEventListener('click', () => this.submitBulkAction(button.dataset.bulkAction));
+        });
+    }
+
+    getSelectedAlertIds() {
+        return Array.from(document.querySelectorAll('.bulk-select:checked'))
+            .map(checkbox => parseInt(checkbox.value));
+    }
+
+    updateBulkSelection() {
+        const selected = this.getSelectedAlertIds().length;
+        const counter = document.getElementById('bulk-selected-count');
+        if (counter) {
+            counter.textContent = `${selected} selected`;
+        }
+        document.querySelectorAll('[data-bulk-action]').forEach(button => {
+            button.disabled = selected === 0;
+        });
+    }
+
+    submitBulkAction(action) {
+        const alertIds = this.getSelectedAlertIds();
+        if (alertIds.length === 0) return;
+
+        document.querySelectorAll('[data-bulk-action]').forEach(button => {
+            button.disabled = true;
+        });
+
+        fetch('/api/alerts/bulk', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({action: action, alert_ids: alertIds})
+        })
+            .then(response => response.json().then(body => ({ok: response.ok, body: body})))
+            .then(({ok, body}) => {
+                if (!ok) {
+                    this.showNotification(body.error || 'Bulk update failed', 'danger');
+                    return;
+                }
+                // Cards are updated by the alerts_bulk_updated event
+                const verb = action === 'acknowledge' ? 'acknowledged' : 'resolved';
+                this.showNotification(`${body.updated} alerts ${verb}`, 'success');
+            })
+            .catch(() => this.showNotification('Bulk update failed', 'danger'))
+            .finally(() => this.updateBulkSelection());
+    }
+
+    handleAlertsBulkUpdate(data) {
+        data.alert_ids.forEach(alertId => {
+            const alertCard = document.querySelector(`[data-alert-id="${alertId}"]`);
+            if (!alertCard) return;
+
+            this.updateAlertCard(alertCard, {...data, alert_id: alertId});
+            this.showFlashAnimation(alertCard);
+
+            const checkbox = alertCard.querySelector('.bulk-select');
+            if (checkbox && data.status === 'resolved') {
+                checkbox.remove();
+            } else if (checkbox) {
+                checkbox.checked = false;
+            }
+        });
+        this.updateBulkSelection();
     }
 
     setupEventListeners() {
@@ -42,18 +125,6 @@ class AlertsManager {
         }
     }
 
-    setupRealTimeUpdates() {
-        if (window.socket) {
-            window.socket.on('new_alert', (data) => {
-                this.handleNewAlert(data);
-            });
-
-            window.socket.on('alert_updated', (data) => {
-                this.handleAlertUpdate(data);
-            });
-        }
-    }
-
     handleAlertAction(event, action) {
         const form = event.target;
         const button = form.querySelector('button');
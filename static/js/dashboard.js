@@ -93,15 +93,8 @@ class DashboardManager {
 
     setupRealTimeUpdates() {
         // Listen for real-time updates from socket
+        // Alert and region changes arrive through socketClient, which replays missed ones on reconnect
         if (window.socket) {
-            window.socket.on('region_status_update', (data) => {
-                this.updateRegionStatus(data);
-            });
-
-            window.socket.on('new_alert', (data) => {
-                this.handleNewAlert(data);
-            });
-
             window.socket.on('system_health_update', (data) => {
                 this.updateSystemHealth(data);
             });
@@ -306,8 +299,11 @@ class DashboardManager {
     }
 
     refreshDashboardData() {
-        // Refresh key dashboard components
-        this.updateAlertBadge();
+        // Live events keep the dashboard current while the socket is connected; poll only without it
+        const connected = window.socketClient && window.socketClient.connectionStatus === 'connected';
+        if (!connected) {
+            this.updateAlertBadge();
+        }
         this.updateLastUpdateTime();
     }
 
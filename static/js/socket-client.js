@@ -7,6 +7,12 @@ class SocketClient {
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
         this.reconnectDelay = 1000;
+        // Every change up to lastSeq has been applied; heldChanges are later ones waiting for a gap to fill
+        this.lastSeq = null;
+        this.heldChanges = new Map();
+        this.fillingGap = false;
+        this.resuming = false;
+        this.pendingChanges = [];
         
         this.init();
     }
@@ -43,6 +49,10 @@ class SocketClient {
             this.reconnectAttempts = 0;
             this.updateConnectionStatus();
             this.showConnectionNotification('Connected to real-time updates', 'success');
+
+            // Ask for the changes emitted since the last one we saw (or just the latest sequence)
+            this.resuming = true;
+            this.socket.emit('resume', {since: this.lastSeq});
         });
 
         this.socket.on('disconnect', (reason) => {
@@ -86,28 +96,30 @@ class SocketClient {
     }
 
     setupApplicationEventHandlers() {
-        // New alert received
-        this.socket.on('new_alert', (data) => {
-            console.log('New alert received:', data);
-            this.handleNewAlert(data);
-        });
-
-        // Alert status updated
-        this.socket.on('alert_updated', (data) => {
-            console.log('Alert updated:', data);
-            this.handleAlertUpdate(data);
-        });
-
-        // Region status updated
-        this.socket.on('region_status_update', (data) => {
-            console.log('Region status updated:', data);
-            this.handleRegionStatusUpdate(data);
+        // Sequenced alert and region changes; missed ones are replayed on reconnect
+        this.changeHandlers = {
+            'new_alert': (data) => this.handleNewAlert(data),
+            'alert_updated': (data) => this.handleAlertUpdate(data),
+            'alerts_bulk_updated': (data) => this.handleAlertsBulkUpdate(data),
+            'region_status_update': (data) => this.handleRegionStatusUpdate(data),
+            'region_analyzed': (data) => this.handleRegionAnalyzed(data),
+            'incident_updated': (data) => this.handleIncidentUpdate(data)
+        };
+        Object.keys(this.changeHandlers).forEach(event => {
+            this.socket.on(event, (data) => {
+                console.log(`${event} received:`, data);
+                if (this.resuming) {
+                    // Apply after the missed changes that precede it
+                    this.pendingChanges.push({event: event, payload: data, seq: data.seq});
+                } else {
+                    this.applyChange(event, data, data.seq);
+                }
+            });
         });
 
-        // Region analysis completed
-        this.socket.on('region_analyzed', (data) => {
-            console.log('Region analysis completed:', data);
-            this.handleRegionAnalyzed(data);
+        // Changes missed while disconnected, in reply to 'resume'
+        this.socket.on('changes', (data) => {
+            this.handleMissedChanges(data);
         });
 
         // System health update
@@ -123,6 +135,115 @@ class SocketClient {
         });
     }
 
+    applyChange(event, data, seq) {
+        if (seq === undefined || seq === null) {
+            this.runChangeHandler(event, data);
+            return;
+        }
+        // Skip changes already applied (a live event can race its replay)
+        if (this.lastSeq !== null && seq <= this.lastSeq) {
+            return;
+        }
+        if (this.lastSeq !== null && seq > this.lastSeq + 1) {
+            // An earlier change has not arrived yet: emits from other threads and workers can
+            // overtake it, so hold this one and fetch the gap instead of skipping past it
+            this.heldChanges.set(seq, {event: event, payload: data, seq: seq});
+            this.fillGap();
+            return;
+        }
+
+        this.runChangeHandler(event, data);
+        this.lastSeq = seq;
+        this.applyHeldChanges();
+    }
+
+    applyHeldChanges() {
+        // Held changes already covered by a replay, then the ones now next in line
+        this.heldChanges.forEach((change, seq) => {
+            if (seq <= this.lastSeq) {
+                this.heldChanges.delete(seq);
+            }
+        });
+        let next = this.heldChanges.get(this.lastSeq + 1);
+        while (next) {
+            this.heldChanges.delete(next.seq);
+            this.runChangeHandler(next.event, next.payload);
+            this.lastSeq = next.seq;
+            next = this.heldChanges.get(this.lastSeq + 1);
+        }
+    }
+
+    runChangeHandler(event, data) {
+        const handler = this.changeHandlers[event];
+        if (handler) {
+            handler(data);
+        }
+    }
+
+    applyReplayedChanges(changes) {
+        // The change log is authoritative: a sequence number it skips was never committed
+        changes.forEach(change => {
+            if (this.lastSeq === null || change.seq > this.lastSeq) {
+                this.runChangeHandler(change.event, change.payload);
+                this.lastSeq = change.seq;
+            }
+        });
+        this.applyHeldChanges();
+    }
+
+    fillGap() {
+        if (this.fillingGap || this.resuming) {
+            return;
+        }
+        this.fillingGap = true;
+        fetch(`/api/changes?since=${this.lastSeq}`)
+            .then(response => response.json())
+            .then(data => {
+                this.fillingGap = false;
+                if (data.reset) {
+                    window.location.reload();
+                    return;
+                }
+                this.applyReplayedChanges(data.changes);
+                if (data.has_more || this.heldChanges.size > 0) {
+                    this.fillGap();
+                }
+            })
+            .catch(error => {
+                this.fillingGap = false;
+                console.error('Error fetching missed changes:', error);
+            });
+    }
+
+    handleMissedChanges(data) {
+        if (data.reset) {
+            // Too far behind the retained change log; start over from the page
+            window.location.reload();
+            return;
+        }
+
+        this.applyReplayedChanges(data.changes);
+
+        if (data.has_more) {
+            this.socket.emit('resume', {since: this.lastSeq});
+            return;
+        }
+
+        // Live events that arrived meanwhile, then catch up to the latest sequence
+        this.resuming = false;
+        const pending = this.pendingChanges.sort((a, b) => a.seq - b.seq);
+        this.pendingChanges = [];
+        if (this.lastSeq === null) {
+            // First connection: the page already reflects changes up to the latest sequence
+            pending.forEach(change => this.runChangeHandler(change.event, change.payload));
+            this.lastSeq = Math.max(data.latest, ...pending.map(change => change.seq));
+            return;
+        }
+        pending.forEach(change => {
+            this.applyChange(change.event, change.payload, change.seq);
+        });
+    }
+
     setupEventListeners() {
         // Handle page visibility changes
         document.addEventListener('visibilitychange', () => {
@@ -184,6 +305,16 @@ class SocketClient {
         this.updateAlertBadge();
     }
 
+    handleAlertsBulkUpdate(data) {
+        // Notify alerts manager if available
+        if (window.alertsManager) {
+            window.alertsManager.handleAlertsBulkUpdate(data);
+        }
+
+        // Update alert badge
+        this.updateAlertBadge();
+    }
+
     handleRegionStatusUpdate(data) {
         // Notify dashboard manager if available
         if (window.dashboardManager) {
@@ -206,6 +337,15 @@ class SocketClient {
         }
     }
 
+    handleIncidentUpdate(data) {
+        // Only worth a notification once an incident spans more than one region
+        if (data.regions.length > 1 && data.new_alert_ids.length > 0) {
+            this.showConnectionNotification(
+                `🔗 ${data.disaster_type} incident spans ${data.regions.join(', ')} (${data.alert_count} alerts)`,
+                'warning');
+        }
+    }
+
     handleSystemHealthUpdate(data) {
         // Notify dashboard manager if available
         if (window.dashboardManager) {
@@ -0,0 +1,259 @@
+import os
+import logging
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, select, update
+
+from app import db
+from models import Alert, AlertDailyRollup, Region, StatisticsGap, StatisticsWatermark
+import metrics
+
+WATERMARK_NAME = 'alert_daily_rollup'
+REFRESH_BATCH_SIZE = 50000
+# How long an id skipped by the watermark may take to commit before it is treated as rolled back
+DEFAULT_GAP_RETENTION_MINUTES = 15
+GAP_QUERY_CHUNK = 500
+
+STATISTICS_REFRESH_SECONDS = metrics.histogram(
+    'statistics_refresh_duration_seconds',
+    'Duration of an incremental statistics rollup refresh')
+STATISTICS_ALERTS_FOLDED = metrics.counter(
+    'statistics_alerts_folded',
+    'Alerts folded into the daily statistics rollups')
+
+RollupKey = namedtuple('RollupKey', ['day', 'region_id', 'disaster_type', 'severity'])
+
+
+def _as_date(value) -> date:
+    # func.date() returns a string on SQLite and a date on PostgreSQL
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def gap_retention_minutes() -> int:
+    value = os.environ.get('STATISTICS_GAP_RETENTION_MINUTES')
+    return int(value) if value else DEFAULT_GAP_RETENTION_MINUTES
+
+
+def _get_watermark() -> StatisticsWatermark:
+    watermark = StatisticsWatermark.query.filter_by(name=WATERMARK_NAME).first()
+    if not watermark:
+        watermark = StatisticsWatermark(name=WATERMARK_NAME, last_alert_id=0)
+        db.session.add(watermark)
+        db.session.commit()
+    return watermark
+
+
+@metrics.timed(STATISTICS_REFRESH_SECONDS)
+def refresh_statistics(max_batches: Optional[int] = None) -> int:
+    """
+    Fold alerts above the Alert.id high-water mark into the daily rollups.
+    Alerts are never re-dated or re-typed after creation, so each alert is
+    counted exactly once. Ids are not committed in order (a slow transaction
+    can commit a lower id after a higher one is folded), so ids missing from
+    a folded range are kept as StatisticsGap rows and folded when they show
+    up, or dropped as rolled back after ``STATISTICS_GAP_RETENTION_MINUTES``.
+    Concurrent refreshes (several workers, the scheduler) are safe: the
+    watermark is advanced with a compare-and-set, gaps are claimed by deleting
+    them, and a refresh that loses either race rolls back. Returns the number
+    of alerts folded in.
+    """
+    folded = 0
+    batches = 0
+
+    try:
+        folded += _fold_gaps()
+
+        while max_batches is None or batches < max_batches:
+            watermark = _get_watermark()
+            low = watermark.last_alert_id
+
+            high = db.session.query(func.max(Alert.id)).filter(
+                Alert.id > low, Alert.id <= low + REFRESH_BATCH_SIZE
+            ).scalar()
+            if high is None:
+                break
+
+            groups = _group_alerts(Alert.id > low, Alert.id <= high)
+            last_detected_at = watermark.last_detected_at
+            for group in groups:
+                if group.last_detected_at and (last_detected_at is None or group.last_detected_at > last_detected_at):
+                    last_detected_at = group.last_detected_at
+
+            _apply_deltas(_to_deltas(groups))
+
+            batch_folded = sum(group.alert_count for group in groups)
+            if batch_folded < high - low:
+                _record_gaps(low, high)
+
+            # Advance the watermark only if no concurrent refresh got there first
+            advanced = db.session.execute(
+                update(StatisticsWatermark)
+                .where(StatisticsWatermark.name == WATERMARK_NAME,
+                       StatisticsWatermark.last_alert_id == low)
+                .values(last_alert_id=high,
+                        last_detected_at=last_detected_at,
+                        refreshed_at=datetime.utcnow())
+            ).rowcount
+            if not advanced:
+                db.session.rollback()
+                logging.debug("Statistics refresh lost race to a concurrent refresh")
+                break
+
+            db.session.commit()
+            folded += batch_folded
+            batches += 1
+            STATISTICS_ALERTS_FOLDED.inc(batch_folded)
+
+        if folded:
+            logging.info(f"Statistics rollups refreshed: {folded} alerts folded in")
+
+    except Exception as e:
+        logging.error(f"Error refreshing statistics rollups: {str(e)}")
+        db.session.rollback()
+
+    return folded
+
+
+def _group_alerts(*criteria) -> List[Any]:
+    """Alerts matching ``criteria`` aggregated per (day, region, type, severity)"""
+    day = func.date(Alert.detected_at)
+    return db.session.query(
+        day.label('day'),
+        Alert.region_id,
+        Alert.disaster_type,
+        Alert.severity,
+        func.count(Alert.id).label('alert_count'),
+        func.coalesce(func.sum(Alert.confidence_score), 0.0).label('confidence_sum'),
+        func.count(Alert.confidence_score).label('confidence_count'),
+        func.max(Alert.detected_at).label('last_detected_at')
+    ).filter(*criteria)\
+     .group_by(day, Alert.region_id, Alert.disaster_type, Alert.severity)\
+     .all()
+
+
+def _to_deltas(groups: List[Any]) -> Dict[RollupKey, Any]:
+    return {RollupKey(_as_date(group.day), group.region_id, group.disaster_type, group.severity): group
+            for group in groups}
+
+
+def _record_gaps(low: int, high: int):
+    """Remember ids in (low, high] with no committed alert, to fold them if they commit later"""
+    present = set(db.session.execute(
+        select(Alert.id).where(Alert.id > low, Alert.id <= high)
+    ).scalars())
+    now = datetime.utcnow()
+    db.session.add_all([StatisticsGap(alert_id=alert_id, found_at=now)
+                        for alert_id in range(low + 1, high + 1) if alert_id not in present])
+
+
+def _fold_gaps() -> int:
+    """Fold alerts that committed after the watermark passed their id, and expire old gaps"""
+    gap_ids = db.session.execute(select(StatisticsGap.alert_id)).scalars().all()
+    if not gap_ids:
+        return 0
+
+    found = []
+    for start in range(0, len(gap_ids), GAP_QUERY_CHUNK):
+        found.extend(db.session.execute(
+            select(Alert.id).where(Alert.id.in_(gap_ids[start:start + GAP_QUERY_CHUNK]))
+        ).scalars())
+
+    folded = 0
+    if found:
+        # Claiming the gaps by deleting them keeps a concurrent refresh from folding them too
+        claimed = db.session.execute(delete(StatisticsGap).where(StatisticsGap.alert_id.in_(found))).rowcount
+        if claimed != len(found):
+            db.session.rollback()
+            logging.debug("Statistics gap fold lost race to a concurrent refresh")
+            return 0
+        groups = _group_alerts(Alert.id.in_(found))
+        _apply_deltas(_to_deltas(groups))
+        folded = sum(group.alert_count for group in groups)
+        STATISTICS_ALERTS_FOLDED.inc(folded)
+
+    # Ids still missing this long after they were passed belonged to rolled-back transactions
+    expired = db.session.execute(
+        delete(StatisticsGap).where(
+            StatisticsGap.found_at < datetime.utcnow() - timedelta(minutes=gap_retention_minutes()))
+    ).rowcount
+    db.session.commit()
+    if folded or expired:
+        logging.debug(f"Statistics gaps: {folded} late alerts folded, {expired} expired")
+    return folded
+
+
+def _apply_deltas(deltas: Dict[RollupKey, Any]):
+    """Add aggregated alert groups to their (day, region, type, severity) rollup rows"""
+    if not deltas:
+        return
+
+    days = {key.day for key in deltas}
+    existing = {
+        RollupKey(row.day, row.region_id, row.disaster_type, row.severity): row
+        for row in AlertDailyRollup.query.filter(AlertDailyRollup.day.in_(days)).all()
+    }
+
+    for key, group in deltas.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            rollup = AlertDailyRollup(day=key.day, region_id=key.region_id,
+                                      disaster_type=key.disaster_type, severity=key.severity,
+                                      alert_count=0, confidence_sum=0.0, confidence_count=0)
+            db.session.add(rollup)
+        rollup.alert_count += group.alert_count
+        rollup.confidence_sum += group.confidence_sum or 0.0
+        rollup.confidence_count += group.confidence_count
+
+
+def get_statistics(start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Serve the statistics page from the daily rollups. ``start_date``/``end_date``
+    bound all aggregates (inclusive); the daily trend defaults to the last 7 days.
+    """
+    range_filters = []
+    if start_date:
+        range_filters.append(AlertDailyRollup.day >= start_date)
+    if end_date:
+        range_filters.append(AlertDailyRollup.day <= end_date)
+
+    alert_by_type = db.session.query(
+        AlertDailyRollup.disaster_type,
+        func.sum(AlertDailyRollup.alert_count).label('count')
+    ).filter(*range_filters).group_by(AlertDailyRollup.disaster_type).all()
+
+    alert_by_severity = db.session.query(
+        AlertDailyRollup.severity,
+        func.sum(AlertDailyRollup.alert_count).label('count')
+    ).filter(*range_filters).group_by(AlertDailyRollup.severity).all()
+
+    regional_stats = db.session.query(
+        Region.name,
+        func.coalesce(func.sum(AlertDailyRollup.alert_count), 0).label('alert_count'),
+        (func.sum(AlertDailyRollup.confidence_sum) /
+         func.nullif(func.sum(AlertDailyRollup.confidence_count), 0)).label('avg_confidence')
+    ).outerjoin(AlertDailyRollup, and_(AlertDailyRollup.region_id == Region.id, *range_filters))\
+     .group_by(Region.name).all()
+
+    trend_filters = range_filters
+    if not start_date and not end_date:
+        trend_filters = [AlertDailyRollup.day >= datetime.utcnow().date() - timedelta(days=7)]
+
+    daily_alerts = db.session.query(
+        AlertDailyRollup.day.label('date'),
+        func.sum(AlertDailyRollup.alert_count).label('count')
+    ).filter(*trend_filters)\
+     .group_by(AlertDailyRollup.day)\
+     .order_by(AlertDailyRollup.day).all()
+
+    return {
+        'alert_by_type': alert_by_type,
+        'alert_by_severity': alert_by_severity,
+        'regional_stats': regional_stats,
+        'daily_alerts': daily_alerts
+    }
@@ -0,0 +1,171 @@
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, or_, select, update
+
+from app import app, db
+from models import MonitoringStatus
+from change_feed import PendingChange, change_feed
+from sqlite_profile import sqlite_writer
+import metrics
+
+DEFAULT_FLUSH_SECONDS = 2.0
+
+STATUS_FLUSH_SECONDS = metrics.histogram(
+    'status_buffer_flush_duration_seconds',
+    'Duration of writing buffered monitoring status updates in one transaction')
+STATUS_FLUSH_ROWS = metrics.counter(
+    'status_buffer_flushed_rows',
+    'Monitoring status rows written by the write-behind buffer')
+STATUS_BUFFER_PENDING = metrics.gauge(
+    'status_buffer_pending_regions',
+    'Regions with monitoring status updates waiting to be flushed')
+
+_table = MonitoringStatus.__table__
+
+
+class StatusWriteBuffer:
+    """
+    Write-behind buffer for MonitoringStatus. Per-region updates accumulate in
+    memory, later fields overwriting earlier ones, and are written every
+    ``interval`` seconds (and on demand) as one executemany UPDATE in a single
+    transaction. An update may carry the region_status_update payload to log
+    and emit once it is committed. Rows are only overwritten by updates whose
+    ``last_analysis_at`` is at least as recent, so a flush never clobbers a
+    newer status written directly, e.g. by an on-demand region analysis; the
+    notification of an update skipped that way is dropped with it.
+    """
+
+    def __init__(self, interval: float = DEFAULT_FLUSH_SECONDS):
+        self.interval = interval
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._notifications: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Serializes flushes from the timer, the monitoring cycle and shutdown
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def update(self, region_id: int, fields: Dict[str, Any], notification: Optional[Dict[str, Any]] = None):
+        """Queue status fields for a region; ``notification`` is emitted as region_status_update after flush"""
+        with self._lock:
+            self._pending.setdefault(region_id, {}).update(fields)
+            if notification is not None:
+                self._notifications[region_id] = notification
+            STATUS_BUFFER_PENDING.set(len(self._pending))
+
+    def _take(self) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            notifications, self._notifications = self._notifications, {}
+            STATUS_BUFFER_PENDING.set(0)
+        return pending, notifications
+
+    def _restore(self, pending: Dict[int, Dict[str, Any]], notifications: Dict[int, Dict[str, Any]]):
+        # Updates queued since the failed flush are newer and win
+        with self._lock:
+            for region_id, fields in pending.items():
+                self._pending[region_id] = {**fields, **self._pending.get(region_id, {})}
+            for region_id, notification in notifications.items():
+                self._notifications.setdefault(region_id, notification)
+            STATUS_BUFFER_PENDING.set(len(self._pending))
+
+    def flush(self) -> int:
+        """Write all queued updates in one transaction; returns the number of regions written"""
+        with self._flush_lock:
+            pending, notifications = self._take()
+            if not pending:
+                return 0
+
+            try:
+                with STATUS_FLUSH_SECONDS.time():
+                    changes, written = sqlite_writer.run_write(self._write, pending, notifications)
+                STATUS_FLUSH_ROWS.inc(written)
+            except Exception as e:
+                logging.error(f"Error flushing monitoring status updates: {str(e)}")
+                self._restore(pending, notifications)
+                return 0
+
+            change_feed.publish(changes)
+            return written
+
+    def _write(self, pending: Dict[int, Dict[str, Any]],
+               notifications: Dict[int, Dict[str, Any]]) -> Tuple[List[PendingChange], int]:
+        """Insert or update the queued rows; returns the changes recorded and the number of regions written"""
+        existing = set(db.session.execute(
+            select(_table.c.region_id).where(_table.c.region_id.in_(list(pending)))
+        ).scalars())
+
+        missing = [{'region_id': region_id, **fields}
+                   for region_id, fields in pending.items() if region_id not in existing]
+        for rows in self._group_by_columns(missing):
+            db.session.execute(insert(_table), rows)
+
+        updates = [{'b_region_id': region_id, **fields}
+                   for region_id, fields in pending.items() if region_id in existing]
+        for rows in self._group_by_columns(updates):
+            columns = [key for key in rows[0] if key != 'b_region_id']
+            statement = update(_table).where(_table.c.region_id == bindparam('b_region_id'))
+            if 'last_analysis_at' in columns:
+                statement = statement.where(or_(
+                    _table.c.last_analysis_at.is_(None),
+                    _table.c.last_analysis_at <= bindparam('b_last_analysis_at')
+                ))
+                for row in rows:
+                    row['b_last_analysis_at'] = row['last_analysis_at']
+            statement = statement.values({column: bindparam(column) for column in columns})
+            db.session.execute(statement, rows)
+
+        # executemany gives no per-row counts, so see which guarded updates lost to a newer analysis
+        guarded = {region_id: fields['last_analysis_at'] for region_id, fields in pending.items()
+                   if region_id in existing and 'last_analysis_at' in fields}
+        skipped = set()
+        if guarded:
+            skipped = {region_id for region_id, last_analysis_at in db.session.execute(
+                select(_table.c.region_id, _table.c.last_analysis_at)
+                .where(_table.c.region_id.in_(list(guarded)))
+            ) if last_analysis_at != guarded[region_id]}
+
+        changes = [change_feed.record('region_status_update', notification)
+                   for region_id, notification in notifications.items() if region_id not in skipped]
+        return changes, len(pending) - len(skipped)
+
+    @staticmethod
+    def _group_by_columns(rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        # executemany needs the same parameters in every row
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        return list(groups.values())
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            with app.app_context():
+                self.flush()
+
+    def start(self):
+        """Start the periodic flush thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='status-buffer-flush', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write anything still queued"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with app.app_context():
+            self.flush()
+
+
+def _interval_from_env() -> float:
+    value = os.environ.get('STATUS_FLUSH_SECONDS')
+    return float(value) if value else DEFAULT_FLUSH_SECONDS
+
+
+status_buffer = StatusWriteBuffer(_interval_from_env())
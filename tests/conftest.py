@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app configures itself from the environment on import, so point it at a scratch database first
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_db_dir, "test.db")}'
+os.environ.setdefault('SIMULATED_LATENCY', 'zero')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app, db, init_database
+
+
+@pytest.fixture(scope='session')
+def app():
+    init_database()
+    yield flask_app
+    from sqlite_profile import sqlite_writer
+    sqlite_writer.stop()
+
+
+@pytest.fixture
+def session(app):
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
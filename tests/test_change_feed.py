@@ -0,0 +1,48 @@
+from unittest import mock
+
+from sqlalchemy import func
+
+from models import Alert, AlertSeverity, AlertStatus, ChangeLogEntry, DisasterType, Region
+from change_feed import change_feed
+from response_analytics import TIME_TO_ACKNOWLEDGE, ResponseTimeAnalytics
+
+
+def _latest_seq(session):
+    return session.query(func.max(ChangeLogEntry.id)).scalar() or 0
+
+
+def test_savepoint_rollback_keeps_changes_recorded_before_it(session):
+    before = _latest_seq(session)
+    kept = change_feed.record('test_event', {'n': 1})
+    try:
+        with session.begin_nested():
+            change_feed.record('test_event', {'n': 2})
+            raise ValueError
+    except ValueError:
+        pass
+    session.commit()
+
+    rows = ChangeLogEntry.query.filter(ChangeLogEntry.id > before).all()
+    assert [row.payload for row in rows] == ['{"n": 1}']
+    change_feed.publish([kept])
+
+
+def test_lost_bin_insert_race_keeps_the_change(session):
+    alert = Alert(region_id=Region.query.first().id, disaster_type=DisasterType.FIRE,
+                  severity=AlertSeverity.HIGH, status=AlertStatus.ACKNOWLEDGED,
+                  title='test', description='test')
+    session.add(alert)
+    session.flush()
+    before = _latest_seq(session)
+
+    analytics = ResponseTimeAnalytics()
+    deltas = {(TIME_TO_ACKNOWLEDGE, 'overall', 'race', 0): [1, 5.0, 5.0, 5.0]}
+    # The bin row exists, but the first increment misses it, as if another worker inserted it meanwhile
+    analytics._apply_deltas(deltas)
+    change = change_feed.record('alert_updated', {'alert_id': alert.id})
+    with mock.patch.object(analytics, '_increment', side_effect=[False, True]):
+        analytics._apply_deltas(deltas)
+    session.commit()
+
+    assert ChangeLogEntry.query.filter(ChangeLogEntry.id > before).count() == 1
+    change_feed.publish([change])
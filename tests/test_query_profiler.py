@@ -0,0 +1,31 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from query_profiler import QueryProfiler
+
+
+@pytest.fixture
+def profiler():
+    profiler = QueryProfiler()
+    app = Flask(__name__)
+    app.config['SQL_PROFILING'] = True
+    profiler.init_app(app)
+    yield profiler
+    event.remove(Engine, 'before_cursor_execute', profiler._before_cursor_execute)
+    event.remove(Engine, 'after_cursor_execute', profiler._after_cursor_execute)
+    event.remove(Engine, 'handle_error', profiler._handle_error)
+
+
+def test_failed_statement_leaves_no_start_time(profiler):
+    engine = create_engine('sqlite://')
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM missing_table'))
+        assert conn.info['query_start_time'] == []
+
+        conn.execute(text('SELECT 1'))
+        assert conn.info['query_start_time'] == []
@@ -0,0 +1,27 @@
+import time
+from unittest import mock
+
+import satellite_sources
+from records import RegionBounds
+from satellite_sources import FakeSource, SourceFetcher
+
+BOUNDS = RegionBounds(28.4041, 28.8833, 76.8388, 77.3465)
+
+
+def test_hedged_slot_waits_without_spinning():
+    sources = [FakeSource(f'Source-{i}', delay=1.0) for i in range(3)]
+    fetcher = SourceFetcher(sources, timeout=5.0, required=1)
+    for source in sources:
+        for _ in range(satellite_sources.HEDGE_MIN_SAMPLES):
+            fetcher.latencies[source.name].observe(0.25)
+
+    with mock.patch.object(satellite_sources, 'wait', wraps=satellite_sources.wait) as wait:
+        started = time.process_time()
+        products = fetcher.fetch(BOUNDS)
+        cpu = time.process_time() - started
+
+    assert len(products) == 1
+    # The original and its backup both run past their hedge delays; that must not busy-wait
+    assert sources[0].calls == 1 and sources[1].calls == 1 and sources[2].calls == 0
+    assert wait.call_count < 10
+    assert cpu < 0.2